@@ -0,0 +1,57 @@
+/*
+ * mote-config.c
+ * - Boot-time send interval / warmup, so one firmware serves every interval
+ */
+
+#include "mote-config.h"
+
+#if CONTIKI_TARGET_COOJA
+#include "dev/eeprom.h"
+#endif
+
+#include <string.h>
+
+static const uint8_t magic[4] = { 'R', 'B', 'C', '1' };
+
+void
+mote_config_load(struct mote_config *cfg)
+{
+  cfg->send_interval_ms = (uint32_t)SEND_INTERVAL_SECONDS * 1000;
+  cfg->warmup_s = WARMUP_SECONDS;
+  cfg->from_eeprom = 0;
+
+#if CONTIKI_TARGET_COOJA
+  {
+    unsigned char buf[MOTE_CONFIG_SIZE];
+    uint32_t interval_ms;
+
+    eeprom_read(MOTE_CONFIG_ADDR, buf, sizeof(buf));
+    if(memcmp(buf, magic, sizeof(magic)) != 0) {
+      return;
+    }
+    interval_ms = (uint32_t)buf[4] | ((uint32_t)buf[5] << 8) |
+                  ((uint32_t)buf[6] << 16) | ((uint32_t)buf[7] << 24);
+    if(interval_ms == 0) {
+      return;
+    }
+    cfg->send_interval_ms = interval_ms;
+    cfg->warmup_s = (uint16_t)(buf[8] | (buf[9] << 8));
+    cfg->from_eeprom = 1;
+  }
+#else
+  (void)magic;
+#endif
+}
+
+clock_time_t
+mote_config_send_interval(const struct mote_config *cfg)
+{
+  clock_time_t ticks = (clock_time_t)((uint64_t)cfg->send_interval_ms * CLOCK_SECOND / 1000);
+  return ticks > 0 ? ticks : 1;
+}
+
+clock_time_t
+mote_config_warmup(const struct mote_config *cfg)
+{
+  return (clock_time_t)cfg->warmup_s * CLOCK_SECOND;
+}
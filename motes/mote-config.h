@@ -0,0 +1,36 @@
+/*
+ * mote-config.h
+ * - Per-mote runtime configuration read from the Cooja EEPROM at boot
+ *
+ * EEPROM layout (little-endian, written by tools/gen_csc.py):
+ *   0..3  magic "RBC1"
+ *   4..7  send interval in ms
+ *   8..9  warmup in seconds
+ *
+ * A zero-filled EEPROM (no <eeprom> in the .csc) or a non-Cooja target falls
+ * back to the compile-time SEND_INTERVAL_SECONDS / WARMUP_SECONDS.
+ */
+
+#ifndef MOTE_CONFIG_H_
+#define MOTE_CONFIG_H_
+
+#include "contiki.h"
+
+#include <stdint.h>
+
+#define MOTE_CONFIG_ADDR 0
+#define MOTE_CONFIG_SIZE 10
+
+struct mote_config {
+  uint32_t send_interval_ms;
+  uint16_t warmup_s;
+  uint8_t from_eeprom;
+};
+
+/* Fill cfg from the EEPROM, or with the compile-time defaults. */
+void mote_config_load(struct mote_config *cfg);
+
+clock_time_t mote_config_send_interval(const struct mote_config *cfg);
+clock_time_t mote_config_warmup(const struct mote_config *cfg);
+
+#endif /* MOTE_CONFIG_H_ */
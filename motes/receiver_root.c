@@ -1,6 +1,8 @@
 /*
  * receiver_root.c
  * - RPL root + UDP receiver/logger for Contiki-NG (Cooja)
+ * - Address (and DODAG ID) aaaa::<node id>, so multi-root layouts get one
+ *   DODAG per root; the single-root layouts keep aaaa::1 (mote id 1)
  *
  * CSV output:
  * CSV,RX,src_ip,seq,t_recv,len
@@ -10,6 +12,7 @@
 
 #include "contiki.h"
 #include "sys/log.h"
+#include "sys/node-id.h"
 
 #include "net/ipv6/uip.h"
 #include "net/ipv6/uiplib.h"
@@ -19,6 +22,8 @@
 #include "net/ipv6/simple-udp.h"
 #include "net/ipv6/uip-nd6.h"
 
+#include "mote-config.h"
+
 #include <stdint.h>
 #include <stdio.h>
 #include <string.h>
@@ -40,8 +45,8 @@ set_root_address_and_prefix(void)
 {
   uip_ipaddr_t prefix;
 
-  /* Root global address: aaaa::1 */
-  uip_ip6addr(&root_ipaddr, 0xaaaa,0,0,0,0,0,0,1);
+  /* Root global address: aaaa::<node id>, also the DODAG ID. */
+  uip_ip6addr(&root_ipaddr, 0xaaaa,0,0,0,0,0,0,node_id);
   uip_ds6_addr_t *addr = uip_ds6_addr_add(&root_ipaddr, 0, ADDR_MANUAL);
   if(addr != NULL) {
     addr->state = ADDR_PREFERRED;
@@ -143,11 +148,18 @@ AUTOSTART_PROCESSES(&receiver_root_process);
 
 PROCESS_THREAD(receiver_root_process, ev, data)
 {
+  static struct mote_config cfg;
+
   (void)ev; (void)data;
 
   PROCESS_BEGIN();
 
   LOG_INFO("boot\n");
+  /* Logged so the testlog records what every mote actually ran with. */
+  mote_config_load(&cfg);
+  LOG_INFO("config: send_interval_ms=%lu warmup_s=%u source=%s\n",
+           (unsigned long)cfg.send_interval_ms, (unsigned)cfg.warmup_s,
+           cfg.from_eeprom ? "eeprom" : "default");
 
   /* Establish RPL root and prefix so sensors can auto-configure. */
   set_root_address_and_prefix();
@@ -2,6 +2,7 @@
  * sender.c
  * - UDP sensor sender for Contiki-NG (Cooja)
  * - Sends seq + local clock after warmup
+ * - Send interval / warmup come from the mote EEPROM (mote-config.h)
  * - RTT measured via receiver echo
  */
 
@@ -14,6 +15,8 @@
 #include "net/routing/routing.h"
 #include "net/ipv6/simple-udp.h"
 
+#include "mote-config.h"
+
 #include <stdint.h>
 #include <stdio.h>
 #include <string.h>
@@ -22,13 +25,6 @@
 #define LOG_LEVEL LOG_LEVEL_INFO
 
 #define UDP_PORT 8765
-#ifndef SEND_INTERVAL_SECONDS
-#define SEND_INTERVAL_SECONDS 10
-#endif
-#ifndef WARMUP_SECONDS
-#define WARMUP_SECONDS 60
-#endif
-#define SEND_INTERVAL (SEND_INTERVAL_SECONDS * CLOCK_SECOND)
 
 static struct simple_udp_connection udp_conn;
 static uip_ipaddr_t root_ipaddr;
@@ -94,18 +90,24 @@ PROCESS_THREAD(sender_process, ev, data)
   static uint32_t seq;
   static uint8_t last_reachable;
   static uint8_t warmup_done;
+  static struct mote_config cfg;
   char buf[64];
 
   (void)ev; (void)data;
 
   PROCESS_BEGIN();
 
-  /* Root is aaaa::1 as configured by receiver_root.c. */
+  /* Until joined, fall back to aaaa::1 (the root of single-root layouts). */
   uip_ip6addr(&root_ipaddr, 0xaaaa,0,0,0,0,0,0,1);
 
+  mote_config_load(&cfg);
+  LOG_INFO("config: send_interval_ms=%lu warmup_s=%u source=%s\n",
+           (unsigned long)cfg.send_interval_ms, (unsigned)cfg.warmup_s,
+           cfg.from_eeprom ? "eeprom" : "default");
+
   simple_udp_register(&udp_conn, UDP_PORT, NULL, UDP_PORT, echo_rx_callback);
-  etimer_set(&periodic_timer, SEND_INTERVAL);
-  etimer_set(&warmup_timer, WARMUP_SECONDS * CLOCK_SECOND);
+  etimer_set(&periodic_timer, mote_config_send_interval(&cfg));
+  etimer_set(&warmup_timer, mote_config_warmup(&cfg));
   last_reachable = 0;
   warmup_done = 0;
 
@@ -147,6 +149,10 @@ PROCESS_THREAD(sender_process, ev, data)
       continue;
     }
 
+    /* Send to the root of our own DODAG (multi-root layouts have several);
+     * left unchanged while the node has no DODAG. */
+    NETSTACK_ROUTING.get_root_ipaddr(&root_ipaddr);
+
     uint32_t t0 = (uint32_t)clock_time();
     seq++;
     snprintf(buf, sizeof(buf), "seq=%lu t0=%lu",
@@ -13,6 +13,7 @@ extern rpl_of_t rpl_brpl;
 #define RPL_CONF_WITH_DAO_ACK 0
 #endif
 
+/* Fallbacks when the mote EEPROM carries no runtime config (motes/mote-config.h). */
 #ifndef SEND_INTERVAL_SECONDS
 #define SEND_INTERVAL_SECONDS 10
 #endif
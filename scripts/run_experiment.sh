@@ -14,12 +14,26 @@ SUCCESS_RATIO="${SUCCESS_RATIO:-1.0}"
 INTERFERENCE_RATIO="${INTERFERENCE_RATIO:-1.0}"
 TX_RANGE="${TX_RANGE:-60}"
 INT_RANGE="${INT_RANGE:-100}"
+LAYOUT="${LAYOUT:-grid}"
+ROOTS="${ROOTS:-1}"
+MAX_HOPS="${MAX_HOPS:-16}"
 SEND_INTERVAL_S="${SEND_INTERVAL_S:-10}"
 DURATION_S="${DURATION_S:-360}"
 WARMUP_S="${WARMUP_S:-60}"
 MEASURE_S="${MEASURE_S:-300}"
 SIM_TIMEOUT_S="${SIM_TIMEOUT_S:-600}"
 CLOCK_SECOND="${CLOCK_SECOND:-1000}"
+EARLY_STOP_RULES="${EARLY_STOP_RULES-never_joined,collapsed,stalled}"
+FIRMWARE_CACHE_DIR="${FIRMWARE_CACHE_DIR:-$ROOT_DIR/build/firmware-cache}"
+# all: prepare + simulate + parse; prepare/parse are used by the batch runner
+# (tools/python/cooja_batch.py), which simulates several .csc per Cooja JVM.
+PHASE="${PHASE:-all}"
+# RESUME=1 skips runs the ledger (summary.db) already has as done.
+RESUME="${RESUME:-}"
+RESUME_MAX_ATTEMPTS="${RESUME_MAX_ATTEMPTS:-3}"
+# gzip|zstd: Cooja stdout is written compressed and the run log is compressed
+# during its parse scan (zstd needs the zstandard package). Empty keeps plain logs.
+LOG_COMPRESSION="${LOG_COMPRESSION:-}"
 
 while [[ $# -gt 0 ]]; do
   case "$1" in
@@ -41,6 +55,12 @@ while [[ $# -gt 0 ]]; do
       TX_RANGE="$2"; shift 2 ;;
     --int-range)
       INT_RANGE="$2"; shift 2 ;;
+    --layout)
+      LAYOUT="$2"; shift 2 ;;
+    --roots)
+      ROOTS="$2"; shift 2 ;;
+    --max-hops)
+      MAX_HOPS="$2"; shift 2 ;;
     --duration-s)
       DURATION_S="$2"; shift 2 ;;
     --warmup-s)
@@ -51,6 +71,10 @@ while [[ $# -gt 0 ]]; do
       SIM_TIMEOUT_S="$2"; shift 2 ;;
     --clock-second)
       CLOCK_SECOND="$2"; shift 2 ;;
+    --firmware-cache-dir)
+      FIRMWARE_CACHE_DIR="$2"; shift 2 ;;
+    --phase)
+      PHASE="$2"; shift 2 ;;
     *)
       echo "Unknown argument: $1" >&2
       exit 2
@@ -58,6 +82,14 @@ while [[ $# -gt 0 ]]; do
   esac
  done
 
+case "$PHASE" in
+  all|prepare|parse) ;;
+  *)
+    echo "Unknown phase: $PHASE (use all, prepare, or parse)" >&2
+    exit 2
+    ;;
+esac
+
 if [ ! -d "$CONTIKI" ]; then
   echo "CONTIKI not found at $CONTIKI" >&2
   echo "Set CONTIKI env var to your contiki-ng path." >&2
@@ -70,6 +102,16 @@ if [ ! -f "$COOJA_JAR" ]; then
   exit 1
 fi
 
+case "$LOG_COMPRESSION" in
+  "") LOG_SUFFIX="" ;;
+  gzip) LOG_SUFFIX=".gz" ;;
+  zstd) LOG_SUFFIX=".zst" ;;
+  *)
+    echo "Unknown LOG_COMPRESSION: $LOG_COMPRESSION (use gzip or zstd)" >&2
+    exit 2
+    ;;
+esac
+
 case "$MODE" in
   rpl-classic)
     MAKE_ROUTING="MAKE_ROUTING_RPL_CLASSIC"
@@ -89,6 +131,23 @@ case "$MODE" in
     ;;
  esac
 
+# Layout is not part of the summary key or the run basename, so a non-grid run
+# must carry its layout (and root count) in the stage label instead of
+# overwriting the grid row of the same (mode, stage, N, seed, sr, ir, si).
+case "$LAYOUT" in
+  grid) LAYOUT_TAG="" ;;
+  multiroot) LAYOUT_TAG="multiroot-r$(( ROOTS > 2 ? ROOTS : 2 ))" ;;
+  *) LAYOUT_TAG="$LAYOUT" ;;
+esac
+if [ "$LAYOUT" != "multiroot" ] && [ "$ROOTS" != "1" ]; then
+  echo "--roots only applies to --layout multiroot" >&2
+  exit 2
+fi
+if [ -n "$LAYOUT_TAG" ] && [[ "$STAGE" != *"$LAYOUT_TAG"* ]]; then
+  echo "Layout $LAYOUT needs a stage label containing '$LAYOUT_TAG' (e.g. --stage ${STAGE}-${LAYOUT_TAG})" >&2
+  exit 2
+fi
+
 sanitize() {
   local value="$1"
   value="${value//./p}"
@@ -105,81 +164,199 @@ mkdir -p "$RAW_DIR"
 BASENAME="N${N_SENDERS}_seed${SEED}_sr${SUCCESS_TAG}_ir${INTERFERENCE_TAG}_si${INTERVAL_TAG}"
 CSC_PATH="$RAW_DIR/${BASENAME}.csc"
 LOG_PATH="$RAW_DIR/${BASENAME}.log"
-STDOUT_LOG_PATH="$RAW_DIR/${BASENAME}.stdout.log"
+STDOUT_LOG_PATH="$RAW_DIR/${BASENAME}.stdout.log${LOG_SUFFIX}"
+STATUS_PATH="$RAW_DIR/${BASENAME}.status"
 CSV_PATH="$RAW_DIR/${BASENAME}.csv"
+TOPOLOGY_PATH="$RAW_DIR/${BASENAME}.topo.csv"
+TIMINGS_PATH="$RAW_DIR/${BASENAME}.timings.jsonl"
+ARCHIVE_DIR="$RAW_DIR/${BASENAME}.events"
+METRICS_PATH="$RAW_DIR/${BASENAME}.metrics.csv"
 SUMMARY_PATH="$RESULTS_DIR/summary.csv"
-COOJA_LOGDIR="$RAW_DIR"
-COOJA_TESTLOG="$COOJA_LOGDIR/COOJA.testlog"
+# Per-run Cooja logdir so parallel runs never share Cooja's own log files.
+COOJA_LOGDIR="$RAW_DIR/.cooja/$BASENAME"
 
 SIM_TIME_MS=$((DURATION_S * 1000))
 
-DEFINES="SEND_INTERVAL_SECONDS=$SEND_INTERVAL_S WARMUP_SECONDS=$WARMUP_S"
-if [ -n "$BRPL_FLAG" ]; then
-  DEFINES="$DEFINES $BRPL_FLAG"
+# Send interval and warmup reach the motes through the .csc (EEPROM), so the
+# firmware only differs per routing stack/mode.
+DEFINES="$BRPL_FLAG"
+
+# Wall time / peak RSS per phase, loaded into summary.db (timings table) at the end.
+timed() {
+  local phase_name="$1"
+  shift
+  python3 "$ROOT_DIR/tools/python/timings.py" run --out "$TIMINGS_PATH" --phase "$phase_name" -- "$@"
+}
+
+# Batched runs (--phase prepare/parse, cooja_batch.py) never go through
+# run_monitor, so they run without early-stop rules and are keyed that way.
+LEDGER_STOP_RULES="$EARLY_STOP_RULES"
+if [ "$PHASE" != "all" ]; then
+  LEDGER_STOP_RULES=""
 fi
 
-BUILD_DIR="$ROOT_DIR/build/cooja"
-BUILD_CONFIG_FILE="$BUILD_DIR/.build_config"
-CURRENT_BUILD_CONFIG="MAKE_ROUTING=$MAKE_ROUTING DEFINES=$DEFINES"
-if [ -f "$BUILD_CONFIG_FILE" ]; then
-  PREV_BUILD_CONFIG="$(cat "$BUILD_CONFIG_FILE")"
+# Ledger key: every parameter that changes the result plus the firmware key.
+LEDGER_ARGS=(
+  --summary "$SUMMARY_PATH"
+  --root-dir "$ROOT_DIR"
+  --contiki "$CONTIKI"
+  --make-routing "$MAKE_ROUTING"
+  --defines "$DEFINES"
+  --param "mode=$MODE"
+  --param "stage=$STAGE"
+  --param "n_senders=$N_SENDERS"
+  --param "seed=$SEED"
+  --param "success_ratio=$SUCCESS_RATIO"
+  --param "interference_ratio=$INTERFERENCE_RATIO"
+  --param "send_interval_s=$SEND_INTERVAL_S"
+  --param "tx_range=$TX_RANGE"
+  --param "int_range=$INT_RANGE"
+  --param "layout=$LAYOUT"
+  --param "roots=$ROOTS"
+  --param "max_hops=$MAX_HOPS"
+  --param "duration_s=$DURATION_S"
+  --param "warmup_s=$WARMUP_S"
+  --param "measure_s=$MEASURE_S"
+  --param "clock_second=$CLOCK_SECOND"
+  --param "early_stop_rules=$LEDGER_STOP_RULES"
+)
+RUN_HASH=""
+
+ledger_finish() {
+  trap - EXIT
+  if [ -n "$RUN_HASH" ]; then
+    python3 "$ROOT_DIR/tools/python/run_ledger.py" finish \
+      --summary "$SUMMARY_PATH" \
+      --hash "$RUN_HASH" \
+      --state "$1" \
+      --exit-code "$2" \
+      --run-status "${RUN_STATUS:-failed}" || true
+  fi
+}
+
+if [ "$PHASE" = "parse" ]; then
+  RUN_HASH="$(python3 "$ROOT_DIR/tools/python/run_ledger.py" key "${LEDGER_ARGS[@]}" || true)"
 else
-  PREV_BUILD_CONFIG=""
+  LEDGER_STATE="running"
+  if [ "$PHASE" = "prepare" ]; then
+    LEDGER_STATE="pending"
+  fi
+  set +e
+  RUN_HASH="$(python3 "$ROOT_DIR/tools/python/run_ledger.py" begin "${LEDGER_ARGS[@]}" \
+    --state "$LEDGER_STATE" \
+    --max-attempts "$RESUME_MAX_ATTEMPTS" \
+    ${RESUME:+--resume})"
+  LEDGER_STATUS=$?
+  set -e
+  if [ $LEDGER_STATUS -eq 3 ]; then
+    if [ "$PHASE" = "prepare" ]; then
+      printf "RUN_STATE=skipped\nRUN_HASH=%s\n" "$RUN_HASH"
+    else
+      printf "Skipped %s %s seed=%s (ledger)\n" "$MODE" "$BASENAME" "$SEED"
+    fi
+    exit 0
+  elif [ $LEDGER_STATUS -ne 0 ]; then
+    echo "run_ledger.py failed (status $LEDGER_STATUS); continuing without the ledger" >&2
+    RUN_HASH=""
+  fi
 fi
-if [ "$PREV_BUILD_CONFIG" != "$CURRENT_BUILD_CONFIG" ]; then
-  make -C "$ROOT_DIR" TARGET=cooja clean
-  mkdir -p "$BUILD_DIR"
+# Anything that aborts the run from here on leaves it failed in the ledger.
+trap 'ledger_finish failed $?' EXIT
+
+if [ "$PHASE" != "parse" ]; then
+  rm -f "$TIMINGS_PATH"
+  # Prebuilt firmware keyed by routing/DEFINES/sources/Contiki revision; only a
+  # configuration never seen before triggers a compile.
+  FIRMWARE_DIR="$(timed firmware python3 "$ROOT_DIR/tools/python/firmware_cache.py" ensure \
+    --root-dir "$ROOT_DIR" \
+    --contiki "$CONTIKI" \
+    --cache-dir "$FIRMWARE_CACHE_DIR" \
+    --make-routing "$MAKE_ROUTING" \
+    --defines "$DEFINES")"
+
+  # The scenario script writes its own log, so runs sharing a Cooja JVM
+  # never share COOJA.testlog. Disconnected or too deep layouts fail here,
+  # before any Cooja time is spent.
+  rm -f "$LOG_PATH" "$LOG_PATH.gz" "$LOG_PATH.zst" "$STATUS_PATH"
+  timed gen_csc python3 "$ROOT_DIR/tools/gen_csc.py" \
+    --root-dir "$ROOT_DIR" \
+    --senders "$N_SENDERS" \
+    --seed "$SEED" \
+    --make-routing "$MAKE_ROUTING" \
+    --firmware-dir "$FIRMWARE_DIR" \
+    --send-interval "$SEND_INTERVAL_S" \
+    --warmup-s "$WARMUP_S" \
+    ${BRPL_FLAG:+--brpl} \
+    --sim-time-ms "$SIM_TIME_MS" \
+    --tx-range "$TX_RANGE" \
+    --int-range "$INT_RANGE" \
+    --success-tx "$SUCCESS_RATIO" \
+    --success-rx "$INTERFERENCE_RATIO" \
+    --layout "$LAYOUT" \
+    --roots "$ROOTS" \
+    --max-hops "$MAX_HOPS" \
+    --topology-out "$TOPOLOGY_PATH" \
+    --testlog "$LOG_PATH" \
+    --out "$CSC_PATH"
 fi
-mkdir -p "$BUILD_DIR"
-echo "$CURRENT_BUILD_CONFIG" > "$BUILD_CONFIG_FILE"
 
-make -C "$ROOT_DIR" TARGET=cooja receiver_root.cooja sender.cooja \
-  MAKE_ROUTING="$MAKE_ROUTING" DEFINES="$DEFINES"
+if [ "$PHASE" = "prepare" ]; then
+  # Stays pending until the batch runner starts its Cooja JVM.
+  trap - EXIT
+  printf "FIRMWARE_DIR=%s\nCSC_PATH=%s\nLOG_PATH=%s\nSTATUS_PATH=%s\nTIMINGS_PATH=%s\nCOOJA_JAR=%s\nSIM_TIMEOUT_S=%s\nRUN_HASH=%s\n" \
+    "$FIRMWARE_DIR" "$CSC_PATH" "$LOG_PATH" "$STATUS_PATH" "$TIMINGS_PATH" "$COOJA_JAR" "$SIM_TIMEOUT_S" "$RUN_HASH"
+  exit 0
+fi
 
-python3 "$ROOT_DIR/tools/gen_csc.py" \
-  --root-dir "$ROOT_DIR" \
-  --senders "$N_SENDERS" \
-  --seed "$SEED" \
-  --make-routing "$MAKE_ROUTING" \
-  --send-interval "$SEND_INTERVAL_S" \
-  ${BRPL_FLAG:+--brpl} \
-  --sim-time-ms "$SIM_TIME_MS" \
-  --tx-range "$TX_RANGE" \
-  --int-range "$INT_RANGE" \
-  --success-tx "$SUCCESS_RATIO" \
-  --success-rx "$INTERFERENCE_RATIO" \
-  --out "$CSC_PATH"
-
-set +e
-rm -f "$COOJA_TESTLOG"
-if command -v timeout >/dev/null 2>&1; then
-  timeout "$SIM_TIMEOUT_S" java --enable-preview -jar "$COOJA_JAR" --no-gui --autostart --logdir "$COOJA_LOGDIR" "$CSC_PATH" > "$STDOUT_LOG_PATH" 2>&1
-  COOJA_STATUS=$?
-else
-  java --enable-preview -jar "$COOJA_JAR" --no-gui --autostart --logdir "$COOJA_LOGDIR" "$CSC_PATH" > "$STDOUT_LOG_PATH" 2>&1
+if [ "$PHASE" = "all" ]; then
+  set +e
+  mkdir -p "$COOJA_LOGDIR"
+  # The monitor follows the testlog and stops runs whose outcome is already
+  # decided (EARLY_STOP_RULES="" keeps only the wall-clock timeout). The
+  # firmware entry stays pinned so a parallel run's LRU eviction skips it.
+  python3 "$ROOT_DIR/tools/python/firmware_cache.py" pin --entry "$FIRMWARE_DIR" -- \
+  python3 "$ROOT_DIR/tools/python/run_monitor.py" \
+    --testlog "$LOG_PATH" \
+    --stdout-log "$STDOUT_LOG_PATH" \
+    ${LOG_COMPRESSION:+--compress "$LOG_COMPRESSION"} \
+    --status-out "$STATUS_PATH" \
+    --timeout-s "$SIM_TIMEOUT_S" \
+    --warmup-s "$WARMUP_S" \
+    --clock-second "$CLOCK_SECOND" \
+    --rules "$EARLY_STOP_RULES" \
+    --timings-out "$TIMINGS_PATH" \
+    -- java --enable-preview -jar "$COOJA_JAR" --no-gui --autostart --logdir "$COOJA_LOGDIR" "$CSC_PATH"
   COOJA_STATUS=$?
+  set -e
+  rm -rf "$COOJA_LOGDIR"
 fi
-set -e
 
-if [ -f "$COOJA_TESTLOG" ]; then
-  mv "$COOJA_TESTLOG" "$LOG_PATH"
-else
-  cp "$STDOUT_LOG_PATH" "$LOG_PATH"
+RUN_STATUS="$(cat "$STATUS_PATH" 2>/dev/null || echo failed)"
+if [ "$PHASE" = "parse" ]; then
+  COOJA_STATUS=0
+  if [ "$RUN_STATUS" != "ok" ]; then
+    COOJA_STATUS=1
+  fi
 fi
 
-if [ $COOJA_STATUS -ne 0 ]; then
-  echo "Cooja run failed (status $COOJA_STATUS) for $BASENAME" >&2
+# Without a scenario log, Cooja's stdout is parsed in place (no second copy).
+PARSE_LOG_PATH="$LOG_PATH"
+if [ ! -f "$LOG_PATH" ] && [ ! -f "$LOG_PATH.gz" ] && [ ! -f "$LOG_PATH.zst" ] && [ -f "$STDOUT_LOG_PATH" ]; then
+  PARSE_LOG_PATH="$STDOUT_LOG_PATH"
 fi
 
-if rg 'CSV,' "$LOG_PATH" >/dev/null 2>&1; then
-  rg 'CSV,' "$LOG_PATH" | sed -E 's/^.* CSV,/CSV,/' > "$CSV_PATH"
-else
-  echo "" > "$CSV_PATH"
+if [ $COOJA_STATUS -ne 0 ]; then
+  echo "Cooja run failed (status $COOJA_STATUS) for $BASENAME" >&2
 fi
 
-python3 "$ROOT_DIR/tools/python/log_parser.py" \
-  --csv "$CSV_PATH" \
-  --cooja-log "$LOG_PATH" \
+# Single scan of the testlog: events, DIO/DAO counts and the CSV extract.
+timed parse python3 "$ROOT_DIR/tools/python/log_parser.py" \
+  --cooja-log "$PARSE_LOG_PATH" \
+  ${LOG_COMPRESSION:+--compress "$LOG_COMPRESSION"} \
+  --csv-out "$CSV_PATH" \
+  --archive-dir "$ARCHIVE_DIR" \
+  --metrics-out "$METRICS_PATH" \
+  --topology "$TOPOLOGY_PATH" \
   --mode "$MODE" \
   --stage "$STAGE" \
   --n-senders "$N_SENDERS" \
@@ -191,18 +368,33 @@ python3 "$ROOT_DIR/tools/python/log_parser.py" \
   --warmup-s "$WARMUP_S" \
   --measure-s "$MEASURE_S" \
   --clock-second "$CLOCK_SECOND" \
-  --log-path "$LOG_PATH" \
+  --log-path "$PARSE_LOG_PATH" \
   --csc-path "$CSC_PATH" \
-  --out "$SUMMARY_PATH"
+  --run-status "$RUN_STATUS" \
+  --out "$SUMMARY_PATH" \
+  ${SKIP_SUMMARY_EXPORT:+--no-export}
 
 if [ -z "${SKIP_THRESHOLDS:-}" ]; then
-  Rscript "$ROOT_DIR/tools/R/find_thresholds.R" \
+  timed thresholds python3 "$ROOT_DIR/tools/python/collapse.py" thresholds \
     --summary "$SUMMARY_PATH" \
     --out "$RESULTS_DIR/thresholds.csv" || true
 fi
 
+python3 "$ROOT_DIR/tools/python/timings.py" record \
+  --timings "$TIMINGS_PATH" \
+  --summary "$SUMMARY_PATH" \
+  --mode "$MODE" \
+  --stage "$STAGE" \
+  --n-senders "$N_SENDERS" \
+  --seed "$SEED" \
+  --success-ratio "$SUCCESS_RATIO" \
+  --interference-ratio "$INTERFERENCE_RATIO" \
+  --send-interval-s "$SEND_INTERVAL_S" || true
+
 if [ $COOJA_STATUS -ne 0 ]; then
+  ledger_finish failed "$COOJA_STATUS"
   exit 0
 fi
+ledger_finish done 0
 
 printf "Completed %s %s seed=%s (summary: %s)\n" "$MODE" "$BASENAME" "$SEED" "$SUMMARY_PATH"
@@ -2,10 +2,26 @@
 set -euo pipefail
 
 ROOT_DIR="$(cd "$(dirname "$0")/.." && pwd)"
+
+# JOBS>1 or BATCH_SIZE>1 hands the whole grid to the parallel Python driver.
+if [ "${JOBS:-1}" -gt 1 ] || [ "${BATCH_SIZE:-1}" -gt 1 ]; then
+  exec python3 "$ROOT_DIR/tools/python/sweep.py" --root-dir "$ROOT_DIR" \
+    --jobs "${JOBS:-1}" --batch-size "${BATCH_SIZE:-1}" ${RESUME:+--resume}
+fi
+
 export SKIP_THRESHOLDS=1
 SUMMARY="$ROOT_DIR/results/summary.csv"
-if [ -f "$SUMMARY" ]; then
-  mv "$SUMMARY" "$SUMMARY.bak.$(date '+%Y%m%d_%H%M%S')"
+STORE="${SUMMARY%.csv}.db"
+# RESUME=1 keeps summary.db (results + run ledger) and only runs what is
+# missing or failed; otherwise the previous results are moved aside.
+if [ -z "${RESUME:-}" ]; then
+  BACKUP_TS="$(date '+%Y%m%d_%H%M%S')"
+  if [ -f "$SUMMARY" ]; then
+    mv "$SUMMARY" "$SUMMARY.bak.$BACKUP_TS"
+  fi
+  if [ -f "$STORE" ]; then
+    mv "$STORE" "$STORE.bak.$BACKUP_TS"
+  fi
 fi
 
 echo "[all] Stage 1 start @ $(date '+%F %T')"
@@ -3,8 +3,16 @@ set -euo pipefail
 
 ROOT_DIR="$(cd "$(dirname "$0")/.." && pwd)"
 SUMMARY="$ROOT_DIR/results/summary.csv"
-if [ -f "$SUMMARY" ]; then
-  mv "$SUMMARY" "$SUMMARY.bak.$(date '+%Y%m%d_%H%M%S')"
+STORE="${SUMMARY%.csv}.db"
+# RESUME=1: keep summary.db and let run_experiment.sh skip runs the ledger has as done.
+if [ -z "${RESUME:-}" ]; then
+  BACKUP_TS="$(date '+%Y%m%d_%H%M%S')"
+  if [ -f "$SUMMARY" ]; then
+    mv "$SUMMARY" "$SUMMARY.bak.$BACKUP_TS"
+  fi
+  if [ -f "$STORE" ]; then
+    mv "$STORE" "$STORE.bak.$BACKUP_TS"
+  fi
 fi
 
 STAGE="stage1"
@@ -19,6 +27,7 @@ SEND_INTERVAL_S="${SEND_INTERVAL_S:-10}"
 total=$(( ${#MODE_LIST[@]} * ${#N_LIST[@]} * ${#SEEDS[@]} ))
 count=0
 export SKIP_THRESHOLDS=1
+export SKIP_SUMMARY_EXPORT=1
 
 for mode in "${MODE_LIST[@]}"; do
   for n in "${N_LIST[@]}"; do
@@ -38,8 +47,20 @@ for mode in "${MODE_LIST[@]}"; do
   done
  done
 
-Rscript "$ROOT_DIR/tools/R/find_thresholds.R" \
+TIMINGS="$ROOT_DIR/results/.stage1.timings.jsonl"
+rm -f "$TIMINGS"
+python3 "$ROOT_DIR/tools/python/timings.py" run --out "$TIMINGS" --phase export -- \
+  python3 "$ROOT_DIR/tools/python/results_store.py" export \
+  --summary "$ROOT_DIR/results/summary.csv"
+
+python3 "$ROOT_DIR/tools/python/timings.py" run --out "$TIMINGS" --phase thresholds -- \
+  python3 "$ROOT_DIR/tools/python/collapse.py" thresholds \
   --summary "$ROOT_DIR/results/summary.csv" \
   --out "$ROOT_DIR/results/thresholds.csv" || true
 
+python3 "$ROOT_DIR/tools/python/timings.py" record \
+  --timings "$TIMINGS" \
+  --summary "$ROOT_DIR/results/summary.csv" \
+  --stage "stage1" || true
+
 printf "Stage1 sweep complete. Summary: %s/results/summary.csv\n" "$ROOT_DIR"
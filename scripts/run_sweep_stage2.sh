@@ -11,46 +11,7 @@ if [ ! -f "$SUMMARY" ]; then
 fi
 
 read -r STABLE_N MARGINAL_N < <(
-  python3 - <<'PY'
-import csv
-import os
-from collections import defaultdict
-
-root_dir = os.environ.get("ROOT_DIR", ".")
-summary_path = os.path.join(root_dir, "results", "summary.csv")
-N_LIST = [5, 10, 15, 20, 25, 30, 40, 50]
-
-rows = []
-with open(summary_path, newline="", encoding="utf-8") as handle:
-    reader = csv.DictReader(handle)
-    rows = [r for r in reader if r.get("stage") == "stage1" and r.get("mode") == "rpl-lite"]
-
-pdr_by_n = defaultdict(list)
-for row in rows:
-    try:
-        n = int(row["n_senders"])
-        pdr = float(row["pdr"])
-    except (ValueError, KeyError):
-        continue
-    pdr_by_n[n].append(pdr)
-
-avg_pdr = {n: (sum(vals) / len(vals)) for n, vals in pdr_by_n.items() if vals}
-
-stable_candidates = [n for n in N_LIST if avg_pdr.get(n, 0.0) >= 0.95]
-marginal_candidates = [n for n in N_LIST if 0.90 <= avg_pdr.get(n, 0.0) < 0.95]
-
-stable_n = max(stable_candidates) if stable_candidates else N_LIST[0]
-if marginal_candidates:
-    marginal_n = max(marginal_candidates)
-else:
-    try:
-        stable_idx = N_LIST.index(stable_n)
-        marginal_n = N_LIST[min(stable_idx + 1, len(N_LIST) - 1)]
-    except ValueError:
-        marginal_n = stable_n
-
-print(f"{stable_n} {marginal_n}")
-PY
+  python3 "$ROOT_DIR/tools/python/collapse.py" stage2-n --summary "$SUMMARY"
 )
 
 STAGE="stage2"
@@ -70,6 +31,7 @@ SEND_INTERVAL_S="${SEND_INTERVAL_S:-10}"
 total=$(( ${#MODE_LIST[@]} * ${#N_LIST[@]} * ${#SUCCESS_LIST[@]} * ${#INTERFERENCE_LIST[@]} * ${#SEEDS[@]} ))
 count=0
 export SKIP_THRESHOLDS=1
+export SKIP_SUMMARY_EXPORT=1
 
 for mode in "${MODE_LIST[@]}"; do
   for n in "${N_LIST[@]}"; do
@@ -93,8 +55,20 @@ for mode in "${MODE_LIST[@]}"; do
   done
  done
 
-Rscript "$ROOT_DIR/tools/R/find_thresholds.R" \
+TIMINGS="$ROOT_DIR/results/.stage2.timings.jsonl"
+rm -f "$TIMINGS"
+python3 "$ROOT_DIR/tools/python/timings.py" run --out "$TIMINGS" --phase export -- \
+  python3 "$ROOT_DIR/tools/python/results_store.py" export \
+  --summary "$ROOT_DIR/results/summary.csv"
+
+python3 "$ROOT_DIR/tools/python/timings.py" run --out "$TIMINGS" --phase thresholds -- \
+  python3 "$ROOT_DIR/tools/python/collapse.py" thresholds \
   --summary "$ROOT_DIR/results/summary.csv" \
   --out "$ROOT_DIR/results/thresholds.csv" || true
 
+python3 "$ROOT_DIR/tools/python/timings.py" record \
+  --timings "$TIMINGS" \
+  --summary "$ROOT_DIR/results/summary.csv" \
+  --stage "stage2" || true
+
 printf "Stage2 sweep complete. Summary: %s/results/summary.csv\n" "$ROOT_DIR"
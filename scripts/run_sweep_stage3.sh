@@ -11,45 +11,7 @@ if [ ! -f "$SUMMARY" ]; then
 fi
 
 read -r SELECTED_N SELECTED_SUCCESS SELECTED_INTERFERENCE < <(
-  python3 - <<'PY'
-import csv
-import os
-from collections import defaultdict
-
-root_dir = os.environ.get("ROOT_DIR", ".")
-summary_path = os.path.join(root_dir, "results", "summary.csv")
-
-rows = []
-with open(summary_path, newline="", encoding="utf-8") as handle:
-    reader = csv.DictReader(handle)
-    rows = [r for r in reader if r.get("stage") == "stage2" and r.get("mode") == "rpl-lite"]
-
-cond_map = defaultdict(list)
-for row in rows:
-    try:
-        n = int(row["n_senders"])
-        success = float(row["success_ratio"])
-        interference = float(row["interference_ratio"])
-        pdr = float(row["pdr"])
-    except (ValueError, KeyError):
-        continue
-    cond_map[(n, success, interference)].append(pdr)
-
-if not cond_map:
-    print("0 1.0 1.0")
-    raise SystemExit(0)
-
-avg_pdr = {k: sum(v) / len(v) for k, v in cond_map.items()}
-
-in_range = {k: v for k, v in avg_pdr.items() if 0.85 <= v <= 0.92}
-if in_range:
-    selected = min(in_range.items(), key=lambda kv: abs(kv[1] - 0.90))[0]
-else:
-    selected = min(avg_pdr.items(), key=lambda kv: abs(kv[1] - 0.90))[0]
-
-n, success, interference = selected
-print(f"{n} {success} {interference}")
-PY
+  python3 "$ROOT_DIR/tools/python/collapse.py" stage3-condition --summary "$SUMMARY"
 )
 
 STAGE="stage3"
@@ -60,6 +22,7 @@ SEND_INTERVAL_LIST=(20 10 5 2)
 total=$(( ${#MODE_LIST[@]} * ${#SEND_INTERVAL_LIST[@]} * ${#SEEDS[@]} ))
 count=0
 export SKIP_THRESHOLDS=1
+export SKIP_SUMMARY_EXPORT=1
 
 for mode in "${MODE_LIST[@]}"; do
   for interval in "${SEND_INTERVAL_LIST[@]}"; do
@@ -79,8 +42,20 @@ for mode in "${MODE_LIST[@]}"; do
   done
  done
 
-Rscript "$ROOT_DIR/tools/R/find_thresholds.R" \
+TIMINGS="$ROOT_DIR/results/.stage3.timings.jsonl"
+rm -f "$TIMINGS"
+python3 "$ROOT_DIR/tools/python/timings.py" run --out "$TIMINGS" --phase export -- \
+  python3 "$ROOT_DIR/tools/python/results_store.py" export \
+  --summary "$ROOT_DIR/results/summary.csv"
+
+python3 "$ROOT_DIR/tools/python/timings.py" run --out "$TIMINGS" --phase thresholds -- \
+  python3 "$ROOT_DIR/tools/python/collapse.py" thresholds \
   --summary "$ROOT_DIR/results/summary.csv" \
   --out "$ROOT_DIR/results/thresholds.csv" || true
 
+python3 "$ROOT_DIR/tools/python/timings.py" record \
+  --timings "$TIMINGS" \
+  --summary "$ROOT_DIR/results/summary.csv" \
+  --stage "stage3" || true
+
 printf "Stage3 sweep complete. Summary: %s/results/summary.csv\n" "$ROOT_DIR"
@@ -2,35 +2,78 @@
 """Generate a Cooja .csc for a root + N senders experiment.
 
 This keeps CLI reproducibility by fixing positions and simulation timing.
+Layouts and the connectivity precheck live in topology.py; the .csc is
+streamed out mote by mote so 1000-node scenarios stay cheap to write.
+Send interval and warmup go into each mote's EEPROM (motes/mote-config.h),
+so one firmware per routing stack serves every interval, per-node rates
+included.
 """
 
 from __future__ import annotations
 
 import argparse
-import math
+import base64
+import json
+import os
+import struct
+import sys
 from pathlib import Path
+from typing import TextIO
+from xml.sax.saxutils import escape
 
-EEPROM_B64 = (
-    "AAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAA"
-    "AAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAA"
-    "AAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAA"
-    "AAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAA"
-    "AAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAA"
-    "AAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAA"
-    "AAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAA"
-    "AAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAA"
-    "AAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAA"
-    "AAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAA"
-    "AAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAA"
-    "AAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAA"
-    "AAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAA"
-    "AAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAA"
-    "AAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAA"
-    "AAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAA=="
-)
-
-
-def mote_block(mote_id: int, x: float, y: float, mote_type: str) -> str:
+from topology import LAYOUTS, TopologyError, build_topology, check_topology, write_topology_csv
+
+MOTE_INTERFACES = [
+    "org.contikios.cooja.interfaces.Position",
+    "org.contikios.cooja.interfaces.Battery",
+    "org.contikios.cooja.contikimote.interfaces.ContikiVib",
+    "org.contikios.cooja.contikimote.interfaces.ContikiMoteID",
+    "org.contikios.cooja.contikimote.interfaces.ContikiRS232",
+    "org.contikios.cooja.contikimote.interfaces.ContikiBeeper",
+    "org.contikios.cooja.interfaces.RimeAddress",
+    "org.contikios.cooja.contikimote.interfaces.ContikiIPAddress",
+    "org.contikios.cooja.contikimote.interfaces.ContikiRadio",
+    "org.contikios.cooja.contikimote.interfaces.ContikiButton",
+    "org.contikios.cooja.contikimote.interfaces.ContikiPIR",
+    "org.contikios.cooja.contikimote.interfaces.ContikiClock",
+    "org.contikios.cooja.contikimote.interfaces.ContikiLED",
+    "org.contikios.cooja.contikimote.interfaces.ContikiCFS",
+    "org.contikios.cooja.contikimote.interfaces.ContikiEEPROM",
+    "org.contikios.cooja.interfaces.Mote2MoteRelations",
+    "org.contikios.cooja.interfaces.MoteAttributes",
+]
+# motes/mote-config.h: magic, send interval (ms, u32), warmup (s, u16), little-endian.
+EEPROM_MAGIC = b"RBC1"
+EEPROM_FORMAT = "<IH"
+
+
+def eeprom_config(send_interval_s: float, warmup_s: int) -> str:
+    """Base64 <eeprom> contents read by mote_config_load() at boot."""
+    interval_ms = round(send_interval_s * 1000)
+    if not 0 < interval_ms < 2**32:
+        raise ValueError(f"send interval out of range: {send_interval_s}")
+    if not 0 <= warmup_s < 2**16:
+        raise ValueError(f"warmup out of range: {warmup_s}")
+    data = EEPROM_MAGIC + struct.pack(EEPROM_FORMAT, interval_ms, warmup_s)
+    return base64.b64encode(data).decode("ascii")
+
+
+def parse_node_intervals(values: list[str]) -> dict[int, float]:
+    """`ID=SECONDS` overrides of the send interval for single senders."""
+    intervals = {}
+    for value in values:
+        mote_id, sep, seconds = value.partition("=")
+        try:
+            if not sep:
+                raise ValueError
+            intervals[int(mote_id)] = float(seconds)
+        except ValueError:
+            raise ValueError(f"expected ID=SECONDS, got {value!r}") from None
+    return intervals
+
+
+def mote_block(mote_id: int, x: float, y: float, mote_type: str, eeprom: str) -> str:
+    # Only the config header is given; Cooja zero-fills the rest of the EEPROM.
     return f"""    <mote>
       <interface_config>
         org.contikios.cooja.interfaces.Position
@@ -48,59 +91,40 @@ def mote_block(mote_id: int, x: float, y: float, mote_type: str) -> str:
       </interface_config>
       <interface_config>
         org.contikios.cooja.contikimote.interfaces.ContikiEEPROM
-        <eeprom>{EEPROM_B64}</eeprom>
+        <eeprom>{eeprom}</eeprom>
       </interface_config>
       <motetype_identifier>{mote_type}</motetype_identifier>
     </mote>
 """
 
 
-def generate_positions(count: int, spacing: float, start_x: float, start_y: float) -> list[tuple[float, float]]:
-    if count <= 0:
-        return []
-    cols = int(math.ceil(math.sqrt(count)))
-    rows = int(math.ceil(count / cols))
-    positions: list[tuple[float, float]] = []
-    for r in range(rows):
-        for c in range(cols):
-            if len(positions) >= count:
-                break
-            x = start_x + c * spacing
-            y = start_y + r * spacing
-            positions.append((x, y))
-    return positions
-
-
-def main() -> int:
-    parser = argparse.ArgumentParser(description="Generate .csc for rpl-benchmark experiments")
-    parser.add_argument("--root-dir", required=True, help="Absolute path to rpl-benchmark")
-    parser.add_argument("--senders", type=int, default=3, help="Number of sender motes")
-    parser.add_argument("--seed", type=int, default=1, help="Cooja random seed")
-    parser.add_argument("--make-routing", default="MAKE_ROUTING_RPL_LITE", help="MAKE_ROUTING value")
-    parser.add_argument("--send-interval", type=int, default=10, help="Sender interval seconds")
-    parser.add_argument("--sim-time-ms", type=int, default=600000, help="Simulation time in ms")
-    parser.add_argument("--tx-range", type=float, default=60.0, help="UDGM transmit range")
-    parser.add_argument("--int-range", type=float, default=100.0, help="UDGM interference range")
-    parser.add_argument("--success-tx", type=float, default=1.0, help="UDGM success_ratio_tx")
-    parser.add_argument("--success-rx", type=float, default=1.0, help="UDGM success_ratio_rx")
-    parser.add_argument("--brpl", action="store_true", help="Enable BRPL mode")
-    parser.add_argument("--out", required=True, help="Output .csc path")
-    args = parser.parse_args()
-
-    root_dir = Path(args.root_dir).resolve()
-    sim_time_ms = args.sim_time_ms
-
-    positions = generate_positions(args.senders, spacing=25.0, start_x=60.0, start_y=40.0)
-
-    motes = []
-    motes.append(mote_block(1, 30.0, 60.0, "root"))
-    for idx, (x, y) in enumerate(positions, start=2):
-        motes.append(mote_block(idx, x, y, "sender"))
+def motetype_block(identifier: str, description: str, source: Path, firmware: str) -> str:
+    interfaces = "".join(f"      <moteinterface>{name}</moteinterface>\n" for name in MOTE_INTERFACES)
+    return f"""    <motetype>
+      org.contikios.cooja.contikimote.ContikiMoteType
+      <identifier>{identifier}</identifier>
+      <description>{description}</description>
+      <source>{source}</source>
+      {firmware}
+{interfaces}    </motetype>
+"""
 
-    motes_block = "".join(motes)
 
+def script_text(sim_time_ms: int, testlog: str | None) -> str:
     # Script format matching working brpl_minimal.csc
-    script = (
+    if testlog:
+        testlog_path = escape(json.dumps(str(Path(testlog).resolve())))
+        return (
+            f"TIMEOUT({sim_time_ms}, log.testOK());&#xD;\n"
+            f"var testlog = new java.io.PrintWriter(new java.io.FileWriter({testlog_path}), true);&#xD;\n"
+            "testlog.println(\"Simulation started\");&#xD;\n"
+            "&#xD;\n"
+            "while(true) {&#xD;\n"
+            "  testlog.println(time + \" \" + id + \" \" + msg);&#xD;\n"
+            "  YIELD();&#xD;\n"
+            "}&#xD;\n"
+        )
+    return (
         f"TIMEOUT({sim_time_ms}, log.testOK());&#xD;\n"
         "log.log(\"Simulation started\\n\");&#xD;\n"
         "&#xD;\n"
@@ -110,13 +134,30 @@ def main() -> int:
         "}&#xD;\n"
     )
 
-    defines = f"SEND_INTERVAL_SECONDS={args.send_interval}"
-    if args.brpl:
-        defines += " BRPL_MODE=1"
+
+def write_csc(
+    out: TextIO,
+    args: argparse.Namespace,
+    motes: list[tuple[int, float, float, str]],
+    node_intervals: dict[int, float],
+) -> None:
+    root_dir = Path(args.root_dir).resolve()
+
+    # Interval and warmup are runtime config, so only the routing variant is built in.
+    defines = "BRPL_MODE=1" if args.brpl else ""
 
     defines_arg = defines.replace(" ", ",") if defines else ""
+    build_arg = f" BUILD_DIR={Path(args.build_root).resolve()}" if args.build_root else ""
+
+    def firmware_xml(name: str) -> str:
+        if args.firmware_dir:
+            return f"<firmware>{Path(args.firmware_dir).resolve() / f'{name}.cooja'}</firmware>"
+        return (
+            f"<commands>make -C {root_dir} {name}.cooja TARGET=cooja "
+            f"MAKE_ROUTING={args.make_routing} DEFINES={defines_arg}{build_arg}</commands>"
+        )
 
-    csc = f"""<?xml version=\"1.0\" encoding=\"UTF-8\"?>
+    out.write(f"""<?xml version=\"1.0\" encoding=\"UTF-8\"?>
 <simconf>
   <simulation>
     <title>rpl-benchmark stress RPL + UDP</title>
@@ -132,59 +173,20 @@ def main() -> int:
     <events>
       <logoutput>40000</logoutput>
     </events>
-    <motetype>
-      org.contikios.cooja.contikimote.ContikiMoteType
-      <identifier>root</identifier>
-      <description>Receiver Root</description>
-      <source>{root_dir}/motes/receiver_root.c</source>
-      <commands>make -C {root_dir} receiver_root.cooja TARGET=cooja MAKE_ROUTING={args.make_routing} DEFINES={defines_arg}</commands>
-      <moteinterface>org.contikios.cooja.interfaces.Position</moteinterface>
-      <moteinterface>org.contikios.cooja.interfaces.Battery</moteinterface>
-      <moteinterface>org.contikios.cooja.contikimote.interfaces.ContikiVib</moteinterface>
-      <moteinterface>org.contikios.cooja.contikimote.interfaces.ContikiMoteID</moteinterface>
-      <moteinterface>org.contikios.cooja.contikimote.interfaces.ContikiRS232</moteinterface>
-      <moteinterface>org.contikios.cooja.contikimote.interfaces.ContikiBeeper</moteinterface>
-      <moteinterface>org.contikios.cooja.interfaces.RimeAddress</moteinterface>
-      <moteinterface>org.contikios.cooja.contikimote.interfaces.ContikiIPAddress</moteinterface>
-      <moteinterface>org.contikios.cooja.contikimote.interfaces.ContikiRadio</moteinterface>
-      <moteinterface>org.contikios.cooja.contikimote.interfaces.ContikiButton</moteinterface>
-      <moteinterface>org.contikios.cooja.contikimote.interfaces.ContikiPIR</moteinterface>
-      <moteinterface>org.contikios.cooja.contikimote.interfaces.ContikiClock</moteinterface>
-      <moteinterface>org.contikios.cooja.contikimote.interfaces.ContikiLED</moteinterface>
-      <moteinterface>org.contikios.cooja.contikimote.interfaces.ContikiCFS</moteinterface>
-      <moteinterface>org.contikios.cooja.contikimote.interfaces.ContikiEEPROM</moteinterface>
-      <moteinterface>org.contikios.cooja.interfaces.Mote2MoteRelations</moteinterface>
-      <moteinterface>org.contikios.cooja.interfaces.MoteAttributes</moteinterface>
-    </motetype>
-    <motetype>
-      org.contikios.cooja.contikimote.ContikiMoteType
-      <identifier>sender</identifier>
-      <description>Sensor Sender</description>
-      <source>{root_dir}/motes/sender.c</source>
-      <commands>make -C {root_dir} sender.cooja TARGET=cooja MAKE_ROUTING={args.make_routing} DEFINES={defines_arg}</commands>
-      <moteinterface>org.contikios.cooja.interfaces.Position</moteinterface>
-      <moteinterface>org.contikios.cooja.interfaces.Battery</moteinterface>
-      <moteinterface>org.contikios.cooja.contikimote.interfaces.ContikiVib</moteinterface>
-      <moteinterface>org.contikios.cooja.contikimote.interfaces.ContikiMoteID</moteinterface>
-      <moteinterface>org.contikios.cooja.contikimote.interfaces.ContikiRS232</moteinterface>
-      <moteinterface>org.contikios.cooja.contikimote.interfaces.ContikiBeeper</moteinterface>
-      <moteinterface>org.contikios.cooja.interfaces.RimeAddress</moteinterface>
-      <moteinterface>org.contikios.cooja.contikimote.interfaces.ContikiIPAddress</moteinterface>
-      <moteinterface>org.contikios.cooja.contikimote.interfaces.ContikiRadio</moteinterface>
-      <moteinterface>org.contikios.cooja.contikimote.interfaces.ContikiButton</moteinterface>
-      <moteinterface>org.contikios.cooja.contikimote.interfaces.ContikiPIR</moteinterface>
-      <moteinterface>org.contikios.cooja.contikimote.interfaces.ContikiClock</moteinterface>
-      <moteinterface>org.contikios.cooja.contikimote.interfaces.ContikiLED</moteinterface>
-      <moteinterface>org.contikios.cooja.contikimote.interfaces.ContikiCFS</moteinterface>
-      <moteinterface>org.contikios.cooja.contikimote.interfaces.ContikiEEPROM</moteinterface>
-      <moteinterface>org.contikios.cooja.interfaces.Mote2MoteRelations</moteinterface>
-      <moteinterface>org.contikios.cooja.interfaces.MoteAttributes</moteinterface>
-    </motetype>
-{motes_block}  </simulation>
+""")
+    out.write(motetype_block("root", "Receiver Root", root_dir / "motes" / "receiver_root.c", firmware_xml("receiver_root")))
+    out.write(motetype_block("sender", "Sensor Sender", root_dir / "motes" / "sender.c", firmware_xml("sender")))
+    eeproms: dict[float, str] = {}
+    for mote_id, x, y, mote_type in motes:
+        interval = node_intervals.get(mote_id, args.send_interval)
+        if interval not in eeproms:
+            eeproms[interval] = eeprom_config(interval, args.warmup_s)
+        out.write(mote_block(mote_id, x, y, mote_type, eeproms[interval]))
+    out.write(f"""  </simulation>
   <plugin>
     org.contikios.cooja.plugins.ScriptRunner
     <plugin_config>
-      <script>{script}</script>
+      <script>{script_text(args.sim_time_ms, args.testlog)}</script>
       <active>true</active>
     </plugin_config>
     <width>600</width>
@@ -194,10 +196,81 @@ def main() -> int:
     <location_y>0</location_y>
   </plugin>
 </simconf>
-"""
+""")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Generate .csc for rpl-benchmark experiments")
+    parser.add_argument("--root-dir", required=True, help="Absolute path to rpl-benchmark")
+    parser.add_argument("--senders", type=int, default=3, help="Number of sender motes")
+    parser.add_argument("--seed", type=int, default=1, help="Cooja random seed")
+    parser.add_argument("--make-routing", default="MAKE_ROUTING_RPL_LITE", help="MAKE_ROUTING value")
+    parser.add_argument("--send-interval", type=float, default=10.0, help="Sender interval seconds")
+    parser.add_argument(
+        "--node-interval",
+        action="append",
+        default=[],
+        metavar="ID=SECONDS",
+        help="Send interval of one sender mote (repeatable; others use --send-interval)",
+    )
+    parser.add_argument("--warmup-s", type=int, default=60, help="Sender warmup seconds before the first send")
+    parser.add_argument("--sim-time-ms", type=int, default=600000, help="Simulation time in ms")
+    parser.add_argument("--tx-range", type=float, default=60.0, help="UDGM transmit range")
+    parser.add_argument("--int-range", type=float, default=100.0, help="UDGM interference range")
+    parser.add_argument("--success-tx", type=float, default=1.0, help="UDGM success_ratio_tx")
+    parser.add_argument("--success-rx", type=float, default=1.0, help="UDGM success_ratio_rx")
+    parser.add_argument("--brpl", action="store_true", help="Enable BRPL mode")
+    parser.add_argument("--build-root", help="Contiki BUILD_DIR used by the mote type commands")
+    parser.add_argument(
+        "--firmware-dir",
+        help="Prebuilt firmware dir (firmware_cache.py); replaces the make commands",
+    )
+    parser.add_argument(
+        "--testlog",
+        help="Scenario log written by the script itself (instead of the shared COOJA.testlog)",
+    )
+    parser.add_argument("--layout", choices=LAYOUTS, default="grid", help="Mote layout")
+    parser.add_argument("--layout-seed", type=int, help="Layout seed (default: --seed)")
+    parser.add_argument("--spacing", type=float, default=25.0, help="Mean node spacing (m)")
+    parser.add_argument("--roots", type=int, default=1, help="Root motes (multiroot layout)")
+    parser.add_argument("--clusters", type=int, default=0, help="Cluster count (0: sqrt(N)/2)")
+    parser.add_argument("--corridor-width", type=float, default=20.0, help="Line layout width (m)")
+    parser.add_argument("--max-hops", type=int, default=16, help="Reject deeper layouts (0 disables)")
+    parser.add_argument("--topology-out", help="Optional per-mote CSV (id, role, x, y, hops)")
+    parser.add_argument("--out", required=True, help="Output .csc path")
+    args = parser.parse_args()
+    if args.roots != 1 and args.layout != "multiroot":
+        parser.error("--roots only applies to --layout multiroot")
+    try:
+        node_intervals = parse_node_intervals(args.node_interval)
+        eeprom_config(args.send_interval, args.warmup_s)
+        for interval in node_intervals.values():
+            eeprom_config(interval, args.warmup_s)
+    except ValueError as exc:
+        parser.error(str(exc))
+
+    layout_seed = args.seed if args.layout_seed is None else args.layout_seed
+    topology = build_topology(
+        args.layout, args.senders, layout_seed, args.spacing, args.roots, args.clusters, args.corridor_width
+    )
+    # Reject before any Cooja time is spent on a network that cannot work.
+    try:
+        hops = check_topology(topology, args.tx_range, args.max_hops)
+    except TopologyError as exc:
+        print(f"topology rejected: {exc}", file=sys.stderr)
+        return 3
+    senders = {mote_id for mote_id, _, _, mote_type in topology.motes() if mote_type == "sender"}
+    unknown = sorted(set(node_intervals) - senders)
+    if unknown:
+        parser.error(f"--node-interval for motes that are not senders: {unknown}")
+    if args.topology_out:
+        write_topology_csv(Path(args.topology_out), topology, hops)
 
     out_path = Path(args.out)
-    out_path.write_text(csc)
+    tmp_path = out_path.with_name(f".{out_path.name}.{os.getpid()}.tmp")
+    with tmp_path.open("w", encoding="utf-8") as out:
+        write_csc(out, args, topology.motes(), node_intervals)
+    os.replace(tmp_path, out_path)
     return 0
 
 
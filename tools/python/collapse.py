@@ -0,0 +1,370 @@
+#!/usr/bin/env python3
+"""Collapse rules and incremental per-condition aggregates (mirrors find_thresholds.R).
+
+`CollapseTracker.add` folds one summary row into its condition in O(1) and
+keeps the first collapsed condition per mode/stage current, so drivers can
+update it as runs land instead of re-aggregating the whole summary. The
+Stage 2/3 input selection and thresholds.csv are derived from the same state.
+"""
+
+from __future__ import annotations
+
+import argparse
+import math
+import os
+import statistics
+import sys
+from collections import defaultdict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Iterable
+
+from results_store import default_store_path, open_store
+
+PDR_TH = 0.90
+AVG_RTT_TH_MS = 5000.0
+P95_RTT_TH_MS = 8000.0
+COLLAPSE_FRACTION_TH = 2 / 3
+STAGE1_N_LIST = [5, 10, 15, 20, 25, 30, 40, 50]
+THRESHOLD_FIELDS = [
+    "mode",
+    "stage",
+    "threshold_found",
+    "threshold_index",
+    "threshold_condition",
+    "pdr_med",
+    "rtt_med_ms",
+    "overhead_med",
+    "collapse_frac",
+]
+# Runs that never finished (crash, wall-clock timeout, stalled JVM): their
+# partial window is not a measurement, so they are left out (FAILED_STATUSES in the R scripts).
+FAILED_STATUSES = {"failed", "timeout", "early_stalled"}
+# Columns R's write.csv(quote = TRUE) writes in quotes.
+QUOTED_FIELDS = {"mode", "stage", "threshold_condition"}
+
+ConditionKey = tuple[str, str, int, float, float, float]
+
+
+def to_float(value: str | None) -> float | None:
+    if value is None or value == "" or value == "NA":
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+def run_failed(row: dict[str, str]) -> bool:
+    return str(row.get("run_status", "")) in FAILED_STATUSES
+
+
+def run_collapsed(row: dict[str, str]) -> bool:
+    """Per-run verdict: invalid run, PDR below threshold, or RTT above threshold."""
+    if str(row.get("invalid_run", "0")) == "1":
+        return True
+    pdr = to_float(row.get("pdr"))
+    if pdr is not None and pdr < PDR_TH:
+        return True
+    p95 = to_float(row.get("p95_rtt_ms"))
+    if p95 is not None:
+        return p95 > P95_RTT_TH_MS
+    avg = to_float(row.get("avg_rtt_ms"))
+    return avg is not None and avg > AVG_RTT_TH_MS
+
+
+def run_overhead(row: dict[str, str]) -> float | None:
+    """Control packets sent (`ctrl_tx`); summaries without it fall back to the DIO+DAO line counts."""
+    ctrl_tx = to_float(row.get("ctrl_tx"))
+    if ctrl_tx is not None:
+        return ctrl_tx
+    dio, dao = to_float(row.get("dio_count")), to_float(row.get("dao_count"))
+    return dio + dao if dio is not None and dao is not None else None
+
+
+def condition_collapsed(rows: list[dict[str, str]]) -> bool:
+    """Condition verdict: at least COLLAPSE_FRACTION_TH of its seeds collapsed."""
+    if not rows:
+        return False
+    collapse_count = sum(1 for row in rows if run_collapsed(row))
+    return collapse_count / len(rows) >= COLLAPSE_FRACTION_TH
+
+
+def condition_key(row: dict[str, str]) -> ConditionKey | None:
+    try:
+        return (
+            row["mode"],
+            row["stage"],
+            int(float(row["n_senders"])),
+            float(row["success_ratio"]),
+            float(row["interference_ratio"]),
+            float(row["send_interval_s"]),
+        )
+    except (KeyError, ValueError):
+        return None
+
+
+def stage_order(key: ConditionKey) -> tuple:
+    """Least to most stressful along the stage axis (order_key in find_thresholds.R)."""
+    _, stage, n, success, interference, interval = key
+    if stage == "stage1":
+        return (n,)
+    if stage == "stage2":
+        return (-success, -interference, n, interval)
+    if stage == "stage3":
+        return (n, success, interference, -interval)
+    return (n, success, interference, interval)
+
+
+def _median(values: Iterable[float | None]) -> float | None:
+    present = [value for value in values if value is not None and not math.isnan(value)]
+    return statistics.median(present) if present else None
+
+
+@dataclass
+class Condition:
+    """All seeds of one (mode, stage, N, sr, ir, si) with running counters."""
+
+    key: ConditionKey
+    runs: dict[str, dict[str, str]] = field(default_factory=dict)
+    collapse_count: int = 0
+    pdr_sum: float = 0.0
+    pdr_count: int = 0
+
+    def _apply(self, row: dict[str, str], sign: int) -> None:
+        self.collapse_count += sign * run_collapsed(row)
+        pdr = to_float(row.get("pdr"))
+        if pdr is not None:
+            self.pdr_sum += sign * pdr
+            self.pdr_count += sign
+
+    def add(self, row: dict[str, str]) -> None:
+        seed = str(row.get("seed", ""))
+        previous = self.runs.get(seed)
+        if previous is not None:
+            self._apply(previous, -1)
+        self.runs[seed] = row
+        self._apply(row, 1)
+
+    def discard(self, seed: str) -> None:
+        previous = self.runs.pop(seed, None)
+        if previous is not None:
+            self._apply(previous, -1)
+
+    @property
+    def seeds(self) -> int:
+        return len(self.runs)
+
+    @property
+    def collapse_frac(self) -> float | None:
+        return self.collapse_count / self.seeds if self.seeds else None
+
+    @property
+    def collapsed(self) -> bool:
+        frac = self.collapse_frac
+        return frac is not None and frac >= COLLAPSE_FRACTION_TH
+
+    @property
+    def mean_pdr(self) -> float | None:
+        return self.pdr_sum / self.pdr_count if self.pdr_count else None
+
+    def median(self, name: str) -> float | None:
+        if name == "overhead":
+            return _median(run_overhead(row) for row in self.runs.values())
+        return _median(to_float(row.get(name)) for row in self.runs.values())
+
+
+class CollapseTracker:
+    """Per-condition aggregates plus the first collapse per mode/stage, updated per run."""
+
+    def __init__(self) -> None:
+        self.conditions: dict[ConditionKey, Condition] = {}
+        self._collapsed: dict[tuple[str, str], set[ConditionKey]] = defaultdict(set)
+        self._first: dict[tuple[str, str], ConditionKey | None] = {}
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[dict[str, str]]) -> "CollapseTracker":
+        tracker = cls()
+        for row in rows:
+            tracker.add(row)
+        return tracker
+
+    def __len__(self) -> int:
+        return len(self.conditions)
+
+    def add(self, row: dict[str, str]) -> bool:
+        """Fold one run in (replacing an earlier row of the same seed); True if the verdict flipped.
+
+        A failed run only drops the earlier row of its seed, which it replaced in the store.
+        """
+        key = condition_key(row)
+        if key is None:
+            return False
+        cond = self.conditions.get(key)
+        failed = run_failed(row)
+        if cond is None:
+            if failed:
+                return False
+            cond = self.conditions[key] = Condition(key)
+        group = key[:2]
+        collapsed = self._collapsed[group]
+        self._first.setdefault(group, None)
+        was = key in collapsed
+        if failed:
+            cond.discard(str(row.get("seed", "")))
+            if not cond.runs:
+                del self.conditions[key]
+        else:
+            cond.add(row)
+        now = cond.collapsed
+        if now and not was:
+            collapsed.add(key)
+            first = self._first[group]
+            if first is None or stage_order(key) < stage_order(first):
+                self._first[group] = key
+        elif was and not now:
+            collapsed.discard(key)
+            if self._first[group] == key:
+                self._first[group] = min(collapsed, key=stage_order) if collapsed else None
+        return now != was
+
+    def condition(self, key: ConditionKey) -> Condition | None:
+        return self.conditions.get(key)
+
+    def first_collapse(self, mode: str, stage: str) -> Condition | None:
+        key = self._first.get((mode, stage))
+        return self.conditions[key] if key is not None else None
+
+    def mean_pdr_by(self, mode: str, stage: str, project) -> dict:
+        """Seed-weighted mean PDR of the conditions of mode/stage grouped by `project(key)`.
+
+        Groups come back sorted so ties resolve the same however the runs landed.
+        """
+        sums: dict = defaultdict(float)
+        counts: dict = defaultdict(int)
+        for key, cond in self.conditions.items():
+            if key[0] != mode or key[1] != stage or not cond.pdr_count:
+                continue
+            sums[project(key)] += cond.pdr_sum
+            counts[project(key)] += cond.pdr_count
+        return {group: sums[group] / counts[group] for group in sorted(sums)}
+
+    def threshold_rows(self) -> list[dict[str, object]]:
+        rows = []
+        for mode, stage in sorted(self._first, key=lambda group: f"{group[0]}|{group[1]}"):
+            row: dict[str, object] = {"mode": mode, "stage": stage, "threshold_found": False}
+            first = self.first_collapse(mode, stage)
+            if first is not None:
+                order = stage_order(first.key)
+                index = 1 + sum(
+                    1 for key in self.conditions
+                    if key[:2] == (mode, stage) and stage_order(key) < order
+                )
+                _, _, n, success, interference, interval = first.key
+                p95 = first.median("p95_rtt_ms")
+                row.update(
+                    threshold_found=True,
+                    threshold_index=index,
+                    threshold_condition=(
+                        f"N={_r_num(n)}, sr={_r_num(success)}, ir={_r_num(interference)}, si={_r_num(interval)}"
+                    ),
+                    pdr_med=first.median("pdr"),
+                    rtt_med_ms=p95 if p95 is not None else first.median("avg_rtt_ms"),
+                    overhead_med=first.median("overhead"),
+                    collapse_frac=first.collapse_frac,
+                )
+            rows.append(row)
+        return rows
+
+    def write_thresholds(self, path: Path) -> int:
+        """thresholds.csv in the layout find_thresholds.R writes (write.csv, quote = TRUE)."""
+        rows = self.threshold_rows()
+        tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        with tmp_path.open("w", encoding="utf-8") as handle:
+            handle.write(",".join(f'"{name}"' for name in THRESHOLD_FIELDS) + "\n")
+            for row in rows:
+                handle.write(",".join(_r_cell(name, row.get(name)) for name in THRESHOLD_FIELDS) + "\n")
+        os.replace(tmp_path, path)
+        return len(rows)
+
+
+def _r_num(value: float | int) -> str:
+    # R prints numbers with 15 significant digits and no trailing ".0".
+    return f"{value:.15g}"
+
+
+def _r_cell(name: str, value: object) -> str:
+    if value is None:
+        return "NA"
+    if isinstance(value, bool):
+        return "TRUE" if value else "FALSE"
+    if isinstance(value, (int, float)):
+        return _r_num(value)
+    text = str(value).replace('"', '""')
+    return f'"{text}"' if name in QUOTED_FIELDS else text
+
+
+def select_stage2_n(tracker: CollapseTracker, n_list: list[int] = STAGE1_N_LIST) -> tuple[int, int]:
+    """Stable/marginal N from the Stage 1 rpl-lite conditions."""
+    avg_pdr = tracker.mean_pdr_by("rpl-lite", "stage1", lambda key: key[2])
+    stable_candidates = [n for n in n_list if avg_pdr.get(n, 0.0) >= 0.95]
+    marginal_candidates = [n for n in n_list if 0.90 <= avg_pdr.get(n, 0.0) < 0.95]
+
+    stable_n = max(stable_candidates) if stable_candidates else n_list[0]
+    if marginal_candidates:
+        marginal_n = max(marginal_candidates)
+    else:
+        stable_idx = n_list.index(stable_n)
+        marginal_n = n_list[min(stable_idx + 1, len(n_list) - 1)]
+    return stable_n, marginal_n
+
+
+def select_stage3_condition(tracker: CollapseTracker) -> tuple[int, str, str]:
+    """Knee condition (N, sr, ir) from the Stage 2 rpl-lite conditions."""
+    avg_pdr = tracker.mean_pdr_by("rpl-lite", "stage2", lambda key: key[2:5])
+    if not avg_pdr:
+        return 0, "1.0", "1.0"
+    in_range = {k: v for k, v in avg_pdr.items() if 0.85 <= v <= 0.92}
+    candidates = in_range or avg_pdr
+    n, success, interference = min(candidates.items(), key=lambda kv: abs(kv[1] - 0.90))[0]
+    return n, str(success), str(interference)
+
+
+def load_tracker(summary_path: Path, store_path: Path | None = None) -> CollapseTracker:
+    with open_store(store_path or default_store_path(summary_path), summary_path) as store:
+        return CollapseTracker.from_rows(store.rows())
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Collapse thresholds and Stage 2/3 input selection")
+    parser.add_argument(
+        "command",
+        choices=["thresholds", "stage2-n", "stage3-condition"],
+        help="thresholds: write thresholds.csv; stage2-n: print 'STABLE MARGINAL'; "
+        "stage3-condition: print 'N SR IR'",
+    )
+    parser.add_argument("--summary", default="results/summary.csv", help="summary.csv path")
+    parser.add_argument("--store", help="SQLite store path (default: summary path with .db suffix)")
+    parser.add_argument("--out", help="thresholds.csv path (default: next to the summary)")
+    args = parser.parse_args()
+
+    summary_path = Path(args.summary)
+    store_path = Path(args.store) if args.store else None
+    if store_path is None and not summary_path.exists() and not default_store_path(summary_path).exists():
+        print(f"summary not found: {summary_path}", file=sys.stderr)
+        return 1
+    tracker = load_tracker(summary_path, store_path)
+
+    if args.command == "stage2-n":
+        print(*select_stage2_n(tracker))
+    elif args.command == "stage3-condition":
+        print(*select_stage3_condition(tracker))
+    else:
+        out_path = Path(args.out) if args.out else summary_path.with_name("thresholds.csv")
+        tracker.write_thresholds(out_path)
+        print(f"Thresholds written to: {out_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
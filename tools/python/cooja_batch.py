@@ -0,0 +1,239 @@
+"""Run several prepared scenarios in one headless Cooja JVM.
+
+run_experiment.sh --phase prepare builds/looks up the firmware and writes the
+.csc; scenarios sharing a firmware dir are then passed together to a single
+`cooja.jar --no-gui` call, and each one is parsed with --phase parse exactly
+like a standalone run. Every scenario script writes its own log file, so the
+order in which those files appear gives the per-run wall times.
+"""
+
+from __future__ import annotations
+
+import csv
+import os
+import shutil
+import signal
+import subprocess
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TextIO
+
+from log_codec import open_writer, stored_path
+from run_monitor import KILL_GRACE_S, STATUS_FAILED, STATUS_OK, STATUS_TIMEOUT, OutputPump
+from timings import append_phase, proc_peak_rss_kb
+
+POLL_S = 1.0
+TAIL_BYTES = 4096
+TIMING_FIELDS = [
+    "batch_id",
+    "firmware_dir",
+    "scenarios",
+    "batch_wall_s",
+    "startup_s",
+    "run_index",
+    "basename",
+    "run_wall_s",
+    "run_status",
+]
+
+
+@dataclass
+class Scenario:
+    """One prepared run; `args` are the run_experiment.sh arguments."""
+
+    args: list[str]
+    firmware_dir: str
+    csc_path: Path
+    log_path: Path
+    status_path: Path
+    timings_path: Path
+    cooja_jar: str
+    timeout_s: float
+    run_hash: str = ""
+    started_s: float | None = None
+    wall_s: float | None = None
+    status: str = STATUS_FAILED
+
+    @property
+    def basename(self) -> str:
+        return self.csc_path.stem
+
+
+class RunSkipped(Exception):
+    """The run ledger already has this run (RESUME=1)."""
+
+
+@dataclass
+class BatchResult:
+    batch_id: str
+    scenarios: list[Scenario]
+    wall_s: float
+    startup_s: float
+    exit_code: int
+    timings: list[dict[str, str]] = field(default_factory=list)
+
+
+def run_experiment(
+    root_dir: Path,
+    args: list[str],
+    phase: str,
+    env: dict[str, str],
+    log_handle: TextIO,
+) -> subprocess.CompletedProcess:
+    cmd = [str(root_dir / "scripts" / "run_experiment.sh"), *args, "--phase", phase]
+    stdout = subprocess.PIPE if phase == "prepare" else log_handle
+    return subprocess.run(cmd, stdout=stdout, stderr=log_handle, env=env, text=True)
+
+
+def prepare(root_dir: Path, args: list[str], env: dict[str, str], log_handle: TextIO) -> Scenario | None:
+    proc = run_experiment(root_dir, args, "prepare", env, log_handle)
+    if proc.returncode != 0:
+        return None
+    values = dict(line.split("=", 1) for line in proc.stdout.splitlines() if "=" in line)
+    if values.get("RUN_STATE") == "skipped":
+        raise RunSkipped(values.get("RUN_HASH", ""))
+    return Scenario(
+        args=args,
+        firmware_dir=values["FIRMWARE_DIR"],
+        csc_path=Path(values["CSC_PATH"]),
+        log_path=Path(values["LOG_PATH"]),
+        status_path=Path(values["STATUS_PATH"]),
+        timings_path=Path(values["TIMINGS_PATH"]),
+        cooja_jar=values["COOJA_JAR"],
+        timeout_s=float(values["SIM_TIMEOUT_S"]),
+        run_hash=values.get("RUN_HASH", ""),
+    )
+
+
+def last_time_s(log_path: Path) -> float | None:
+    """Simulated time of the last `<time_us> <mote> ...` line in a scenario log."""
+    try:
+        with log_path.open("rb") as handle:
+            handle.seek(0, os.SEEK_END)
+            handle.seek(max(0, handle.tell() - TAIL_BYTES))
+            tail = handle.read().splitlines()
+    except OSError:
+        return None
+    for line in reversed(tail):
+        head = line.split(b" ", 1)[0]
+        if head.isdigit():
+            return int(head) / 1e6
+    return None
+
+
+def group_batches(scenarios: list[Scenario], batch_size: int) -> list[list[Scenario]]:
+    """Split scenarios into batches of at most `batch_size` sharing one firmware dir."""
+    by_firmware: dict[str, list[Scenario]] = defaultdict(list)
+    for scenario in scenarios:
+        by_firmware[scenario.firmware_dir].append(scenario)
+    batches: list[list[Scenario]] = []
+    for group in by_firmware.values():
+        for start in range(0, len(group), max(1, batch_size)):
+            batches.append(group[start:start + batch_size])
+    return batches
+
+
+def run_batch(batch: list[Scenario], batch_id: str, work_dir: Path, compress: str | None = None) -> BatchResult:
+    """Simulate every scenario of `batch` in one Cooja process (stdout through codec `compress`)."""
+    logdir = work_dir / batch_id
+    logdir.mkdir(parents=True, exist_ok=True)
+    timeout_s = sum(scenario.timeout_s for scenario in batch)
+    cmd = [
+        "java", "--enable-preview", "-jar", batch[0].cooja_jar,
+        "--no-gui", "--autostart", "--logdir", str(logdir),
+        *[str(scenario.csc_path) for scenario in batch],
+    ]
+    start = time.monotonic()
+    timed_out = False
+    peak_rss_kb: int | None = None
+    with open_writer(stored_path(work_dir / f"{batch_id}.stdout.log", compress), compress) as stdout_handle:
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, start_new_session=True)
+        pump = OutputPump(proc.stdout, stdout_handle)
+        pump.start()
+        while proc.poll() is None:
+            time.sleep(POLL_S)
+            now = time.monotonic() - start
+            peak_rss_kb = proc_peak_rss_kb(proc.pid) or peak_rss_kb
+            for scenario in batch:
+                if scenario.started_s is None and scenario.log_path.exists():
+                    scenario.started_s = now
+            if now >= timeout_s:
+                timed_out = True
+                os.killpg(proc.pid, signal.SIGTERM)
+                try:
+                    proc.wait(timeout=KILL_GRACE_S)
+                except subprocess.TimeoutExpired:
+                    os.killpg(proc.pid, signal.SIGKILL)
+                    proc.wait()
+        pump.join(timeout=KILL_GRACE_S)
+        proc.stdout.close()
+    wall_s = time.monotonic() - start
+    shutil.rmtree(logdir, ignore_errors=True)
+
+    # Scenarios run in order: one is finished once the next has started.
+    for idx, scenario in enumerate(batch):
+        if scenario.started_s is None and scenario.log_path.exists():
+            scenario.started_s = wall_s
+        following = [s.started_s for s in batch[idx + 1:] if s.started_s is not None]
+        if scenario.started_s is None:
+            scenario.status = STATUS_TIMEOUT if timed_out else STATUS_FAILED
+        elif following:
+            scenario.wall_s = following[0] - scenario.started_s
+            scenario.status = STATUS_OK
+        else:
+            scenario.wall_s = wall_s - scenario.started_s
+            if timed_out:
+                scenario.status = STATUS_TIMEOUT
+            else:
+                scenario.status = STATUS_OK if proc.returncode == 0 else STATUS_FAILED
+        scenario.status_path.write_text(scenario.status + "\n")
+
+    first_start = min((s.started_s for s in batch if s.started_s is not None), default=wall_s)
+    result = BatchResult(batch_id, batch, wall_s, first_start, proc.returncode)
+    for idx, scenario in enumerate(batch):
+        # The one JVM startup is shared evenly by the runs of the batch.
+        exit_code = 0 if scenario.status == STATUS_OK else 1
+        append_phase(scenario.timings_path, "cooja_startup", first_start / len(batch), None, None, exit_code)
+        append_phase(
+            scenario.timings_path,
+            "simulation",
+            scenario.wall_s or 0.0,
+            peak_rss_kb,
+            last_time_s(scenario.log_path),
+            exit_code,
+        )
+        result.timings.append({
+            "batch_id": batch_id,
+            "firmware_dir": scenario.firmware_dir,
+            "scenarios": str(len(batch)),
+            "batch_wall_s": f"{wall_s:.1f}",
+            "startup_s": f"{first_start:.1f}",
+            "run_index": str(idx),
+            "basename": scenario.basename,
+            "run_wall_s": "" if scenario.wall_s is None else f"{scenario.wall_s:.1f}",
+            "run_status": scenario.status,
+        })
+    return result
+
+
+def append_timings(path: Path, rows: list[dict[str, str]]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    is_new = not path.exists()
+    with path.open("a", newline="", encoding="utf-8") as handle:
+        writer = csv.DictWriter(handle, fieldnames=TIMING_FIELDS)
+        if is_new:
+            writer.writeheader()
+        writer.writerows(rows)
+
+
+def describe(result: BatchResult) -> str:
+    run_times = [s.wall_s for s in result.scenarios if s.wall_s is not None]
+    mean_run = sum(run_times) / len(run_times) if run_times else 0.0
+    # Standalone runs would each pay the startup (JVM + mote loading) again.
+    saved = result.startup_s * (len(result.scenarios) - 1)
+    return (
+        f"batch {result.batch_id}: {len(result.scenarios)} runs in {result.wall_s:.0f}s "
+        f"(startup {result.startup_s:.0f}s, mean run {mean_run:.0f}s, ~{saved:.0f}s startup saved)"
+    )
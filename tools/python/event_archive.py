@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""Columnar per-run event archive (`<basename>.events/`) and a lazy sweep loader.
+
+Each run directory holds one `.npy` file per typed column (RTT/RX events and
+the routing/control-plane timelines of `routing_events.py`) plus `meta.json`
+(run key, sender names, interned IPv6 addresses, counters). Columns are opened with `mmap_mode="r"`,
+so reading a sweep touches only the pages that are actually used. The archive
+holds every LogEvents column, so `load_events` rebuilds a run without the
+text log (reanalyze's cache).
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import time
+from array import array
+from pathlib import Path
+from typing import TYPE_CHECKING, Iterator
+
+import numpy as np
+
+from log_codec import plain_path
+from results_store import KEY_FIELDS
+from routing_events import COLUMNS as ROUTING_COLUMNS
+
+if TYPE_CHECKING:
+    from log_ingest import LogEvents
+
+ARCHIVE_SUFFIX = ".events"
+ARCHIVE_VERSION = 3
+COLUMNS: dict[str, str] = {
+    "rtt_time_us": "<i8",
+    "rtt_mote": "<i4",
+    "rtt_seq": "<i8",
+    "rtt_t0": "<i8",
+    "rtt_t_ack": "<i8",
+    "rtt_ticks": "<i8",
+    "rtt_len": "<i4",
+    "rx_time_us": "<i8",
+    "rx_mote": "<i4",
+    "rx_src": "<i4",
+    "rx_seq": "<i8",
+    "rx_t_recv": "<i8",
+    "rx_len": "<i4",
+    **ROUTING_COLUMNS,
+}
+SCALAR_FIELDS = ["dio_count", "dao_count", "lines", "last_time_us"]
+
+
+def archive_dir_for(log_path: Path) -> Path:
+    return plain_path(log_path).with_suffix(ARCHIVE_SUFFIX)
+
+
+def archive_is_current(log_path: Path, archive_dir: Path | None = None) -> bool:
+    meta_path = (archive_dir or archive_dir_for(log_path)) / "meta.json"
+    try:
+        if meta_path.stat().st_mtime_ns < log_path.stat().st_mtime_ns:
+            return False
+        return json.loads(meta_path.read_text()).get("version", 1) >= ARCHIVE_VERSION
+    except (OSError, ValueError):
+        return False
+
+
+def write_archive(events: LogEvents, out_dir: Path, key: dict[str, str]) -> None:
+    """Write all columns into a staging dir and swap it in, so readers never see a partial run."""
+    staging = out_dir.with_name(f".{out_dir.name}.{os.getpid()}.tmp")
+    shutil.rmtree(staging, ignore_errors=True)
+    staging.mkdir(parents=True)
+    for name, dtype in COLUMNS.items():
+        source = events.routing if name in ROUTING_COLUMNS else events
+        np.save(staging / f"{name}.npy", np.frombuffer(getattr(source, name), dtype=np.int64).astype(dtype))
+    meta = {
+        "version": ARCHIVE_VERSION,
+        "key": {name: str(key.get(name, "")) for name in KEY_FIELDS},
+        "src_names": list(events.src_names),
+        "addr_names": list(events.routing.addr_names),
+        **{name: getattr(events, name) for name in SCALAR_FIELDS},
+    }
+    (staging / "meta.json").write_text(json.dumps(meta, indent=1) + "\n")
+    previous = out_dir.with_name(f".{out_dir.name}.{os.getpid()}.old")
+    if out_dir.exists():
+        out_dir.rename(previous)
+    staging.rename(out_dir)
+    shutil.rmtree(previous, ignore_errors=True)
+
+
+def load_events(archive_dir: Path) -> LogEvents:
+    """LogEvents back from an archive, as `ingest` of the original log would return them."""
+    from log_ingest import LogEvents
+
+    run = RunArchive(archive_dir)
+    events = LogEvents(src_names=list(run.src_names))
+    events.routing.addr_names = list(run.meta.get("addr_names", []))
+    for name in COLUMNS:
+        column = array("q")
+        column.frombytes(np.asarray(run[name], dtype=np.int64).tobytes())
+        setattr(events.routing if name in ROUTING_COLUMNS else events, name, column)
+    for name in SCALAR_FIELDS:
+        setattr(events, name, run.meta[name])
+    return events
+
+
+class RunArchive:
+    """One run's columns, memory-mapped on first access."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.meta = json.loads((path / "meta.json").read_text())
+        self._columns: dict[str, np.ndarray] = {}
+
+    @property
+    def key(self) -> dict[str, str]:
+        return self.meta["key"]
+
+    @property
+    def src_names(self) -> list[str]:
+        return self.meta["src_names"]
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        column = self._columns.get(name)
+        if column is None:
+            if name not in COLUMNS:
+                raise KeyError(name)
+            column = np.load(self.path / f"{name}.npy", mmap_mode="r")
+            self._columns[name] = column
+        return column
+
+    def __len__(self) -> int:
+        return len(self["rtt_ticks"])
+
+
+class SweepArchive:
+    """All run archives under results/raw, filtered by stage/mode; nothing is read until asked."""
+
+    def __init__(
+        self,
+        results_dir: Path,
+        stages: set[str] | None = None,
+        modes: set[str] | None = None,
+    ) -> None:
+        self.paths: list[Path] = []
+        for meta_path in sorted((results_dir / "raw").glob(f"*/*/*{ARCHIVE_SUFFIX}/meta.json")):
+            run_dir = meta_path.parent
+            if stages and run_dir.parent.parent.name not in stages:
+                continue
+            if modes and run_dir.parent.name not in modes:
+                continue
+            self.paths.append(run_dir)
+
+    def __len__(self) -> int:
+        return len(self.paths)
+
+    def runs(self) -> Iterator[RunArchive]:
+        for path in self.paths:
+            yield RunArchive(path)
+
+    def concat(self, columns: list[str]) -> dict[str, np.ndarray]:
+        """Concatenate same-table columns across runs; `run` indexes `self.paths` for every row.
+
+        `rx_src` values index each run's own `src_names`.
+        """
+        parts: dict[str, list[np.ndarray]] = {name: [] for name in columns}
+        run_ids: list[np.ndarray] = []
+        for idx, run in enumerate(self.runs()):
+            length = None
+            for name in columns:
+                column = run[name]
+                parts[name].append(column)
+                length = len(column)
+            run_ids.append(np.full(length or 0, idx, dtype=np.int32))
+        out = {
+            name: np.concatenate(chunks) if chunks else np.empty(0, COLUMNS[name])
+            for name, chunks in parts.items()
+        }
+        out["run"] = np.concatenate(run_ids) if run_ids else np.empty(0, np.int32)
+        return out
+
+
+def main() -> int:
+    default_root = Path(__file__).resolve().parents[2]
+    parser = argparse.ArgumentParser(description="Inspect the per-run event archives of a sweep")
+    parser.add_argument("--root-dir", default=str(default_root), help="rpl-benchmark root")
+    parser.add_argument("--results-dir", help="Results directory (default: <root>/results)")
+    parser.add_argument("--stage", action="append", help="Limit to stage (repeatable)")
+    parser.add_argument("--mode", action="append", help="Limit to mode (repeatable)")
+    args = parser.parse_args()
+
+    results_dir = Path(args.results_dir) if args.results_dir else Path(args.root_dir) / "results"
+    sweep = SweepArchive(
+        results_dir,
+        set(args.stage) if args.stage else None,
+        set(args.mode) if args.mode else None,
+    )
+    if not len(sweep):
+        print(f"No event archives under {results_dir / 'raw'}", file=sys.stderr)
+        return 1
+    start = time.monotonic()
+    rtt = sweep.concat(["rtt_mote", "rtt_seq", "rtt_ticks"])
+    rx = sweep.concat(["rx_src", "rx_seq", "rx_t_recv"])
+    elapsed = time.monotonic() - start
+    print(
+        f"{len(sweep)} runs: {len(rtt['rtt_ticks'])} RTT rows, {len(rx['rx_seq'])} RX rows "
+        f"loaded in {elapsed:.2f}s"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
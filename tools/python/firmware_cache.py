@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+"""Content-addressed cache of prebuilt receiver_root/sender Cooja firmware.
+
+Entries are keyed by routing stack, DEFINES, project sources and the Contiki
+revision, so mode flips reuse a build instead of `make clean`. Send interval
+and warmup are per-mote EEPROM config (tools/gen_csc.py), not DEFINES, so a
+single entry per routing stack serves every interval.
+
+Simulations pin the entry they load (a shared flock on `<key>.pin`, held by
+`pin --entry DIR -- cmd` or by the sweep while its batches run); LRU eviction
+skips pinned entries and ones handed out in the last EVICT_MIN_IDLE_S.
+"""
+
+from __future__ import annotations
+
+import argparse
+import fcntl
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, TextIO
+
+FIRMWARE_NAMES = ("receiver_root", "sender")
+SOURCE_GLOBS = ("Makefile", "project-conf.h", "*.c", "motes/*.c", "motes/*.h")
+DEFAULT_MAX_ENTRIES = 16
+# Covers the gap between ensure() returning and the caller pinning the entry.
+EVICT_MIN_IDLE_S = 300.0
+
+
+def source_files(root_dir: Path) -> list[Path]:
+    files: set[Path] = set()
+    for pattern in SOURCE_GLOBS:
+        files.update(p for p in root_dir.glob(pattern) if p.is_file())
+    return sorted(files)
+
+
+def contiki_revision(contiki_dir: Path) -> str:
+    override = os.environ.get("CONTIKI_REV")
+    if override:
+        return override
+    try:
+        out = subprocess.run(
+            ["git", "-C", str(contiki_dir), "rev-parse", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+    return out.stdout.strip()
+
+
+def normalize_defines(defines: str) -> str:
+    return " ".join(sorted(defines.split()))
+
+
+def firmware_key(root_dir: Path, contiki_dir: Path, make_routing: str, defines: str) -> str:
+    digest = hashlib.sha256()
+    digest.update(f"routing={make_routing}\n".encode())
+    digest.update(f"defines={normalize_defines(defines)}\n".encode())
+    digest.update(f"contiki={contiki_revision(contiki_dir)}\n".encode())
+    for path in source_files(root_dir):
+        digest.update(str(path.relative_to(root_dir)).encode())
+        digest.update(b"\0")
+        digest.update(path.read_bytes())
+        digest.update(b"\0")
+    return digest.hexdigest()[:16]
+
+
+@contextmanager
+def locked(path: Path) -> Iterator[None]:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("w") as handle:
+        fcntl.flock(handle, fcntl.LOCK_EX)
+        yield
+
+
+def pin_path(entry_dir: Path) -> Path:
+    return entry_dir.with_name(f"{entry_dir.name}.pin")
+
+
+def try_lock(path: Path) -> TextIO | None:
+    """Exclusive lock without waiting; None while someone else holds it."""
+    handle = path.open("a")
+    try:
+        fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        handle.close()
+        return None
+    return handle
+
+
+def pin(entry_dir: Path) -> TextIO:
+    """Shared lock that keeps `entry_dir` from being evicted until the handle is closed."""
+    handle = pin_path(entry_dir).open("a")
+    fcntl.flock(handle, fcntl.LOCK_SH)
+    if not entry_complete(entry_dir):
+        handle.close()
+        raise FileNotFoundError(f"firmware entry missing: {entry_dir}")
+    touch(entry_dir)
+    return handle
+
+
+class Pins:
+    """One pin per entry for a long-running caller (the sweep), all released together."""
+
+    def __init__(self) -> None:
+        self._handles: dict[Path, TextIO] = {}
+        self._lock = threading.Lock()
+
+    def add(self, entry_dir: Path) -> None:
+        with self._lock:
+            if entry_dir not in self._handles:
+                self._handles[entry_dir] = pin(entry_dir)
+
+    def release(self) -> None:
+        with self._lock:
+            for handle in self._handles.values():
+                handle.close()
+            self._handles.clear()
+
+
+def entry_complete(entry_dir: Path) -> bool:
+    return all((entry_dir / f"{name}.cooja").is_file() for name in FIRMWARE_NAMES)
+
+
+def touch(entry_dir: Path) -> None:
+    # Replaced, not rewritten: concurrent pins must never leave a half-written stamp.
+    tmp_path = entry_dir / f".last_used.{os.getpid()}.{threading.get_ident()}"
+    tmp_path.write_text(f"{time.time():.3f}\n")
+    os.replace(tmp_path, entry_dir / ".last_used")
+
+
+def last_used(entry_dir: Path) -> float:
+    try:
+        return float((entry_dir / ".last_used").read_text().strip())
+    except (OSError, ValueError):
+        return 0.0
+
+
+def build_entry(
+    root_dir: Path,
+    contiki_dir: Path,
+    entry_dir: Path,
+    make_routing: str,
+    defines: str,
+) -> None:
+    build_dir = entry_dir.with_name(entry_dir.name + ".build")
+    shutil.rmtree(build_dir, ignore_errors=True)
+    cmd = [
+        "make",
+        "-C", str(root_dir),
+        f"CONTIKI={contiki_dir}",
+        "TARGET=cooja",
+        f"BUILD_DIR={build_dir}",
+        *(f"{name}.cooja" for name in FIRMWARE_NAMES),
+        f"MAKE_ROUTING={make_routing}",
+        f"DEFINES={defines}",
+    ]
+    # make output goes to stderr: stdout carries the entry path for callers.
+    subprocess.run(cmd, stdout=sys.stderr, check=True)
+
+    staging = entry_dir.with_name(entry_dir.name + ".staging")
+    shutil.rmtree(staging, ignore_errors=True)
+    staging.mkdir(parents=True)
+    for name in FIRMWARE_NAMES:
+        shutil.copy2(build_dir / "cooja" / f"{name}.cooja", staging / f"{name}.cooja")
+    meta = {
+        "make_routing": make_routing,
+        "defines": normalize_defines(defines),
+        "contiki_rev": contiki_revision(contiki_dir),
+        "built_at": time.strftime("%F %T"),
+    }
+    (staging / "config.json").write_text(json.dumps(meta, indent=2) + "\n")
+    shutil.rmtree(entry_dir, ignore_errors=True)
+    staging.rename(entry_dir)
+    shutil.rmtree(build_dir, ignore_errors=True)
+
+
+def evict(cache_dir: Path, max_entries: int, keep: str | None = None) -> list[str]:
+    """Drop least recently used entries beyond `max_entries`, never a pinned or busy one."""
+    entries = [
+        p for p in cache_dir.iterdir()
+        if p.is_dir() and "." not in p.name and p.name != keep
+    ]
+    budget = max_entries - (1 if keep else 0)
+    entries.sort(key=last_used, reverse=True)
+    excess = len(entries) - max(0, budget)
+    now = time.time()
+    evicted: list[str] = []
+    for entry in reversed(entries):
+        if len(evicted) >= excess:
+            break
+        if now - last_used(entry) < EVICT_MIN_IDLE_S:
+            continue
+        # Both without waiting: a build in progress or a running simulation keeps the entry.
+        build_lock = try_lock(cache_dir / f"{entry.name}.lock")
+        if build_lock is None:
+            continue
+        with build_lock:
+            pin_lock = try_lock(pin_path(entry))
+            if pin_lock is None:
+                continue
+            with pin_lock:
+                shutil.rmtree(entry, ignore_errors=True)
+        evicted.append(entry.name)
+    return evicted
+
+
+def ensure(
+    root_dir: Path,
+    contiki_dir: Path,
+    cache_dir: Path,
+    make_routing: str,
+    defines: str,
+    max_entries: int = DEFAULT_MAX_ENTRIES,
+) -> Path:
+    key = firmware_key(root_dir, contiki_dir, make_routing, defines)
+    entry_dir = cache_dir / key
+    # Per-key lock: concurrent workers wait for one build of the same config
+    # while builds of different configs proceed in parallel.
+    with locked(cache_dir / f"{key}.lock"):
+        if not entry_complete(entry_dir):
+            build_entry(root_dir, contiki_dir, entry_dir, make_routing, defines)
+        touch(entry_dir)
+    with locked(cache_dir / ".evict.lock"):
+        evict(cache_dir, max_entries, keep=key)
+    return entry_dir
+
+
+def main() -> int:
+    default_root = Path(__file__).resolve().parents[2]
+    parser = argparse.ArgumentParser(description="Content-addressed Cooja firmware cache")
+    parser.add_argument("command", choices=["ensure", "key", "list", "pin"], help="Action")
+    parser.add_argument("--root-dir", default=str(default_root), help="rpl-benchmark root")
+    parser.add_argument("--contiki", default=os.environ.get("CONTIKI"), help="Contiki-NG root")
+    parser.add_argument("--cache-dir", help="Cache directory (default: <root>/build/firmware-cache)")
+    parser.add_argument("--make-routing", default="MAKE_ROUTING_RPL_LITE", help="MAKE_ROUTING value")
+    parser.add_argument("--defines", default="", help="Space-separated DEFINES")
+    parser.add_argument(
+        "--max-entries",
+        type=int,
+        default=int(os.environ.get("FIRMWARE_CACHE_MAX", DEFAULT_MAX_ENTRIES)),
+        help="LRU capacity in firmware pairs",
+    )
+    parser.add_argument("--entry", help="pin: entry dir (as printed by ensure); `-- CMD...` runs pinned")
+    argv = sys.argv[1:]
+    cmd: list[str] = []
+    if "--" in argv:
+        split = argv.index("--")
+        argv, cmd = argv[:split], argv[split + 1:]
+    args = parser.parse_args(argv)
+
+    root_dir = Path(args.root_dir).resolve()
+    contiki_dir = Path(args.contiki or root_dir.parent / "external" / "contiki-ng").resolve()
+    cache_dir = Path(args.cache_dir) if args.cache_dir else root_dir / "build" / "firmware-cache"
+    cache_dir = cache_dir.resolve()
+
+    if args.command == "key":
+        print(firmware_key(root_dir, contiki_dir, args.make_routing, args.defines))
+        return 0
+
+    if args.command == "pin":
+        if not args.entry or not cmd:
+            parser.error("pin needs --entry DIR -- CMD...")
+        try:
+            handle = pin(Path(args.entry).resolve())
+        except FileNotFoundError as exc:
+            print(str(exc), file=sys.stderr)
+            return 1
+        with handle:
+            return subprocess.call(cmd)
+
+    if args.command == "list":
+        if not cache_dir.is_dir():
+            return 0
+        entries = [p for p in cache_dir.iterdir() if p.is_dir() and "." not in p.name]
+        for entry in sorted(entries, key=last_used, reverse=True):
+            meta_path = entry / "config.json"
+            meta = json.loads(meta_path.read_text()) if meta_path.exists() else {}
+            print(
+                f"{entry.name} {time.strftime('%F %T', time.localtime(last_used(entry)))} "
+                f"{meta.get('make_routing', '?')} [{meta.get('defines', '')}]"
+            )
+        return 0
+
+    try:
+        entry_dir = ensure(root_dir, contiki_dir, cache_dir, args.make_routing, args.defines, args.max_entries)
+    except subprocess.CalledProcessError as exc:
+        print(f"Firmware build failed (status {exc.returncode})", file=sys.stderr)
+        return 1
+    print(entry_dir)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
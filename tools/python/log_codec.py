@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""Compressed raw-log storage (gzip, or zstd with the optional `zstandard` package).
+
+A run log is stored as `X.log`, `X.log.gz` or `X.log.zst`; `open_log` picks
+the codec from the magic bytes and returns a buffered binary line stream, so
+readers decompress while they scan and never hold a whole log in memory.
+
+  compress  convert the plain logs of a results dir in place and drop
+            `.stdout.log` files that only duplicate the run log
+  report    compression ratio and parse time, plain vs compressed
+"""
+
+from __future__ import annotations
+
+import argparse
+import filecmp
+import gzip
+import io
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import BinaryIO
+
+READ_BUFFER_BYTES = 1 << 20
+CODECS = ("gzip", "zstd")
+SUFFIXES = {"gzip": ".gz", "zstd": ".zst"}
+DEFAULT_LEVELS = {"gzip": 6, "zstd": 3}
+GZIP_MAGIC = b"\x1f\x8b"
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+
+def _zstd():
+    try:
+        import zstandard
+    except ImportError as exc:
+        raise RuntimeError("zstd logs need the 'zstandard' package (pip install zstandard)") from exc
+    return zstandard
+
+
+def plain_path(path: Path) -> Path:
+    """`X.log.zst` -> `X.log`; other paths are returned unchanged."""
+    for suffix in SUFFIXES.values():
+        if path.name.endswith(suffix):
+            return path.with_name(path.name[: -len(suffix)])
+    return path
+
+
+def stored_path(path: Path, codec: str | None) -> Path:
+    return path.with_name(path.name + SUFFIXES[codec]) if codec else path
+
+
+def find_log(path: Path) -> Path | None:
+    """The stored form of `path` (plain first, then compressed), or None."""
+    base = plain_path(path)
+    for candidate in (path, base, *(stored_path(base, codec) for codec in CODECS)):
+        if candidate.exists():
+            return candidate
+    return None
+
+
+def codec_of(path: Path) -> str | None:
+    with path.open("rb") as handle:
+        magic = handle.read(4)
+    if magic.startswith(GZIP_MAGIC):
+        return "gzip"
+    if magic == ZSTD_MAGIC:
+        return "zstd"
+    return None
+
+
+def open_log(path: Path) -> BinaryIO:
+    """Buffered binary reader that decompresses on the fly."""
+    codec = codec_of(path)
+    if codec == "gzip":
+        return io.BufferedReader(gzip.open(path, "rb"), READ_BUFFER_BYTES)
+    if codec == "zstd":
+        reader = _zstd().ZstdDecompressor().stream_reader(path.open("rb"), closefd=True)
+        return io.BufferedReader(reader, READ_BUFFER_BYTES)
+    return path.open("rb", buffering=READ_BUFFER_BYTES)
+
+
+def open_writer(path: Path, codec: str | None, level: int | None = None) -> BinaryIO:
+    if codec is None:
+        return path.open("wb")
+    if codec not in CODECS:
+        raise ValueError(f"unknown log codec: {codec}")
+    level = DEFAULT_LEVELS[codec] if level is None else level
+    if codec == "gzip":
+        return gzip.open(path, "wb", compresslevel=level)
+    return _zstd().ZstdCompressor(level=level).stream_writer(path.open("wb"), closefd=True)
+
+
+def compress_log(path: Path, codec: str, level: int | None = None) -> Path:
+    """Replace a plain log by its compressed form; compressed inputs are left alone."""
+    if codec_of(path) is not None:
+        return path
+    out_path = stored_path(path, codec)
+    tmp_path = out_path.with_name(f".{out_path.name}.{os.getpid()}.tmp")
+    with open_log(path) as src, open_writer(tmp_path, codec, level) as dst:
+        shutil.copyfileobj(src, dst, READ_BUFFER_BYTES)
+    shutil.copystat(path, tmp_path)
+    os.replace(tmp_path, out_path)
+    path.unlink()
+    return out_path
+
+
+def raw_logs(results_dir: Path) -> list[Path]:
+    """Plain run and stdout logs under results/raw (driver logs excluded)."""
+    return [
+        path for path in sorted((results_dir / "raw").glob("*/*/*.log"))
+        if not path.name.endswith(".driver.log")
+    ]
+
+
+def compress_results(results_dir: Path, codec: str, level: int | None) -> tuple[int, int, int, int]:
+    """Returns (logs compressed, duplicates removed, bytes before, bytes after)."""
+    compressed = removed = before = after = 0
+    logs = raw_logs(results_dir)
+    for path in logs:
+        if not path.name.endswith(".stdout.log"):
+            continue
+        # Older runs copied stdout over a missing testlog, leaving the same text twice.
+        run_log = path.with_name(path.name[: -len(".stdout.log")] + ".log")
+        if run_log.exists() and filecmp.cmp(path, run_log, shallow=False):
+            before += path.stat().st_size
+            path.unlink()
+            removed += 1
+    for path in logs:
+        if not path.exists():
+            continue
+        size = path.stat().st_size
+        out_path = compress_log(path, codec, level)
+        before += size
+        after += out_path.stat().st_size
+        compressed += 1
+    return compressed, removed, before, after
+
+
+def timed_ingest(path: Path) -> tuple[float, int]:
+    from log_ingest import ingest
+
+    start = time.perf_counter()
+    events = ingest(path)
+    return time.perf_counter() - start, events.lines
+
+
+def report(logs: list[Path], codecs: list[str], level: int | None) -> list[str]:
+    """Compress copies of `logs` into a temp dir and time the parser on each form."""
+    lines = [f"{'codec':<6} {'logs':>5} {'plain_MB':>9} {'stored_MB':>9} {'ratio':>6} {'parse_s':>8} {'vs_plain':>8}"]
+    with tempfile.TemporaryDirectory(prefix="log_codec.") as tmp:
+        tmp_dir = Path(tmp)
+        plain_bytes = sum(path.stat().st_size for path in logs)
+        plain_s = sum(timed_ingest(path)[0] for path in logs)
+        lines.append(
+            f"{'plain':<6} {len(logs):>5} {plain_bytes / 1e6:>9.1f} {plain_bytes / 1e6:>9.1f} "
+            f"{1.0:>6.2f} {plain_s:>8.2f} {1.0:>8.2f}"
+        )
+        for codec in codecs:
+            stored_bytes = 0
+            parse_s = 0.0
+            for idx, path in enumerate(logs):
+                copy = tmp_dir / f"{idx}.log"
+                shutil.copyfile(path, copy)
+                out_path = compress_log(copy, codec, level)
+                stored_bytes += out_path.stat().st_size
+                parse_s += timed_ingest(out_path)[0]
+                out_path.unlink()
+            ratio = plain_bytes / stored_bytes if stored_bytes else 0.0
+            lines.append(
+                f"{codec:<6} {len(logs):>5} {plain_bytes / 1e6:>9.1f} {stored_bytes / 1e6:>9.1f} "
+                f"{ratio:>6.2f} {parse_s:>8.2f} {parse_s / plain_s if plain_s else 0.0:>8.2f}"
+            )
+    return lines
+
+
+def main() -> int:
+    default_root = Path(__file__).resolve().parents[2]
+    parser = argparse.ArgumentParser(description="Compressed raw-log storage")
+    sub = parser.add_subparsers(dest="action", required=True)
+
+    compress_p = sub.add_parser("compress", help="Compress the plain logs of a results dir in place")
+    compress_p.add_argument("--root-dir", default=str(default_root), help="rpl-benchmark root")
+    compress_p.add_argument("--results-dir", help="Results directory (default: <root>/results)")
+    compress_p.add_argument("--codec", choices=CODECS, default="gzip", help="Compression codec")
+    compress_p.add_argument("--level", type=int, help="Compression level (default: codec default)")
+
+    report_p = sub.add_parser("report", help="Compression ratio and parse time per codec")
+    report_p.add_argument("logs", nargs="*", help="Plain logs (default: plain run logs of the results dir)")
+    report_p.add_argument("--root-dir", default=str(default_root), help="rpl-benchmark root")
+    report_p.add_argument("--results-dir", help="Results directory (default: <root>/results)")
+    report_p.add_argument("--codec", action="append", choices=CODECS, help="Codec to measure (repeatable)")
+    report_p.add_argument("--level", type=int, help="Compression level (default: codec default)")
+    report_p.add_argument("--limit", type=int, default=20, help="At most this many logs")
+    args = parser.parse_args()
+
+    results_dir = Path(args.results_dir) if args.results_dir else Path(args.root_dir) / "results"
+    try:
+        if args.action == "compress":
+            compressed, removed, before, after = compress_results(results_dir, args.codec, args.level)
+            print(
+                f"Compressed {compressed} logs, removed {removed} duplicate stdout logs: "
+                f"{before / 1e6:.1f} MB -> {after / 1e6:.1f} MB"
+            )
+            return 0
+
+        if args.logs:
+            logs = [Path(path) for path in args.logs]
+        else:
+            logs = [path for path in raw_logs(results_dir) if not path.name.endswith(".stdout.log")]
+        logs = [path for path in logs if codec_of(path) is None][: args.limit]
+        if not logs:
+            print(f"No plain logs to measure under {results_dir / 'raw'}", file=sys.stderr)
+            return 1
+        print("\n".join(report(logs, args.codec or ["gzip"], args.level)))
+    except RuntimeError as exc:
+        print(f"log_codec: {exc}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
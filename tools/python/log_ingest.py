@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""Single-pass streaming ingester for Cooja testlogs.
+
+One scan of the raw log yields the RTT/RX event columns (with the Cooja time
+and mote-id prefix kept), the per-node routing/control-plane columns
+(`routing_events.py`), the DIO/DAO counts, and optionally the legacy `CSV,`
+extract that `rg | sed` used to produce.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import re
+from array import array
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import BinaryIO
+
+from log_codec import READ_BUFFER_BYTES, codec_of, find_log, open_log, open_writer, stored_path
+from metrics import events_columns, measure, summary
+from routing_events import RoutingEvents, RoutingIndexer, summarize_routing
+
+DIO_RE = re.compile(rb"\bDIO\b")
+DAO_RE = re.compile(rb"\bDAO\b")
+
+
+def _int_or(value: bytes, default: int | None = -1) -> int | None:
+    try:
+        return int(value)
+    except ValueError:
+        return default
+
+
+@dataclass
+class LogEvents:
+    """Typed event columns; `time_us`/`mote` are -1 when the line had no Cooja prefix."""
+
+    rtt_time_us: array = field(default_factory=lambda: array("q"))
+    rtt_mote: array = field(default_factory=lambda: array("q"))
+    rtt_seq: array = field(default_factory=lambda: array("q"))
+    rtt_t0: array = field(default_factory=lambda: array("q"))
+    rtt_t_ack: array = field(default_factory=lambda: array("q"))
+    rtt_ticks: array = field(default_factory=lambda: array("q"))
+    rtt_len: array = field(default_factory=lambda: array("q"))
+    rx_time_us: array = field(default_factory=lambda: array("q"))
+    rx_mote: array = field(default_factory=lambda: array("q"))
+    rx_src: array = field(default_factory=lambda: array("q"))
+    rx_seq: array = field(default_factory=lambda: array("q"))
+    rx_t_recv: array = field(default_factory=lambda: array("q"))
+    rx_len: array = field(default_factory=lambda: array("q"))
+    src_names: list[str] = field(default_factory=list)
+    routing: RoutingEvents = field(default_factory=RoutingEvents)
+    dio_count: int = 0
+    dao_count: int = 0
+    lines: int = 0
+    last_time_us: int = -1
+
+
+class LogIngester:
+    """Incremental line consumer; `feed` can be driven from a file or a live tail."""
+
+    def __init__(self, csv_out: BinaryIO | None = None) -> None:
+        self.events = LogEvents()
+        self.csv_out = csv_out
+        self.routing = RoutingIndexer(self.events.routing)
+        self._src_index: dict[str, int] = {}
+
+    def _prefix(self, prefix: bytes) -> tuple[int, int]:
+        parts = prefix.split()
+        if len(parts) >= 2 and parts[0].isdigit() and parts[1].isdigit():
+            return int(parts[0]), int(parts[1])
+        return -1, -1
+
+    def _src_id(self, src: bytes) -> int:
+        name = src.decode("ascii", errors="ignore")
+        idx = self._src_index.get(name)
+        if idx is None:
+            idx = len(self.events.src_names)
+            self._src_index[name] = idx
+            self.events.src_names.append(name)
+        return idx
+
+    def feed(self, line: bytes) -> None:
+        ev = self.events
+        ev.lines += 1
+        # Control-plane counts keep the legacy whole-text \bDIO\b/\bDAO\b semantics.
+        if b"DIO" in line:
+            ev.dio_count += len(DIO_RE.findall(line))
+        if b"DAO" in line:
+            ev.dao_count += len(DAO_RE.findall(line))
+
+        idx = line.find(b"CSV,")
+        if idx < 0:
+            if not line[:1].isdigit():
+                return
+            # routing_events.MARKERS, spelled out to keep other lines on the cheap path.
+            if b"RPL" in line or b"routing state:" in line or b"reachable changed:" in line:
+                head = line.split(b" ", 2)
+                time_us = _int_or(head[0])
+                if time_us >= 0 and len(head) == 3 and head[1].isdigit():
+                    self.routing.feed(time_us, int(head[1]), head[2])
+            else:
+                time_us = _int_or(line.split(b" ", 1)[0])
+            if time_us >= 0:
+                ev.last_time_us = time_us
+            return
+        time_us, mote = self._prefix(line[:idx])
+        if time_us >= 0:
+            ev.last_time_us = time_us
+        record = line[idx:].rstrip(b"\r\n")
+        if self.csv_out is not None:
+            self.csv_out.write(record + b"\n")
+        parts = record.split(b",")
+        if len(parts) < 2:
+            return
+        tag = parts[1]
+        if tag == b"RTT" and len(parts) >= 7:
+            t_ack = _int_or(parts[4], None)
+            rtt = _int_or(parts[5], None)
+            if t_ack is None or rtt is None:
+                return
+            ev.rtt_time_us.append(time_us)
+            ev.rtt_mote.append(mote)
+            ev.rtt_seq.append(_int_or(parts[2]))
+            ev.rtt_t0.append(_int_or(parts[3]))
+            ev.rtt_t_ack.append(t_ack)
+            ev.rtt_ticks.append(rtt)
+            ev.rtt_len.append(_int_or(parts[6]))
+        elif tag == b"RX" and len(parts) >= 6:
+            if parts[3] == b"NA":
+                return
+            seq = _int_or(parts[3], None)
+            t_recv = _int_or(parts[4], None)
+            if seq is None or t_recv is None:
+                return
+            ev.rx_time_us.append(time_us)
+            ev.rx_mote.append(mote)
+            ev.rx_src.append(self._src_id(parts[2]))
+            ev.rx_seq.append(seq)
+            ev.rx_t_recv.append(t_recv)
+            ev.rx_len.append(_int_or(parts[5]))
+
+
+def ingest(path: Path, csv_out: Path | None = None, compress: str | None = None) -> LogEvents:
+    """Scan `path` (plain or compressed) once in constant memory.
+
+    With `compress`, a plain log is written compressed during the same scan
+    and then replaces the plain file.
+    """
+    found = find_log(path)
+    if found is None:
+        return LogEvents()
+    if compress and codec_of(found) is not None:
+        compress = None
+    csv_handle = csv_out.open("wb") if csv_out is not None else None
+    out_path = stored_path(found, compress)
+    tmp_path = out_path.with_name(f".{out_path.name}.{os.getpid()}.tmp")
+    try:
+        ingester = LogIngester(csv_handle)
+        with open_log(found) as handle:
+            if compress is None:
+                for line in handle:
+                    ingester.feed(line)
+            else:
+                with open_writer(tmp_path, compress) as writer:
+                    pending = b""
+                    for chunk in iter(lambda: handle.read(READ_BUFFER_BYTES), b""):
+                        writer.write(chunk)
+                        lines = (pending + chunk).split(b"\n")
+                        pending = lines.pop()
+                        for line in lines:
+                            ingester.feed(line)
+                    if pending:
+                        ingester.feed(pending)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+    finally:
+        if csv_handle is not None:
+            csv_handle.close()
+    if compress is not None:
+        os.replace(tmp_path, out_path)
+        found.unlink()
+    return ingester.events
+
+
+def summarize(events: LogEvents, warmup_s: float, measure_s: float, clock_second: int) -> dict:
+    """Measure-window summary with the same fields and rules as `parse_csv`."""
+    return summary(measure(events_columns(events), events.src_names, warmup_s, measure_s, clock_second))
+
+
+def summarize_control(events: LogEvents) -> dict[str, str]:
+    """Routing/control-plane summary fields over the simulated time the log covers."""
+    return summarize_routing(events.routing, events.last_time_us / 1e6)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Scan a Cooja testlog once and print event counts")
+    parser.add_argument("--log", required=True, help="Cooja testlog path (plain, .gz or .zst)")
+    parser.add_argument("--csv-out", help="Optional CSV extract output path")
+    parser.add_argument("--warmup-s", type=float, default=60, help="Warmup seconds")
+    parser.add_argument("--measure-s", type=float, default=300, help="Measure seconds")
+    parser.add_argument("--clock-second", type=int, default=1000, help="Contiki clock ticks per second")
+    args = parser.parse_args()
+
+    events = ingest(Path(args.log), Path(args.csv_out) if args.csv_out else None)
+    summary = summarize(events, args.warmup_s, args.measure_s, args.clock_second)
+    print(
+        f"lines={events.lines} rtt={len(events.rtt_ticks)} rx={len(events.rx_seq)} "
+        f"senders={len(events.src_names)} dio={events.dio_count} dao={events.dao_count} "
+        f"last_time_us={events.last_time_us}"
+    )
+    print(
+        f"pdr={summary['pdr']:.6f} avg_rtt_ms={summary['avg_rtt_ms']:.2f} "
+        f"p95_rtt_ms={summary['p95_rtt_ms']:.2f} invalid_run={summary['invalid_run']}"
+    )
+    print(" ".join(f"{name}={value}" for name, value in summarize_control(events).items()))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
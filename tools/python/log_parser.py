@@ -5,10 +5,17 @@ from __future__ import annotations
 
 import argparse
 import csv
-import math
-import re
 from pathlib import Path
-from statistics import mean
+
+import numpy as np
+
+from event_archive import write_archive
+from log_codec import CODECS, find_log
+from log_ingest import ingest, summarize, summarize_control
+from metrics import WINDOW_S, breakdown, events_columns, load_hops, measure, write_metrics_csv
+from metrics import summary as window_summary
+from results_store import default_store_path, open_store
+from routing_events import SUMMARY_FIELDS as ROUTING_FIELDS
 
 
 def parse_csv(
@@ -17,12 +24,6 @@ def parse_csv(
     measure_s: float,
     clock_second: int,
 ) -> dict:
-    rtt_ms: list[float] = []
-    rtt_ticks: list[int] = []
-    rx_total = 0
-    gap_total = 0
-    last_seq_by_src: dict[str, int] = {}
-
     if not path.exists():
         return {
             "rx": 0,
@@ -33,6 +34,10 @@ def parse_csv(
             "invalid_run": 1,
         }
 
+    columns: dict[str, list[int]] = {
+        name: [] for name in ("rtt_t_ack", "rtt_ticks", "rtt_mote", "rx_src", "rx_seq", "rx_t_recv")
+    }
+    src_index: dict[str, int] = {}
     with path.open("r", encoding="utf-8", errors="ignore") as handle:
         reader = csv.reader(handle)
         for row in reader:
@@ -42,17 +47,16 @@ def parse_csv(
                 continue
             tag = row[1]
             if tag == "RTT" and len(row) >= 7:
-                _, _, seq, _t0, t_ack, rtt_ticks_str, _length = row[:7]
+                _, _, _seq, _t0, t_ack, rtt_ticks_str, _length = row[:7]
                 try:
                     t_ack_ticks = int(t_ack)
                     rtt_ticks_int = int(rtt_ticks_str)
                 except ValueError:
                     continue
-                t_ack_s = t_ack_ticks / clock_second
-                if t_ack_s < warmup_s or t_ack_s >= warmup_s + measure_s:
-                    continue
-                rtt_ticks.append(rtt_ticks_int)
-                rtt_ms.append((rtt_ticks_int * 1000.0) / clock_second)
+                columns["rtt_t_ack"].append(t_ack_ticks)
+                columns["rtt_ticks"].append(rtt_ticks_int)
+                # The CSV extract has no Cooja prefix, so the sending mote is unknown.
+                columns["rtt_mote"].append(-1)
             elif tag == "RX" and len(row) >= 6:
                 _, _, src_ip, seq, t_recv, _length = row[:6]
                 if seq == "NA":
@@ -62,52 +66,70 @@ def parse_csv(
                     t_recv_ticks = int(t_recv)
                 except ValueError:
                     continue
-                t_recv_s = t_recv_ticks / clock_second
-                if t_recv_s < warmup_s or t_recv_s >= warmup_s + measure_s:
-                    continue
-                last_seq = last_seq_by_src.get(src_ip)
-                if last_seq is not None and seq_int > last_seq + 1:
-                    gap_total += seq_int - (last_seq + 1)
-                last_seq_by_src[src_ip] = seq_int
-                rx_total += 1
-
-    expected = rx_total + gap_total
-    pdr = (rx_total / expected) if expected else 0.0
-    avg_rtt_ms = mean(rtt_ms) if rtt_ms else 0.0
-    if rtt_ms:
-        rtt_sorted = sorted(rtt_ms)
-        p95_index = max(0, math.ceil(0.95 * len(rtt_sorted)) - 1)
-        p95_rtt_ms = rtt_sorted[p95_index]
-    else:
-        p95_rtt_ms = 0.0
-
-    invalid_run = 0
-    if not rtt_ms or all(t == 0 for t in rtt_ticks):
-        invalid_run = 1
+                columns["rx_src"].append(src_index.setdefault(src_ip, len(src_index)))
+                columns["rx_seq"].append(seq_int)
+                columns["rx_t_recv"].append(t_recv_ticks)
 
-    return {
-        "rx": rx_total,
-        "expected": expected,
-        "pdr": pdr,
-        "avg_rtt_ms": avg_rtt_ms,
-        "p95_rtt_ms": p95_rtt_ms,
-        "invalid_run": invalid_run,
-    }
+    arrays = {name: np.array(values, dtype=np.int64) for name, values in columns.items()}
+    return window_summary(measure(arrays, list(src_index), warmup_s, measure_s, clock_second))
 
 
 def count_control_messages(log_path: Path) -> tuple[int, int]:
-    if not log_path.exists():
-        return 0, 0
-    text = log_path.read_text(errors="ignore")
-    dio_count = len(re.findall(r"\bDIO\b", text))
-    dao_count = len(re.findall(r"\bDAO\b", text))
-    return dio_count, dao_count
+    events = ingest(log_path)
+    return events.dio_count, events.dao_count
+
+
+def summary_row(
+    meta: dict,
+    summary: dict,
+    dio_count: int,
+    dao_count: int,
+    routing: dict[str, str] | None = None,
+) -> dict[str, str]:
+    """Format one summary.csv row from run metadata and parsed metrics (routing fields empty without a log scan)."""
+    routing = routing or {}
+    return {
+        "mode": meta["mode"],
+        "stage": meta["stage"],
+        "n_senders": str(meta["n_senders"]),
+        "seed": str(meta["seed"]),
+        "success_ratio": str(float(meta["success_ratio"])),
+        "interference_ratio": str(float(meta["interference_ratio"])),
+        "send_interval_s": str(meta["send_interval_s"]),
+        "rx_count": str(summary["rx"]),
+        "tx_expected": str(summary["expected"]),
+        "pdr": f"{summary['pdr']:.6f}",
+        "avg_rtt_ms": f"{summary['avg_rtt_ms']:.2f}",
+        "p95_rtt_ms": f"{summary['p95_rtt_ms']:.2f}",
+        "avg_delay_ms": f"{summary['avg_rtt_ms']:.2f}",
+        "p95_delay_ms": f"{summary['p95_rtt_ms']:.2f}",
+        "invalid_run": str(summary["invalid_run"]),
+        "dio_count": str(dio_count),
+        "dao_count": str(dao_count),
+        **{name: routing.get(name, "") for name in ROUTING_FIELDS},
+        "duration_s": str(meta["duration_s"]),
+        "warmup_s": str(meta["warmup_s"]),
+        "measure_s": str(meta["measure_s"]),
+        "log_path": str(meta["log_path"]),
+        "csc_path": str(meta["csc_path"]),
+        "run_status": meta.get("run_status") or "ok",
+    }
 
 
 def main() -> int:
     parser = argparse.ArgumentParser(description="Parse RTT/RX CSV logs and summarize")
-    parser.add_argument("--csv", required=True, help="Raw RX CSV path")
-    parser.add_argument("--cooja-log", required=False, help="Full Cooja log path")
+    parser.add_argument("--csv", required=False, help="Pre-extracted CSV path (legacy two-pass mode)")
+    parser.add_argument("--cooja-log", required=False, help="Full Cooja log path (plain, .gz or .zst)")
+    parser.add_argument(
+        "--compress",
+        choices=CODECS,
+        help="Store a plain --cooja-log compressed during the scan (replaces the plain file)",
+    )
+    parser.add_argument("--csv-out", required=False, help="Write the CSV extract during the log scan")
+    parser.add_argument("--archive-dir", required=False, help="Write the columnar event archive here")
+    parser.add_argument("--metrics-out", required=False, help="Per-sender/hop/window metrics CSV")
+    parser.add_argument("--topology", required=False, help="gen_csc.py --topology-out CSV (hop bands)")
+    parser.add_argument("--window-s", type=float, default=WINDOW_S, help="Metrics window length (s)")
     parser.add_argument("--mode", required=True, help="Experiment mode label")
     parser.add_argument("--stage", required=True, help="Stage label")
     parser.add_argument("--n-senders", type=int, required=True, help="Configured sender count")
@@ -121,102 +143,70 @@ def main() -> int:
     parser.add_argument("--clock-second", type=int, default=128, help="Contiki clock ticks per second")
     parser.add_argument("--log-path", required=True, help="Log file path")
     parser.add_argument("--csc-path", required=True, help="Cooja CSC path")
+    parser.add_argument("--run-status", default="ok", help="Run status from run_monitor.py")
     parser.add_argument("--out", required=True, help="Output summary CSV path")
+    parser.add_argument("--store", help="Results store path (default: --out with .db suffix)")
+    parser.add_argument("--no-export", action="store_true", help="Only upsert into the store")
     args = parser.parse_args()
 
-    csv_path = Path(args.csv)
-    summary = parse_csv(csv_path, args.warmup_s, args.measure_s, args.clock_second)
+    events = None
+    routing = None
+    log_path = args.log_path
+    if args.csv:
+        summary = parse_csv(Path(args.csv), args.warmup_s, args.measure_s, args.clock_second)
+        dio_count = 0
+        dao_count = 0
+        if args.cooja_log:
+            dio_count, dao_count = count_control_messages(Path(args.cooja_log))
+    elif args.cooja_log:
+        events = ingest(Path(args.cooja_log), Path(args.csv_out) if args.csv_out else None, args.compress)
+        if Path(log_path) == Path(args.cooja_log):
+            # Record where the log ended up (possibly compressed).
+            log_path = str(find_log(Path(log_path)) or log_path)
+        summary = summarize(events, args.warmup_s, args.measure_s, args.clock_second)
+        dio_count = events.dio_count
+        dao_count = events.dao_count
+        routing = summarize_control(events)
+    else:
+        parser.error("one of --csv or --cooja-log is required")
+
+    row = summary_row(
+        {
+            "mode": args.mode,
+            "stage": args.stage,
+            "n_senders": args.n_senders,
+            "seed": args.seed,
+            "success_ratio": args.success_ratio,
+            "interference_ratio": args.interference_ratio,
+            "send_interval_s": args.send_interval_s,
+            "duration_s": args.duration_s,
+            "warmup_s": args.warmup_s,
+            "measure_s": args.measure_s,
+            "log_path": log_path,
+            "csc_path": args.csc_path,
+            "run_status": args.run_status,
+        },
+        summary,
+        dio_count,
+        dao_count,
+        routing,
+    )
 
-    dio_count = 0
-    dao_count = 0
-    if args.cooja_log:
-        dio_count, dao_count = count_control_messages(Path(args.cooja_log))
+    if args.archive_dir and events is not None:
+        write_archive(events, Path(args.archive_dir), row)
+    if args.metrics_out and events is not None:
+        measured = measure(
+            events_columns(events), events.src_names, args.warmup_s, args.measure_s, args.clock_second
+        )
+        hops = load_hops(Path(args.topology)) if args.topology else {}
+        write_metrics_csv(Path(args.metrics_out), breakdown(measured, hops, args.window_s))
 
     out_path = Path(args.out)
-    header = [
-        "mode",
-        "stage",
-        "n_senders",
-        "seed",
-        "success_ratio",
-        "interference_ratio",
-        "send_interval_s",
-        "rx_count",
-        "tx_expected",
-        "pdr",
-        "avg_rtt_ms",
-        "p95_rtt_ms",
-        "avg_delay_ms",
-        "p95_delay_ms",
-        "invalid_run",
-        "dio_count",
-        "dao_count",
-        "duration_s",
-        "warmup_s",
-        "measure_s",
-        "log_path",
-        "csc_path",
-    ]
-
-    row = {
-        "mode": args.mode,
-        "stage": args.stage,
-        "n_senders": str(args.n_senders),
-        "seed": str(args.seed),
-        "success_ratio": str(args.success_ratio),
-        "interference_ratio": str(args.interference_ratio),
-        "send_interval_s": str(args.send_interval_s),
-        "rx_count": str(summary["rx"]),
-        "tx_expected": str(summary["expected"]),
-        "pdr": f"{summary['pdr']:.6f}",
-        "avg_rtt_ms": f"{summary['avg_rtt_ms']:.2f}",
-        "p95_rtt_ms": f"{summary['p95_rtt_ms']:.2f}",
-        "avg_delay_ms": f"{summary['avg_rtt_ms']:.2f}",
-        "p95_delay_ms": f"{summary['p95_rtt_ms']:.2f}",
-        "invalid_run": str(summary["invalid_run"]),
-        "dio_count": str(dio_count),
-        "dao_count": str(dao_count),
-        "duration_s": str(args.duration_s),
-        "warmup_s": str(args.warmup_s),
-        "measure_s": str(args.measure_s),
-        "log_path": str(args.log_path),
-        "csc_path": str(args.csc_path),
-    }
-
-    key = (
-        row["mode"],
-        row["stage"],
-        row["n_senders"],
-        row["seed"],
-        row["success_ratio"],
-        row["interference_ratio"],
-        row["send_interval_s"],
-    )
-
-    rows_by_key: dict[tuple[str, ...], dict[str, str]] = {}
-    if out_path.exists():
-        with out_path.open("r", encoding="utf-8") as handle:
-            reader = csv.DictReader(handle)
-            for existing in reader:
-                existing_key = (
-                    existing.get("mode", ""),
-                    existing.get("stage", ""),
-                    existing.get("n_senders", ""),
-                    existing.get("seed", ""),
-                    existing.get("success_ratio", ""),
-                    existing.get("interference_ratio", ""),
-                    existing.get("send_interval_s", ""),
-                )
-                rows_by_key[existing_key] = existing
-
-    rows_by_key[key] = row
-    with out_path.open("w", encoding="utf-8", newline="") as handle:
-        writer = csv.DictWriter(handle, fieldnames=header)
-        writer.writeheader()
-        for key in sorted(rows_by_key):
-            existing = rows_by_key[key]
-            normalized = {name: existing.get(name, "") for name in header}
-            writer.writerow(normalized)
+    store_path = Path(args.store) if args.store else default_store_path(out_path)
+    with open_store(store_path, out_path) as store:
+        store.upsert(row)
+        if not args.no_export:
+            store.export_csv(out_path)
 
     return 0
 
@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+"""Vectorized RTT/PDR metrics over the parsed event columns.
+
+Whole-run, per-sender, per-hop-band and sliding-window breakdowns share one
+path: a measure-window mask, per-source sequence gaps from a stable sort by
+source, and nearest-rank quantiles from np.partition (RTTs are never fully
+sorted).
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import math
+import sys
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator
+
+import numpy as np
+
+from collapse import P95_RTT_TH_MS, PDR_TH
+from event_archive import RunArchive, SweepArchive
+from results_store import KEY_FIELDS
+
+QUANTILES = (0.50, 0.95, 0.99)
+WINDOW_S = 10.0
+METRIC_FIELDS = [
+    "scope",
+    "group",
+    "t_start_s",
+    "rx",
+    "expected",
+    "lost",
+    "pdr",
+    "rtt_count",
+    "avg_rtt_ms",
+    "p50_rtt_ms",
+    "p95_rtt_ms",
+    "p99_rtt_ms",
+]
+
+
+@dataclass
+class Measured:
+    """Measure-window events; `rx_lost` is the sequence gap each packet revealed."""
+
+    rtt_s: np.ndarray
+    rtt_ms: np.ndarray
+    rtt_mote: np.ndarray
+    rx_s: np.ndarray
+    rx_mote: np.ndarray
+    rx_lost: np.ndarray
+    warmup_s: float
+    measure_s: float
+
+
+def src_mote_id(name: str) -> int:
+    """Cooja derives the sender address from its node id: aaaa::20c:c:c:c -> 12."""
+    try:
+        return int(name.rsplit(":", 1)[-1], 16)
+    except ValueError:
+        return -1
+
+
+def measure(
+    columns: dict[str, np.ndarray],
+    src_names: list[str],
+    warmup_s: float,
+    measure_s: float,
+    clock_second: int,
+) -> Measured:
+    """Apply the [warmup, warmup + measure) window to `rtt_*`/`rx_*` columns."""
+    window_end_s = warmup_s + measure_s
+    rtt_s = np.asarray(columns["rtt_t_ack"], dtype=np.int64) / clock_second
+    rtt_mask = (rtt_s >= warmup_s) & (rtt_s < window_end_s)
+    rtt_ticks = np.asarray(columns["rtt_ticks"], dtype=np.int64)[rtt_mask]
+
+    rx_s = np.asarray(columns["rx_t_recv"], dtype=np.int64) / clock_second
+    rx_mask = (rx_s >= warmup_s) & (rx_s < window_end_s)
+    src = np.asarray(columns["rx_src"], dtype=np.int64)[rx_mask]
+    seq = np.asarray(columns["rx_seq"], dtype=np.int64)[rx_mask]
+
+    # Arrival order within each source is kept by the stable sort, so the gap
+    # is exactly what the old per-packet last_seq_by_src loop counted.
+    order = np.argsort(src, kind="stable")
+    sorted_src = src[order]
+    sorted_seq = seq[order]
+    gaps = np.zeros(len(order), dtype=np.int64)
+    if len(order) > 1:
+        step = sorted_seq[1:] - sorted_seq[:-1] - 1
+        gaps[1:] = np.where((sorted_src[1:] == sorted_src[:-1]) & (step > 0), step, 0)
+    rx_lost = np.empty_like(gaps)
+    rx_lost[order] = gaps
+
+    motes = np.array([src_mote_id(name) for name in src_names] or [-1], dtype=np.int64)
+    return Measured(
+        rtt_s=rtt_s[rtt_mask],
+        rtt_ms=rtt_ticks * 1000.0 / clock_second,
+        rtt_mote=np.asarray(columns["rtt_mote"], dtype=np.int64)[rtt_mask],
+        rx_s=rx_s[rx_mask],
+        rx_mote=motes[src] if len(src) else np.empty(0, dtype=np.int64),
+        rx_lost=rx_lost,
+        warmup_s=warmup_s,
+        measure_s=measure_s,
+    )
+
+
+def events_columns(events) -> dict[str, np.ndarray]:
+    """LogEvents array('q') columns as zero-copy int64 arrays."""
+    names = ("rtt_t_ack", "rtt_ticks", "rtt_mote", "rx_src", "rx_seq", "rx_t_recv")
+    return {name: np.asarray(getattr(events, name), dtype=np.int64) for name in names}
+
+
+def archive_columns(run: RunArchive) -> dict[str, np.ndarray]:
+    names = ("rtt_t_ack", "rtt_ticks", "rtt_mote", "rx_src", "rx_seq", "rx_t_recv")
+    return {name: run[name] for name in names}
+
+
+def nearest_rank(values: np.ndarray, quantiles: tuple[float, ...] = QUANTILES) -> list[float]:
+    """Value at ceil(q * n) - 1 of the sorted order, found with a single np.partition."""
+    count = len(values)
+    if not count:
+        return [0.0] * len(quantiles)
+    kth = [max(0, math.ceil(q * count) - 1) for q in quantiles]
+    parted = np.partition(values, kth)
+    return [float(parted[k]) for k in kth]
+
+
+def stats(rx: int, lost: int, rtt_ms: np.ndarray) -> dict:
+    expected = rx + lost
+    p50, p95, p99 = nearest_rank(rtt_ms)
+    return {
+        "rx": rx,
+        "expected": expected,
+        "lost": lost,
+        "pdr": rx / expected if expected else 0.0,
+        "rtt_count": len(rtt_ms),
+        "avg_rtt_ms": float(rtt_ms.mean()) if len(rtt_ms) else 0.0,
+        "p50_rtt_ms": p50,
+        "p95_rtt_ms": p95,
+        "p99_rtt_ms": p99,
+    }
+
+
+def summary(m: Measured) -> dict:
+    """Run-wide fields of the summary row (same rules as the old list-based code)."""
+    row = stats(len(m.rx_lost), int(m.rx_lost.sum()), m.rtt_ms)
+    invalid_run = 1 if not len(m.rtt_ms) or not m.rtt_ms.any() else 0
+    return {
+        "rx": row["rx"],
+        "expected": row["expected"],
+        "pdr": row["pdr"],
+        "avg_rtt_ms": row["avg_rtt_ms"],
+        "p95_rtt_ms": row["p95_rtt_ms"],
+        "invalid_run": invalid_run,
+    }
+
+
+def grouped(m: Measured, rx_keys: np.ndarray, rtt_keys: np.ndarray) -> Iterator[tuple[int, dict]]:
+    """Stats per key; rows are bucketed by a stable integer sort on the key only."""
+    rx_order = np.argsort(rx_keys, kind="stable")
+    rtt_order = np.argsort(rtt_keys, kind="stable")
+    rx_sorted = rx_keys[rx_order]
+    rtt_sorted = rtt_keys[rtt_order]
+    lost_sorted = m.rx_lost[rx_order]
+    rtt_ms_sorted = m.rtt_ms[rtt_order]
+    for key in np.union1d(rx_keys, rtt_keys).tolist():
+        lo, hi = np.searchsorted(rx_sorted, key, "left"), np.searchsorted(rx_sorted, key, "right")
+        rlo, rhi = np.searchsorted(rtt_sorted, key, "left"), np.searchsorted(rtt_sorted, key, "right")
+        yield key, stats(int(hi - lo), int(lost_sorted[lo:hi].sum()), rtt_ms_sorted[rlo:rhi])
+
+
+def windows(m: Measured, window_s: float, step_s: float) -> Iterator[tuple[float, dict]]:
+    """Sliding windows of `window_s` every `step_s` across the measure interval.
+
+    Losses count in the window of the packet that revealed the gap.
+    """
+    rx_order = np.argsort(m.rx_s, kind="stable")
+    rtt_order = np.argsort(m.rtt_s, kind="stable")
+    rx_s = m.rx_s[rx_order]
+    rtt_s = m.rtt_s[rtt_order]
+    rtt_ms = m.rtt_ms[rtt_order]
+    lost_cum = np.concatenate(([0], np.cumsum(m.rx_lost[rx_order])))
+
+    last_start = m.warmup_s + max(m.measure_s - window_s, 0.0)
+    starts = m.warmup_s + step_s * np.arange(int(math.floor((last_start - m.warmup_s) / step_s + 1e-9)) + 1)
+    ends = starts + window_s
+    rx_lo = np.searchsorted(rx_s, starts, side="left")
+    rx_hi = np.searchsorted(rx_s, ends, side="left")
+    rtt_lo = np.searchsorted(rtt_s, starts, side="left")
+    rtt_hi = np.searchsorted(rtt_s, ends, side="left")
+    for idx, start in enumerate(starts.tolist()):
+        lo, hi = rx_lo[idx], rx_hi[idx]
+        yield start, stats(int(hi - lo), int(lost_cum[hi] - lost_cum[lo]), rtt_ms[rtt_lo[idx]:rtt_hi[idx]])
+
+
+def breakdown(
+    m: Measured,
+    hops: dict[int, int] | None = None,
+    window_s: float = WINDOW_S,
+    step_s: float | None = None,
+) -> list[dict]:
+    """Rows for scope run, sender (mote id), hops (hop count, -1 unknown) and window."""
+    run = stats(len(m.rx_lost), int(m.rx_lost.sum()), m.rtt_ms)
+    rows = [{"scope": "run", "group": "", "t_start_s": m.warmup_s, **run}]
+    for mote, row in grouped(m, m.rx_mote, m.rtt_mote):
+        rows.append({"scope": "sender", "group": mote, "t_start_s": m.warmup_s, **row})
+    if hops:
+        ids = np.array(sorted(hops), dtype=np.int64)
+        bands = np.array([hops[mote] for mote in ids.tolist()], dtype=np.int64)
+
+        def band(motes: np.ndarray) -> np.ndarray:
+            pos = np.clip(np.searchsorted(ids, motes), 0, len(ids) - 1)
+            return np.where(ids[pos] == motes, bands[pos], -1)
+
+        for hop, row in grouped(m, band(m.rx_mote), band(m.rtt_mote)):
+            rows.append({"scope": "hops", "group": hop, "t_start_s": m.warmup_s, **row})
+    for start, row in windows(m, window_s, step_s or window_s):
+        rows.append({"scope": "window", "group": "", "t_start_s": start, **row})
+    return rows
+
+
+def collapse_onset_s(rows: list[dict]) -> float | None:
+    """Start of the first non-empty window that breaks the run-level collapse thresholds."""
+    for row in rows:
+        if row["scope"] != "window" or not (row["expected"] or row["rtt_count"]):
+            continue
+        if (row["expected"] and row["pdr"] < PDR_TH) or row["p95_rtt_ms"] > P95_RTT_TH_MS:
+            return row["t_start_s"]
+    return None
+
+
+def load_hops(path: Path) -> dict[int, int]:
+    """mote_id -> hops from a gen_csc.py --topology-out CSV (senders and roots)."""
+    if not path.exists():
+        return {}
+    with path.open("r", newline="", encoding="utf-8") as handle:
+        return {int(row["mote_id"]): int(row["hops"]) for row in csv.DictReader(handle)}
+
+
+def format_row(row: dict) -> dict[str, str]:
+    out = {name: str(row[name]) for name in ("scope", "group", "rx", "expected", "lost", "rtt_count")}
+    out["t_start_s"] = f"{row['t_start_s']:g}"
+    out["pdr"] = f"{row['pdr']:.6f}"
+    for name in ("avg_rtt_ms", "p50_rtt_ms", "p95_rtt_ms", "p99_rtt_ms"):
+        out[name] = f"{row[name]:.2f}"
+    return out
+
+
+def write_metrics_csv(path: Path, rows: list[dict], key: dict[str, str] | None = None) -> None:
+    fieldnames = (KEY_FIELDS if key is not None else []) + METRIC_FIELDS
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    with tmp_path.open("w", newline="", encoding="utf-8") as handle:
+        writer = csv.DictWriter(handle, fieldnames=fieldnames)
+        writer.writeheader()
+        for row in rows:
+            writer.writerow({**(key or {}), **format_row(row)})
+    tmp_path.replace(path)
+
+
+def main() -> int:
+    default_root = Path(__file__).resolve().parents[2]
+    parser = argparse.ArgumentParser(description="Per-sender, per-hop and windowed RTT/PDR from event archives")
+    parser.add_argument("--root-dir", default=str(default_root), help="rpl-benchmark root")
+    parser.add_argument("--results-dir", help="Results directory (default: <root>/results)")
+    parser.add_argument("--stage", action="append", help="Limit to stage (repeatable)")
+    parser.add_argument("--mode", action="append", help="Limit to mode (repeatable)")
+    parser.add_argument("--warmup-s", type=float, default=60, help="Warmup seconds")
+    parser.add_argument("--measure-s", type=float, default=300, help="Measure seconds")
+    parser.add_argument("--clock-second", type=int, default=1000, help="Contiki clock ticks per second")
+    parser.add_argument("--window-s", type=float, default=WINDOW_S, help="Sliding window length")
+    parser.add_argument("--step-s", type=float, help="Sliding window step (default: --window-s)")
+    parser.add_argument("--out", help="Long-format CSV (default: <results>/metrics.csv)")
+    args = parser.parse_args()
+
+    results_dir = Path(args.results_dir) if args.results_dir else Path(args.root_dir) / "results"
+    sweep = SweepArchive(
+        results_dir,
+        set(args.stage) if args.stage else None,
+        set(args.mode) if args.mode else None,
+    )
+    if not len(sweep):
+        print(f"No event archives under {results_dir / 'raw'}", file=sys.stderr)
+        return 1
+
+    start = time.monotonic()
+    out_path = Path(args.out) if args.out else results_dir / "metrics.csv"
+    tmp_path = out_path.with_name(f".{out_path.name}.tmp")
+    onsets = 0
+    with tmp_path.open("w", newline="", encoding="utf-8") as handle:
+        writer = csv.DictWriter(handle, fieldnames=KEY_FIELDS + METRIC_FIELDS + ["collapse_onset_s"])
+        writer.writeheader()
+        for run in sweep.runs():
+            m = measure(archive_columns(run), run.src_names, args.warmup_s, args.measure_s, args.clock_second)
+            hops = load_hops(run.path.with_suffix(".topo.csv"))
+            rows = breakdown(m, hops, args.window_s, args.step_s)
+            onset = collapse_onset_s(rows)
+            onsets += onset is not None
+            extra = {"collapse_onset_s": "" if onset is None else f"{onset:g}"}
+            writer.writerows({**run.key, **format_row(row), **extra} for row in rows)
+    tmp_path.replace(out_path)
+    print(
+        f"{len(sweep)} runs ({onsets} with a collapse onset) in {time.monotonic() - start:.2f}s: {out_path}"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""Parser throughput, peak memory and correctness on synthetic Cooja logs.
+
+A `synth_log.py` log (generated here, or given with its `.truth.json`) is
+run through every parsing path; each gets the best of `--repeat` timed runs
+and one tracemalloc run for the Python-heap peak. PDR, p95 RTT and the
+routing summary are checked against the generator's ground truth.
+
+  ingest          log_ingest.ingest + summaries (what log_parser --cooja-log runs)
+  ingest-csv      same, also writing the CSV extract
+  ingest-gzip     ingest of the gzip-stored log
+  ingest-zstd     ingest of the zstd-stored log (needs `zstandard`)
+  parse-csv       log_parser.parse_csv on the CSV extract (legacy second pass)
+  parse-rx-csv    tools/parse_rx_csv.py; throughput only, it expects a 10-field
+                  RX record that receiver_root.c no longer prints
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import gc
+import json
+import math
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable
+
+from log_codec import compress_log
+from log_ingest import ingest, summarize, summarize_control
+from log_parser import parse_csv
+from synth_log import GroundTruth, SynthSpec, add_spec_args, generate, spec_from_args, truth_path, write_truth
+
+PATHS = ("ingest", "ingest-csv", "ingest-gzip", "ingest-zstd", "parse-csv", "parse-rx-csv")
+BENCH_FIELDS = [
+    "path",
+    "input_mb",
+    "text_mb",
+    "lines",
+    "best_s",
+    "mb_per_s",
+    "lines_per_s",
+    "peak_mb",
+    "check",
+]
+PDR_TOL = 1e-9
+RTT_TOL_MS = 1e-6
+JOIN_TOL_S = 1e-3
+
+
+@dataclass
+class BenchInput:
+    path: Path
+    text_bytes: int
+    lines: int
+
+    def __post_init__(self) -> None:
+        self.stored_bytes = self.path.stat().st_size
+
+
+@dataclass
+class BenchResult:
+    path: str
+    input: BenchInput
+    best_s: float
+    peak_bytes: int
+    check: str
+
+    def row(self) -> dict[str, str]:
+        return {
+            "path": self.path,
+            "input_mb": f"{self.input.stored_bytes / 1e6:.2f}",
+            "text_mb": f"{self.input.text_bytes / 1e6:.2f}",
+            "lines": str(self.input.lines),
+            "best_s": f"{self.best_s:.3f}",
+            "mb_per_s": f"{self.input.text_bytes / 1e6 / self.best_s:.1f}" if self.best_s else "",
+            "lines_per_s": f"{self.input.lines / self.best_s:.0f}" if self.best_s else "",
+            "peak_mb": f"{self.peak_bytes / 1e6:.1f}",
+            "check": self.check,
+        }
+
+
+def _legacy_parse_log() -> Callable[[Path], dict]:
+    sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+    try:
+        from parse_rx_csv import parse_log
+    finally:
+        sys.path.pop(0)
+    return parse_log
+
+
+def ingest_result(events, spec: SynthSpec) -> dict:
+    result = summarize(events, spec.warmup_s, spec.measure_s, spec.clock_second)
+    result.update(summarize_control(events))
+    return result
+
+
+def compare(result: dict | None, truth: GroundTruth) -> str:
+    """`ok`, `n/a`, or the mismatching fields."""
+    if result is None:
+        return "n/a"
+    errors = []
+    if (result["rx"], result["expected"]) != (truth.rx, truth.expected):
+        errors.append(f"rx/expected {result['rx']}/{result['expected']} != {truth.rx}/{truth.expected}")
+    if abs(result["pdr"] - truth.pdr) > PDR_TOL:
+        errors.append(f"pdr {result['pdr']:.6f} != {truth.pdr:.6f}")
+    if abs(result["p95_rtt_ms"] - truth.p95_rtt_ms) > RTT_TOL_MS:
+        errors.append(f"p95 {result['p95_rtt_ms']:.2f} != {truth.p95_rtt_ms:.2f}")
+    if "ctrl_tx" in result:
+        if int(result["ctrl_tx"]) != truth.ctrl_tx:
+            errors.append(f"ctrl_tx {result['ctrl_tx']} != {truth.ctrl_tx}")
+        if int(result["joined_nodes"]) != truth.joined_nodes:
+            errors.append(f"joined_nodes {result['joined_nodes']} != {truth.joined_nodes}")
+        if truth.join_time_med_s is not None and (
+            not result["join_time_med_s"] or abs(float(result["join_time_med_s"]) - truth.join_time_med_s) > JOIN_TOL_S
+        ):
+            errors.append(f"join_time_med_s {result['join_time_med_s']} != {truth.join_time_med_s:.3f}")
+        if truth.parent_switches is not None and int(result["parent_switches"]) != truth.parent_switches:
+            errors.append(f"parent_switches {result['parent_switches']} != {truth.parent_switches}")
+    return "ok" if not errors else "FAIL " + "; ".join(errors)
+
+
+def measure_path(run: Callable[[], dict | None], repeat: int) -> tuple[float, int, dict | None]:
+    """(best wall seconds, tracemalloc peak bytes, result of the last run)."""
+    best = math.inf
+    result = None
+    for _ in range(max(1, repeat)):
+        gc.collect()
+        start = time.perf_counter()
+        result = run()
+        best = min(best, time.perf_counter() - start)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return best, peak, result
+
+
+def run_bench(
+    log_path: Path,
+    spec: SynthSpec,
+    truth: GroundTruth,
+    paths: list[str],
+    repeat: int,
+    work_dir: Path,
+) -> list[BenchResult]:
+    log_input = BenchInput(log_path, truth.bytes, truth.lines)
+    csv_path = work_dir / "extract.csv"
+    ingest(log_path, csv_path)
+    with csv_path.open("rb") as handle:
+        csv_input = BenchInput(csv_path, csv_path.stat().st_size, sum(1 for _ in handle))
+
+    extract_out = work_dir / "bench.csv"
+
+    def prepare(name: str) -> tuple[BenchInput, Callable[[], dict | None]]:
+        if name == "ingest":
+            return log_input, lambda: ingest_result(ingest(log_path), spec)
+        if name == "ingest-csv":
+            return log_input, lambda: ingest_result(ingest(log_path, extract_out), spec)
+        if name in ("ingest-gzip", "ingest-zstd"):
+            copy = work_dir / f"{name}.log"
+            copy.write_bytes(log_path.read_bytes())
+            stored = compress_log(copy, name.split("-")[1])
+            return BenchInput(stored, truth.bytes, truth.lines), lambda: ingest_result(ingest(stored), spec)
+        if name == "parse-csv":
+            return csv_input, lambda: parse_csv(csv_path, spec.warmup_s, spec.measure_s, spec.clock_second)
+        parse_log = _legacy_parse_log()
+
+        def legacy() -> None:
+            parse_log(log_path)
+
+        return log_input, legacy
+
+    results = []
+    for name in paths:
+        try:
+            bench_input, run = prepare(name)
+        except RuntimeError as exc:
+            print(f"parse_bench: skipping {name}: {exc}", file=sys.stderr)
+            continue
+        best, peak, result = measure_path(run, repeat)
+        results.append(BenchResult(name, bench_input, best, peak, compare(result, truth)))
+    return results
+
+
+def load_truth(log_path: Path) -> tuple[SynthSpec, GroundTruth]:
+    data = json.loads(truth_path(log_path).read_text())
+    return SynthSpec(**data["spec"]), GroundTruth(**data["truth"])
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Parser throughput/memory/correctness on synthetic logs")
+    parser.add_argument("--log", help="Existing synth_log.py output (with its .truth.json) instead of generating")
+    parser.add_argument("--path", action="append", choices=PATHS, help="Parsing path to run (repeatable)")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per path (best is reported)")
+    parser.add_argument("--out", help="Also write the results CSV here")
+    parser.add_argument("--keep-log", help="Keep the generated log at this path")
+    add_spec_args(parser)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="parse_bench.") as tmp:
+        work_dir = Path(tmp)
+        if args.log:
+            log_path = Path(args.log)
+            spec, truth = load_truth(log_path)
+        else:
+            spec = spec_from_args(args)
+            log_path = Path(args.keep_log) if args.keep_log else work_dir / "COOJA.testlog"
+            start = time.perf_counter()
+            truth = generate(spec, log_path)
+            if args.keep_log:
+                write_truth(log_path, spec, truth)
+            print(
+                f"Generated N={spec.senders} si={spec.send_interval_s:g}s {spec.duration_s:g}s "
+                f"verbosity={spec.verbosity} loss={spec.loss:g}: {truth.lines} lines, "
+                f"{truth.bytes / 1e6:.1f} MB in {time.perf_counter() - start:.1f}s"
+            )
+        results = run_bench(log_path, spec, truth, args.path or list(PATHS), args.repeat, work_dir)
+
+    rows = [result.row() for result in results]
+    print(
+        f"{'path':<13} {'input_MB':>8} {'MB/s':>7} {'lines/s':>10} {'best_s':>7} {'peak_MB':>8}  check"
+    )
+    for row in rows:
+        print(
+            f"{row['path']:<13} {row['input_mb']:>8} {row['mb_per_s']:>7} {row['lines_per_s']:>10} "
+            f"{row['best_s']:>7} {row['peak_mb']:>8}  {row['check']}"
+        )
+    if args.out:
+        with open(args.out, "w", newline="", encoding="utf-8") as handle:
+            writer = csv.DictWriter(handle, fieldnames=BENCH_FIELDS)
+            writer.writeheader()
+            writer.writerows(rows)
+        print(f"Benchmark results written to: {args.out}")
+    return 1 if any(row["check"].startswith("FAIL") for row in rows) else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""Re-analyze every results/raw log in parallel and rebuild the summary in one write.
+
+The per-run event archive (`<basename>.events/`, written by log_parser at run
+time) is the cache: a run whose archive is current is rebuilt from its columns,
+so re-running with new window parameters never re-reads the text logs.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from event_archive import archive_dir_for, archive_is_current, load_events, write_archive
+from log_codec import CODECS, SUFFIXES, find_log, plain_path
+from log_ingest import LogEvents, ingest, summarize, summarize_control
+from log_parser import summary_row
+from results_store import default_store_path, open_store
+
+BASENAME_RE = re.compile(
+    r"^N(?P<n>\d+)_seed(?P<seed>\d+)_sr(?P<sr>[0-9p]+)_ir(?P<ir>[0-9p]+)_si(?P<si>[0-9p]+)$"
+)
+STDOUT_SUFFIX = ".stdout.log"
+
+
+def run_basename(log_path: Path) -> str:
+    name = plain_path(log_path).name
+    for suffix in (STDOUT_SUFFIX, ".log"):
+        if name.endswith(suffix):
+            return name[: -len(suffix)]
+    return name
+
+
+def parse_run_path(log_path: Path) -> dict | None:
+    match = BASENAME_RE.match(run_basename(log_path))
+    if match is None:
+        return None
+    return {
+        "mode": log_path.parent.name,
+        "stage": log_path.parent.parent.name,
+        "n_senders": int(match["n"]),
+        "seed": int(match["seed"]),
+        "success_ratio": float(match["sr"].replace("p", ".")),
+        "interference_ratio": float(match["ir"].replace("p", ".")),
+        "send_interval_s": int(float(match["si"].replace("p", "."))),
+    }
+
+
+def find_logs(raw_dir: Path, stages: set[str] | None, modes: set[str] | None) -> list[Path]:
+    """One stored log per run, plain or compressed; Cooja stdout when the run log is missing."""
+    patterns = ["*/*/*.log", *(f"*/*/*.log{SUFFIXES[codec]}" for codec in CODECS)]
+    plain = {plain_path(path) for pattern in patterns for path in raw_dir.glob(pattern)}
+    run_logs = sorted({path.with_name(f"{run_basename(path)}.log") for path in plain})
+    logs: list[Path] = []
+    for run_log in run_logs:
+        log_path = find_log(run_log) or find_log(run_log.with_name(run_log.name[: -len(".log")] + STDOUT_SUFFIX))
+        if log_path is None:
+            continue
+        stage = log_path.parent.parent.name
+        mode = log_path.parent.name
+        if stages and stage not in stages:
+            continue
+        if modes and mode not in modes:
+            continue
+        if parse_run_path(log_path) is None:
+            continue
+        logs.append(log_path)
+    return logs
+
+
+def load_or_ingest(log_path: Path, archive_dir: Path) -> tuple[LogEvents, str]:
+    """Events from the run's archive when it is current, else from the log itself."""
+    if archive_is_current(log_path, archive_dir):
+        return load_events(archive_dir), "hit"
+    return ingest(log_path), "parse"
+
+
+def analyze_one(task: tuple[str, dict]) -> tuple[dict[str, str], str]:
+    log_str, params = task
+    log_path = Path(log_str)
+    base = log_path.with_name(run_basename(log_path))
+    archive_dir = archive_dir_for(base.with_name(f"{base.name}.log"))
+    events, how = load_or_ingest(log_path, archive_dir)
+    summary = summarize(events, params["warmup_s"], params["measure_s"], params["clock_second"])
+    meta = parse_run_path(log_path) or {}
+    csc_path = base.with_name(f"{base.name}.csc")
+    status_path = base.with_name(f"{base.name}.status")
+    if status_path.exists():
+        meta["run_status"] = status_path.read_text().strip()
+    meta.update(
+        duration_s=params["duration_s"],
+        warmup_s=params["warmup_s"],
+        measure_s=params["measure_s"],
+        log_path=str(log_path),
+        csc_path=str(csc_path),
+    )
+    row = summary_row(meta, summary, events.dio_count, events.dao_count, summarize_control(events))
+    if how == "parse":
+        write_archive(events, archive_dir, row)
+    return row, how
+
+
+def main() -> int:
+    default_root = Path(__file__).resolve().parents[2]
+    parser = argparse.ArgumentParser(description="Parallel, cached re-analysis of results/raw")
+    parser.add_argument("--root-dir", default=str(default_root), help="rpl-benchmark root")
+    parser.add_argument("--results-dir", help="Results directory (default: <root>/results)")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="Worker processes")
+    parser.add_argument("--stage", action="append", help="Limit to stage (repeatable)")
+    parser.add_argument("--mode", action="append", help="Limit to mode (repeatable)")
+    parser.add_argument("--duration-s", type=int, default=360, help="Simulation duration seconds")
+    parser.add_argument("--warmup-s", type=int, default=60, help="Warmup seconds")
+    parser.add_argument("--measure-s", type=int, default=300, help="Measure seconds")
+    parser.add_argument("--clock-second", type=int, default=1000, help="Contiki clock ticks per second")
+    args = parser.parse_args()
+
+    results_dir = Path(args.results_dir) if args.results_dir else Path(args.root_dir) / "results"
+    results_dir = results_dir.resolve()
+    raw_dir = results_dir / "raw"
+
+    logs = find_logs(
+        raw_dir,
+        set(args.stage) if args.stage else None,
+        set(args.mode) if args.mode else None,
+    )
+    if not logs:
+        print(f"No run logs found under {raw_dir}", file=sys.stderr)
+        return 1
+
+    params = {
+        "duration_s": args.duration_s,
+        "warmup_s": args.warmup_s,
+        "measure_s": args.measure_s,
+        "clock_second": args.clock_second,
+    }
+    tasks = [(str(path), params) for path in logs]
+
+    start = time.monotonic()
+    rows: list[dict[str, str]] = []
+    counts = {"hit": 0, "parse": 0}
+    with ProcessPoolExecutor(max_workers=max(1, args.jobs)) as executor:
+        for row, how in executor.map(analyze_one, tasks, chunksize=4):
+            rows.append(row)
+            counts[how] += 1
+
+    summary_path = results_dir / "summary.csv"
+    with open_store(default_store_path(summary_path), summary_path) as store:
+        store.upsert_many(rows)
+        total = store.export_csv(summary_path)
+
+    print(
+        f"Re-analyzed {len(rows)} logs in {time.monotonic() - start:.1f}s "
+        f"(archived={counts['hit']}, parsed={counts['parse']}); "
+        f"summary: {summary_path} ({total} rows)"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
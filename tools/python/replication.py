@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""Sequential seed replication: more seeds only where a condition is still uncertain.
+
+Every condition gets `min_seeds` seeds; after each round, a condition whose
+Student-t confidence interval on PDR (absolute half-width) or p95 RTT
+(half-width relative to the mean) is still wider than its target gets more
+seeds, up to `max_seeds`. Conditions with identical results on every seed
+(PDR 1.0 everywhere) stop at the minimum.
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import math
+import statistics
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+
+from collapse import CollapseTracker, Condition, condition_key, load_tracker, to_float
+
+DEFAULT_MIN_SEEDS = 2
+DEFAULT_MAX_SEEDS = 8
+DEFAULT_PDR_HALF_WIDTH = 0.02
+DEFAULT_P95_REL_HALF_WIDTH = 0.10
+DEFAULT_CONFIDENCE = 0.95
+REPORT_FIELDS = [
+    "mode",
+    "stage",
+    "n_senders",
+    "success_ratio",
+    "interference_ratio",
+    "send_interval_s",
+    "seeds",
+    "pdr_mean",
+    "pdr_half_width",
+    "p95_mean_ms",
+    "p95_half_width_ms",
+    "decision",
+]
+
+
+def t_quantile(p: float, df: int) -> float:
+    """Student t quantile; exact for df <= 2, Cornish-Fisher expansion above (within 1% for df >= 3)."""
+    if df == 1:
+        return math.tan(math.pi * (p - 0.5))
+    if df == 2:
+        return (2 * p - 1) / math.sqrt(2 * p * (1 - p))
+    z = statistics.NormalDist().inv_cdf(p)
+    z2 = z * z
+    return z + (
+        (z2 + 1) * z / (4 * df)
+        + ((5 * z2 + 16) * z2 + 3) * z / (96 * df ** 2)
+        + (((3 * z2 + 19) * z2 + 17) * z2 - 15) * z / (384 * df ** 3)
+    )
+
+
+def half_width(values: list[float], confidence: float) -> float | None:
+    """CI half-width of the mean; None below two samples."""
+    if len(values) < 2:
+        return None
+    return t_quantile(0.5 + confidence / 2, len(values) - 1) * statistics.stdev(values) / math.sqrt(len(values))
+
+
+@dataclass(frozen=True)
+class ReplicationPolicy:
+    min_seeds: int = DEFAULT_MIN_SEEDS
+    max_seeds: int = DEFAULT_MAX_SEEDS
+    pdr_half_width: float = DEFAULT_PDR_HALF_WIDTH
+    p95_rel_half_width: float = DEFAULT_P95_REL_HALF_WIDTH
+    confidence: float = DEFAULT_CONFIDENCE
+
+
+@dataclass
+class Estimate:
+    seeds: int
+    pdr_mean: float | None
+    pdr_hw: float | None
+    p95_mean: float | None
+    p95_hw: float | None
+
+
+def estimate(cond: Condition | None, confidence: float) -> Estimate:
+    if cond is None:
+        return Estimate(0, None, None, None, None)
+    pdr = [v for v in (to_float(row.get("pdr")) for row in cond.runs.values()) if v is not None]
+    # Invalid runs have no RTT samples, so their p95 is not a measurement.
+    p95 = [
+        v for v in (
+            to_float(row.get("p95_rtt_ms")) for row in cond.runs.values()
+            if str(row.get("invalid_run", "0")) != "1"
+        )
+        if v is not None
+    ]
+    return Estimate(
+        cond.seeds,
+        statistics.fmean(pdr) if pdr else None,
+        half_width(pdr, confidence),
+        statistics.fmean(p95) if p95 else None,
+        half_width(p95, confidence),
+    )
+
+
+def decide(est: Estimate, policy: ReplicationPolicy) -> tuple[int, str]:
+    """(extra seeds wanted, reason): `min`, `pdr_ci`/`p95_ci` while wide, else `tight` or `budget`."""
+    if est.seeds < policy.min_seeds:
+        return policy.min_seeds - est.seeds, "min"
+    wanted = est.seeds
+    reason = "tight"
+    if est.pdr_hw is not None and est.pdr_hw > policy.pdr_half_width:
+        wanted = max(wanted, math.ceil(est.seeds * (est.pdr_hw / policy.pdr_half_width) ** 2))
+        reason = "pdr_ci"
+    if est.p95_hw is not None and est.p95_mean:
+        target = policy.p95_rel_half_width * est.p95_mean
+        if est.p95_hw > target:
+            wanted = max(wanted, math.ceil(est.seeds * (est.p95_hw / target) ** 2))
+            reason = "p95_ci" if reason == "tight" else reason
+    if reason == "tight":
+        return 0, reason
+    if est.seeds >= policy.max_seeds:
+        return 0, "budget"
+    # Project from the current spread, but at most double per round.
+    extra = min(wanted, 2 * est.seeds, policy.max_seeds) - est.seeds
+    return max(1, extra), reason
+
+
+def seed_sequence(seeds: list[int], max_seeds: int) -> list[int]:
+    """The given seeds first, then consecutive new ones up to `max_seeds`."""
+    sequence = list(dict.fromkeys(seeds))
+    next_seed = max(sequence, default=0) + 1
+    while len(sequence) < max_seeds:
+        sequence.append(next_seed)
+        next_seed += 1
+    return sequence[:max(max_seeds, 1)]
+
+
+def next_seeds(
+    tracker: CollapseTracker,
+    key: dict[str, str],
+    sequence: list[int],
+    tried: set[int],
+    policy: ReplicationPolicy,
+) -> tuple[list[int], str]:
+    """Seeds to run next for the condition of run key `key` (empty when it is settled).
+
+    Seeds already tried are never repeated, so a seed that left no row counts
+    against the budget instead of being retried forever.
+    """
+    cond_key = condition_key(key)
+    cond = tracker.condition(cond_key) if cond_key is not None else None
+    extra, reason = decide(estimate(cond, policy.confidence), policy)
+    have = set(cond.runs) if cond is not None else set()
+    todo = [seed for seed in sequence if seed not in tried and str(seed) not in have]
+    if extra and not todo:
+        return [], "budget"
+    return todo[:extra], reason
+
+
+def report_rows(tracker: CollapseTracker, policy: ReplicationPolicy, stage: str | None = None) -> list[dict]:
+    rows = []
+    for key, cond in sorted(tracker.conditions.items()):
+        if stage is not None and key[1] != stage:
+            continue
+        est = estimate(cond, policy.confidence)
+        extra, reason = decide(est, policy)
+        mode, stage_name, n, success, interference, interval = key
+        rows.append({
+            "mode": mode,
+            "stage": stage_name,
+            "n_senders": n,
+            "success_ratio": success,
+            "interference_ratio": interference,
+            "send_interval_s": f"{interval:g}",
+            "seeds": est.seeds,
+            "pdr_mean": "" if est.pdr_mean is None else f"{est.pdr_mean:.6f}",
+            "pdr_half_width": "" if est.pdr_hw is None else f"{est.pdr_hw:.6f}",
+            "p95_mean_ms": "" if est.p95_mean is None else f"{est.p95_mean:.2f}",
+            "p95_half_width_ms": "" if est.p95_hw is None else f"{est.p95_hw:.2f}",
+            "decision": reason if extra == 0 else f"more:{reason}",
+        })
+    return rows
+
+
+def write_report(path: Path, rows: list[dict]) -> None:
+    with path.open("w", newline="", encoding="utf-8") as handle:
+        writer = csv.DictWriter(handle, fieldnames=REPORT_FIELDS)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def add_policy_args(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--min-seeds", type=int, default=DEFAULT_MIN_SEEDS, help="Seeds every condition gets")
+    parser.add_argument("--max-seeds", type=int, default=DEFAULT_MAX_SEEDS, help="Per-condition seed budget")
+    parser.add_argument(
+        "--pdr-half-width",
+        type=float,
+        default=DEFAULT_PDR_HALF_WIDTH,
+        help="Target CI half-width on mean PDR (absolute)",
+    )
+    parser.add_argument(
+        "--p95-rel-half-width",
+        type=float,
+        default=DEFAULT_P95_REL_HALF_WIDTH,
+        help="Target CI half-width on mean p95 RTT, relative to the mean",
+    )
+    parser.add_argument("--confidence", type=float, default=DEFAULT_CONFIDENCE, help="CI confidence level")
+
+
+def policy_from_args(args: argparse.Namespace) -> ReplicationPolicy:
+    return ReplicationPolicy(
+        min_seeds=max(1, args.min_seeds),
+        max_seeds=max(args.min_seeds, args.max_seeds),
+        pdr_half_width=args.pdr_half_width,
+        p95_rel_half_width=args.p95_rel_half_width,
+        confidence=args.confidence,
+    )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Per-condition CI half-widths and replication decisions")
+    parser.add_argument("--summary", default="results/summary.csv", help="summary.csv path")
+    parser.add_argument("--stage", help="Limit to stage")
+    parser.add_argument("--out", help="Write the report CSV here instead of printing it")
+    add_policy_args(parser)
+    args = parser.parse_args()
+
+    rows = report_rows(load_tracker(Path(args.summary)), policy_from_args(args), args.stage)
+    if not rows:
+        print(f"No conditions in {args.summary}", file=sys.stderr)
+        return 1
+    if args.out:
+        write_report(Path(args.out), rows)
+        print(f"Replication report written to: {args.out}")
+        return 0
+    writer = csv.DictWriter(sys.stdout, fieldnames=REPORT_FIELDS)
+    writer.writeheader()
+    writer.writerows(rows)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""SQLite-backed results store keyed by run condition, with summary.csv export."""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import os
+import sqlite3
+from pathlib import Path
+from typing import Iterable
+
+KEY_FIELDS = [
+    "mode",
+    "stage",
+    "n_senders",
+    "seed",
+    "success_ratio",
+    "interference_ratio",
+    "send_interval_s",
+]
+
+SUMMARY_FIELDS = KEY_FIELDS + [
+    "rx_count",
+    "tx_expected",
+    "pdr",
+    "avg_rtt_ms",
+    "p95_rtt_ms",
+    "avg_delay_ms",
+    "p95_delay_ms",
+    "invalid_run",
+    "dio_count",
+    "dao_count",
+    "ctrl_tx",
+    "ctrl_msgs_per_s",
+    "join_time_med_s",
+    "join_time_max_s",
+    "joined_nodes",
+    "parent_switches",
+    "parent_switch_per_node_min",
+    "duration_s",
+    "warmup_s",
+    "measure_s",
+    "log_path",
+    "csc_path",
+    "run_status",
+]
+
+TIMING_FIELDS = KEY_FIELDS + [
+    "phase",
+    "wall_s",
+    "max_rss_kb",
+    "sim_s",
+    "sim_speed",
+    "exit_code",
+    "recorded_at",
+]
+
+LEDGER_FIELDS = ["config_hash"] + KEY_FIELDS + [
+    "state",
+    "attempts",
+    "exit_code",
+    "run_status",
+    "host",
+    "config",
+    "created_at",
+    "started_at",
+    "finished_at",
+]
+
+BUSY_TIMEOUT_S = 120.0
+
+
+def default_store_path(summary_csv: Path) -> Path:
+    return summary_csv.with_suffix(".db")
+
+
+class ResultsStore:
+    """One row per run key; writers from parallel workers serialize via SQLite locking."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(path), timeout=BUSY_TIMEOUT_S)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        columns = ", ".join(f"{name} TEXT NOT NULL DEFAULT ''" for name in SUMMARY_FIELDS)
+        keys = ", ".join(KEY_FIELDS)
+        timing_columns = ", ".join(f"{name} TEXT NOT NULL DEFAULT ''" for name in TIMING_FIELDS)
+        ledger_columns = ", ".join(f"{name} TEXT NOT NULL DEFAULT ''" for name in LEDGER_FIELDS)
+        with self.conn:
+            self.conn.execute(f"CREATE TABLE IF NOT EXISTS runs ({columns}, PRIMARY KEY ({keys}))")
+            self.conn.execute(
+                f"CREATE TABLE IF NOT EXISTS timings ({timing_columns}, PRIMARY KEY ({keys}, phase))"
+            )
+            self.conn.execute(f"CREATE TABLE IF NOT EXISTS ledger ({ledger_columns}, PRIMARY KEY (config_hash))")
+        self._ensure_columns()
+
+    def _ensure_columns(self) -> None:
+        existing = {row[1] for row in self.conn.execute("PRAGMA table_info(runs)")}
+        with self.conn:
+            for name in SUMMARY_FIELDS:
+                if name not in existing:
+                    self.conn.execute(f"ALTER TABLE runs ADD COLUMN {name} TEXT NOT NULL DEFAULT ''")
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def __enter__(self) -> "ResultsStore":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+    def upsert_many(self, rows: Iterable[dict[str, str]]) -> int:
+        columns = ", ".join(SUMMARY_FIELDS)
+        placeholders = ", ".join("?" for _ in SUMMARY_FIELDS)
+        updates = ", ".join(f"{name}=excluded.{name}" for name in SUMMARY_FIELDS if name not in KEY_FIELDS)
+        sql = (
+            f"INSERT INTO runs ({columns}) VALUES ({placeholders}) "
+            f"ON CONFLICT ({', '.join(KEY_FIELDS)}) DO UPDATE SET {updates}"
+        )
+        values = [tuple(str(row.get(name, "") or "") for name in SUMMARY_FIELDS) for row in rows]
+        with self.conn:
+            self.conn.executemany(sql, values)
+        return len(values)
+
+    def upsert(self, row: dict[str, str]) -> None:
+        self.upsert_many([row])
+
+    def rows(self, stage: str | None = None, mode: str | None = None) -> list[dict[str, str]]:
+        clauses = []
+        params: list[str] = []
+        if stage is not None:
+            clauses.append("stage = ?")
+            params.append(stage)
+        if mode is not None:
+            clauses.append("mode = ?")
+            params.append(mode)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        sql = f"SELECT {', '.join(SUMMARY_FIELDS)} FROM runs{where} ORDER BY {', '.join(KEY_FIELDS)}"
+        return [dict(zip(SUMMARY_FIELDS, values)) for values in self.conn.execute(sql, params)]
+
+    def upsert_timings(self, rows: Iterable[dict[str, str]]) -> int:
+        """Phase timings keyed by run key + phase (sweep-level rows leave key fields empty)."""
+        columns = ", ".join(TIMING_FIELDS)
+        placeholders = ", ".join("?" for _ in TIMING_FIELDS)
+        sql = f"INSERT OR REPLACE INTO timings ({columns}) VALUES ({placeholders})"
+        values = [tuple(str(row.get(name, "") or "") for name in TIMING_FIELDS) for row in rows]
+        with self.conn:
+            self.conn.executemany(sql, values)
+        return len(values)
+
+    def timings(self) -> list[dict[str, str]]:
+        sql = f"SELECT {', '.join(TIMING_FIELDS)} FROM timings ORDER BY {', '.join(KEY_FIELDS)}, phase"
+        return [dict(zip(TIMING_FIELDS, values)) for values in self.conn.execute(sql)]
+
+    def row(self, key: dict[str, str]) -> dict[str, str] | None:
+        clauses = " AND ".join(f"{name} = ?" for name in KEY_FIELDS)
+        params = [str(key.get(name, "")) for name in KEY_FIELDS]
+        values = self.conn.execute(f"SELECT {', '.join(SUMMARY_FIELDS)} FROM runs WHERE {clauses}", params).fetchone()
+        return dict(zip(SUMMARY_FIELDS, values)) if values else None
+
+    def has_run(self, key: dict[str, str]) -> bool:
+        return self.row(key) is not None
+
+    def ledger_entry(self, config_hash: str) -> dict[str, str] | None:
+        sql = f"SELECT {', '.join(LEDGER_FIELDS)} FROM ledger WHERE config_hash = ?"
+        values = self.conn.execute(sql, (config_hash,)).fetchone()
+        return dict(zip(LEDGER_FIELDS, values)) if values else None
+
+    def upsert_ledger(self, entry: dict[str, str]) -> None:
+        columns = ", ".join(LEDGER_FIELDS)
+        placeholders = ", ".join("?" for _ in LEDGER_FIELDS)
+        with self.conn:
+            self.conn.execute(
+                f"INSERT OR REPLACE INTO ledger ({columns}) VALUES ({placeholders})",
+                tuple(str(entry.get(name, "")) for name in LEDGER_FIELDS),
+            )
+
+    def ledger(self, stage: str | None = None) -> list[dict[str, str]]:
+        where = " WHERE stage = ?" if stage is not None else ""
+        params = [stage] if stage is not None else []
+        sql = f"SELECT {', '.join(LEDGER_FIELDS)} FROM ledger{where} ORDER BY {', '.join(KEY_FIELDS)}"
+        return [dict(zip(LEDGER_FIELDS, values)) for values in self.conn.execute(sql, params)]
+
+    def count(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM runs").fetchone()[0]
+
+    def import_csv(self, csv_path: Path) -> int:
+        with csv_path.open("r", newline="", encoding="utf-8") as handle:
+            return self.upsert_many(csv.DictReader(handle))
+
+    def export_csv(self, out_path: Path) -> int:
+        """Write the summary.csv schema atomically (temp file + rename)."""
+        rows = self.rows()
+        tmp_path = out_path.with_name(f".{out_path.name}.{os.getpid()}.tmp")
+        with tmp_path.open("w", encoding="utf-8", newline="") as handle:
+            writer = csv.DictWriter(handle, fieldnames=SUMMARY_FIELDS)
+            writer.writeheader()
+            writer.writerows(rows)
+        os.replace(tmp_path, out_path)
+        return len(rows)
+
+
+def open_store(store_path: Path, summary_csv: Path | None = None) -> ResultsStore:
+    """Open the store, seeding a brand-new one from an existing summary.csv."""
+    is_new = not store_path.exists()
+    store = ResultsStore(store_path)
+    if is_new and summary_csv is not None and summary_csv.exists():
+        store.import_csv(summary_csv)
+    return store
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Results store maintenance")
+    parser.add_argument("command", choices=["export", "import", "count"], help="Action")
+    parser.add_argument("--summary", default="results/summary.csv", help="summary.csv path")
+    parser.add_argument("--store", help="SQLite store path (default: summary path with .db suffix)")
+    args = parser.parse_args()
+
+    summary_path = Path(args.summary)
+    store_path = Path(args.store) if args.store else default_store_path(summary_path)
+
+    if args.command == "import":
+        with ResultsStore(store_path) as store:
+            count = store.import_csv(summary_path)
+        print(f"Imported {count} rows from {summary_path} into {store_path}")
+    elif args.command == "export":
+        with open_store(store_path, summary_path) as store:
+            count = store.export_csv(summary_path)
+        print(f"Exported {count} rows to {summary_path}")
+    else:
+        with ResultsStore(store_path) as store:
+            print(store.count())
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+"""Per-node routing and control-plane timelines from the Cooja testlog.
+
+`LogIngester` hands every `<time_us> <mote>` prefixed line to `RoutingIndexer`,
+which keeps typed columns for:
+
+  state   sender.c `routing state:` samples (joined, reachable, routes, defrt)
+  flip    sender.c `reachable changed:` transitions
+  parent  RPL preferred-parent changes (rpl-lite `parent switch: A -> B`,
+          rpl-classic `rpl_set_preferred_parent B used to be A`)
+  ctrl    RPL DIS/DIO/DAO/DAO-ACK sent or received, one row per message
+
+IPv6 addresses are interned into `addr_names`; -1 means none.
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import re
+import sys
+from array import array
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import numpy as np
+
+CTRL_TYPES = ("DIS", "DIO", "DAO", "DAO-NOPATH", "DAO-ACK", "DAO-NACK")
+CTRL_TX = 0
+CTRL_RX = 1
+NO_ADDR = -1
+COLUMNS: dict[str, str] = {
+    "state_time_us": "<i8",
+    "state_mote": "<i4",
+    "state_joined": "<i1",
+    "state_reachable": "<i1",
+    "state_routes": "<i4",
+    "state_defrt": "<i4",
+    "flip_time_us": "<i8",
+    "flip_mote": "<i4",
+    "flip_to": "<i1",
+    "parent_time_us": "<i8",
+    "parent_mote": "<i4",
+    "parent_old": "<i4",
+    "parent_new": "<i4",
+    "ctrl_time_us": "<i8",
+    "ctrl_mote": "<i4",
+    "ctrl_type": "<i1",
+    "ctrl_dir": "<i1",
+}
+SUMMARY_FIELDS = [
+    "ctrl_tx",
+    "ctrl_msgs_per_s",
+    "join_time_med_s",
+    "join_time_max_s",
+    "joined_nodes",
+    "parent_switches",
+    "parent_switch_per_node_min",
+]
+
+_ADDR = rb"(\(NULL IP addr\)|\S+)"
+STATE_RE = re.compile(rb"routing state: joined=(-?\d+) reachable=(\d+) routes=(-?\d+) defrt=(?:yes defrt=(\S+)|no)")
+FLIP_RE = re.compile(rb"reachable changed: (\d+) -> (\d+)")
+LITE_PARENT_RE = re.compile(rb"parent switch: " + _ADDR + rb" -> " + _ADDR)
+CLASSIC_PARENT_RE = re.compile(rb"rpl_set_preferred_parent " + _ADDR + rb" used to be " + _ADDR)
+CTRL_RE = re.compile(
+    rb"\b(?:(sending)|received) (?:an? )?(?:(?:multicast|unicast)-)?(no-path )?(DIS|DIO|DAO)\b(?:[- ](N?ACK)\b)?",
+    re.IGNORECASE,
+)
+NULL_ADDRS = {b"(NULL IP addr)", b"NULL"}
+MARKERS = (b"RPL", b"routing state:", b"reachable changed:")
+_CTRL_CODES = {name.encode(): idx for idx, name in enumerate(CTRL_TYPES)}
+
+
+@dataclass
+class RoutingEvents:
+    state_time_us: array = field(default_factory=lambda: array("q"))
+    state_mote: array = field(default_factory=lambda: array("q"))
+    state_joined: array = field(default_factory=lambda: array("q"))
+    state_reachable: array = field(default_factory=lambda: array("q"))
+    state_routes: array = field(default_factory=lambda: array("q"))
+    state_defrt: array = field(default_factory=lambda: array("q"))
+    flip_time_us: array = field(default_factory=lambda: array("q"))
+    flip_mote: array = field(default_factory=lambda: array("q"))
+    flip_to: array = field(default_factory=lambda: array("q"))
+    parent_time_us: array = field(default_factory=lambda: array("q"))
+    parent_mote: array = field(default_factory=lambda: array("q"))
+    parent_old: array = field(default_factory=lambda: array("q"))
+    parent_new: array = field(default_factory=lambda: array("q"))
+    ctrl_time_us: array = field(default_factory=lambda: array("q"))
+    ctrl_mote: array = field(default_factory=lambda: array("q"))
+    ctrl_type: array = field(default_factory=lambda: array("q"))
+    ctrl_dir: array = field(default_factory=lambda: array("q"))
+    addr_names: list[str] = field(default_factory=list)
+
+
+def _ctrl_type(match: re.Match) -> int:
+    kind = match[3].upper()
+    if kind == b"DAO":
+        if match[4]:
+            kind = b"DAO-" + match[4].upper()
+        elif match[2]:
+            kind = b"DAO-NOPATH"
+    return _CTRL_CODES[kind]
+
+
+class RoutingIndexer:
+    """Line consumer for the message part of a prefixed testlog line.
+
+    Callers on a hot path should only pass lines containing one of `MARKERS`.
+    """
+
+    def __init__(self, events: RoutingEvents | None = None) -> None:
+        self.events = events if events is not None else RoutingEvents()
+        self._addr_index: dict[bytes, int] = {}
+
+    def _addr_id(self, addr: bytes | None) -> int:
+        if addr is None or addr in NULL_ADDRS:
+            return NO_ADDR
+        idx = self._addr_index.get(addr)
+        if idx is None:
+            idx = len(self.events.addr_names)
+            self._addr_index[addr] = idx
+            self.events.addr_names.append(addr.decode("ascii", errors="ignore"))
+        return idx
+
+    def feed(self, time_us: int, mote: int, msg: bytes) -> None:
+        ev = self.events
+        if b"DI" in msg or b"DA" in msg:
+            for match in CTRL_RE.finditer(msg):
+                ev.ctrl_time_us.append(time_us)
+                ev.ctrl_mote.append(mote)
+                ev.ctrl_type.append(_ctrl_type(match))
+                ev.ctrl_dir.append(CTRL_TX if match[1] else CTRL_RX)
+            return
+        if b"routing state:" in msg:
+            match = STATE_RE.search(msg)
+            if match is None:
+                return
+            ev.state_time_us.append(time_us)
+            ev.state_mote.append(mote)
+            ev.state_joined.append(int(match[1]))
+            ev.state_reachable.append(int(match[2]))
+            ev.state_routes.append(int(match[3]))
+            ev.state_defrt.append(self._addr_id(match[4]))
+        elif b"reachable changed:" in msg:
+            match = FLIP_RE.search(msg)
+            if match is None:
+                return
+            ev.flip_time_us.append(time_us)
+            ev.flip_mote.append(mote)
+            ev.flip_to.append(int(match[2]))
+        elif b"parent" in msg:
+            match = LITE_PARENT_RE.search(msg)
+            if match is not None:
+                old, new = match[1], match[2]
+            else:
+                match = CLASSIC_PARENT_RE.search(msg)
+                if match is None:
+                    return
+                new, old = match[1], match[2]
+            ev.parent_time_us.append(time_us)
+            ev.parent_mote.append(mote)
+            ev.parent_old.append(self._addr_id(old))
+            ev.parent_new.append(self._addr_id(new))
+
+
+def _np(column: array) -> np.ndarray:
+    return np.frombuffer(column, dtype=np.int64)
+
+
+def _changes(mote: np.ndarray, old: np.ndarray, new: np.ndarray) -> dict[int, int]:
+    """Per-mote count of rows that move from one parent to a different one (joins and losses excluded)."""
+    switched = (old != NO_ADDR) & (new != NO_ADDR) & (old != new)
+    motes, counts = np.unique(mote[switched], return_counts=True)
+    return dict(zip(motes.tolist(), counts.tolist()))
+
+
+def defrt_changes(events: RoutingEvents) -> dict[int, int]:
+    """Parent switches seen between consecutive `routing state:` samples of each mote."""
+    mote = _np(events.state_mote)
+    if not len(mote):
+        return {}
+    order = np.argsort(mote, kind="stable")
+    mote, defrt = mote[order], _np(events.state_defrt)[order]
+    same_mote = mote[1:] == mote[:-1]
+    return _changes(mote[1:][same_mote], defrt[:-1][same_mote], defrt[1:][same_mote])
+
+
+def parent_switches(events: RoutingEvents) -> dict[int, int]:
+    """Per-mote switches from the RPL log lines, or from the sampled default route when RPL logged none."""
+    if not len(events.parent_mote):
+        return defrt_changes(events)
+    return _changes(_np(events.parent_mote), _np(events.parent_old), _np(events.parent_new))
+
+
+def join_times_us(events: RoutingEvents) -> dict[int, int]:
+    """First `routing state:` sample with joined=1, per mote."""
+    joined = _np(events.state_joined) == 1
+    motes, first = np.unique(_np(events.state_mote)[joined], return_index=True)
+    return dict(zip(motes.tolist(), _np(events.state_time_us)[joined][first].tolist()))
+
+
+def node_table(events: RoutingEvents) -> list[dict]:
+    """One row per mote: join time, flips, parent switches and control messages by type and direction."""
+    motes = set(events.state_mote) | set(events.flip_mote) | set(events.parent_mote) | set(events.ctrl_mote)
+    joins = join_times_us(events)
+    switches = parent_switches(events)
+    flip_motes, flip_counts = np.unique(_np(events.flip_mote), return_counts=True)
+    flips = dict(zip(flip_motes.tolist(), flip_counts.tolist()))
+    ctrl_key = (_np(events.ctrl_mote) * len(CTRL_TYPES) + _np(events.ctrl_type)) * 2 + _np(events.ctrl_dir)
+    keys, counts = np.unique(ctrl_key, return_counts=True)
+    ctrl = dict(zip(keys.tolist(), counts.tolist()))
+    rows = []
+    for mote in sorted(motes):
+        row = {
+            "mote": mote,
+            "join_s": f"{joins[mote] / 1e6:.3f}" if mote in joins else "",
+            "reach_flips": flips.get(mote, 0),
+            "parent_switches": switches.get(mote, 0),
+        }
+        for type_idx, name in enumerate(CTRL_TYPES):
+            for direction, suffix in ((CTRL_TX, "tx"), (CTRL_RX, "rx")):
+                row[f"{name}_{suffix}"] = ctrl.get((mote * len(CTRL_TYPES) + type_idx) * 2 + direction, 0)
+        rows.append(row)
+    return rows
+
+
+def summarize_routing(events: RoutingEvents, duration_s: float) -> dict[str, str]:
+    """The `SUMMARY_FIELDS` of one run; rates are over `duration_s` of simulated time."""
+    joins = sorted(t / 1e6 for t in join_times_us(events).values())
+    nodes = len(set(events.state_mote)) or len(set(events.parent_mote))
+    switches = sum(parent_switches(events).values())
+    ctrl_tx = int(np.count_nonzero(_np(events.ctrl_dir) == CTRL_TX))
+    return {
+        "ctrl_tx": str(ctrl_tx),
+        "ctrl_msgs_per_s": f"{ctrl_tx / duration_s:.3f}" if duration_s > 0 else "",
+        "join_time_med_s": f"{float(np.median(joins)):.3f}" if joins else "",
+        "join_time_max_s": f"{joins[-1]:.3f}" if joins else "",
+        "joined_nodes": str(len(joins)),
+        "parent_switches": str(switches),
+        "parent_switch_per_node_min": (
+            f"{switches / nodes / (duration_s / 60):.4f}" if nodes and duration_s > 0 else ""
+        ),
+    }
+
+
+def load_archive(path: Path) -> tuple[RoutingEvents, float]:
+    """RoutingEvents and the simulated seconds covered, back from a `<basename>.events/` archive."""
+    from event_archive import RunArchive
+
+    run = RunArchive(path)
+    events = RoutingEvents(addr_names=list(run.meta.get("addr_names", [])))
+    for name in COLUMNS:
+        column = array("q")
+        column.frombytes(np.asarray(run[name], dtype=np.int64).tobytes())
+        setattr(events, name, column)
+    return events, run.meta.get("last_time_us", -1) / 1e6
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Per-node routing timeline of one run")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--log", help="Cooja testlog path (plain, .gz or .zst)")
+    source.add_argument("--archive", help="Event archive dir (<basename>.events)")
+    parser.add_argument("--out", help="Write the per-node CSV here instead of printing it")
+    args = parser.parse_args()
+
+    if args.log:
+        from log_ingest import ingest
+
+        log_events = ingest(Path(args.log))
+        events, duration_s = log_events.routing, log_events.last_time_us / 1e6
+    else:
+        events, duration_s = load_archive(Path(args.archive))
+    rows = node_table(events)
+    if not rows:
+        print("No routing or control-plane lines found", file=sys.stderr)
+        return 1
+    fieldnames = list(rows[0])
+    if args.out:
+        with open(args.out, "w", newline="", encoding="utf-8") as handle:
+            writer = csv.DictWriter(handle, fieldnames=fieldnames)
+            writer.writeheader()
+            writer.writerows(rows)
+        print(f"Routing timeline written to: {args.out}")
+    else:
+        writer = csv.DictWriter(sys.stdout, fieldnames=fieldnames)
+        writer.writeheader()
+        writer.writerows(rows)
+    summary = summarize_routing(events, duration_s)
+    print(" ".join(f"{name}={summary[name]}" for name in SUMMARY_FIELDS), file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""Resumable run ledger in summary.db (`ledger` table).
+
+Entries are keyed by a hash of every parameter that changes a run's result,
+including the firmware key (routing, DEFINES, sources, Contiki revision) and
+duration/warmup. run_experiment.sh moves each entry through
+pending -> running -> done/failed; with `--resume`, runs that are already
+done (and still have their summary row) are skipped.
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import socket
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+from firmware_cache import firmware_key
+from results_store import KEY_FIELDS, ResultsStore, default_store_path, open_store
+
+STATE_PENDING = "pending"
+STATE_RUNNING = "running"
+STATE_DONE = "done"
+STATE_FAILED = "failed"
+STATES = (STATE_PENDING, STATE_RUNNING, STATE_DONE, STATE_FAILED)
+DEFAULT_MAX_ATTEMPTS = 3
+SKIP_EXIT_CODE = 3
+
+
+def run_key(config: dict[str, str]) -> dict[str, str]:
+    key = {name: str(config.get(name, "")) for name in KEY_FIELDS}
+    # Ratios use the same str(float) form as the summary rows.
+    for name in ("success_ratio", "interference_ratio"):
+        if key[name]:
+            key[name] = str(float(key[name]))
+    return key
+
+
+def config_hash(config: dict[str, str]) -> str:
+    payload = json.dumps(config, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+
+def skip_reason(store: ResultsStore, entry: dict[str, str] | None, max_attempts: int) -> str | None:
+    if entry is None:
+        return None
+    if entry["state"] == STATE_DONE and store.has_run(entry):
+        return "done"
+    attempts = int(entry["attempts"] or 0)
+    if entry["state"] == STATE_FAILED and max_attempts > 0 and attempts >= max_attempts:
+        return f"failed {attempts} times"
+    return None
+
+
+def begin(
+    store: ResultsStore,
+    config: dict[str, str],
+    state: str,
+    resume: bool,
+    max_attempts: int,
+) -> tuple[str, str | None]:
+    """Record a new attempt (`pending` or `running`), or return why it is skipped."""
+    digest = config_hash(config)
+    entry = store.ledger_entry(digest)
+    if resume:
+        reason = skip_reason(store, entry, max_attempts)
+        if reason is not None:
+            return digest, reason
+    now = time.strftime("%F %T")
+    attempts = int(entry["attempts"] or 0) if entry else 0
+    store.upsert_ledger({
+        "config_hash": digest,
+        **run_key(config),
+        "state": state,
+        "attempts": str(attempts + 1),
+        "host": f"{socket.gethostname()}:{os.getppid()}",
+        "config": json.dumps(config, sort_keys=True),
+        "created_at": entry["created_at"] if entry else now,
+        "started_at": now,
+    })
+    return digest, None
+
+
+def mark(store: ResultsStore, digest: str, state: str, exit_code: str = "", run_status: str = "") -> bool:
+    entry = store.ledger_entry(digest)
+    if entry is None:
+        return False
+    entry["state"] = state
+    now = time.strftime("%F %T")
+    if state == STATE_RUNNING:
+        entry["started_at"] = now
+    elif state in (STATE_DONE, STATE_FAILED):
+        entry["finished_at"] = now
+        entry["exit_code"] = exit_code
+        entry["run_status"] = run_status
+    store.upsert_ledger(entry)
+    return True
+
+
+def mark_running(summary_path: Path, hashes: list[str]) -> None:
+    """Batched runs are prepared as pending; flip them once their Cooja JVM starts."""
+    with open_store(default_store_path(summary_path), summary_path) as store:
+        for digest in hashes:
+            if digest:
+                mark(store, digest, STATE_RUNNING)
+
+
+def status_report(entries: list[dict[str, str]], show_failed: bool) -> str:
+    lines = []
+    by_stage: dict[str, Counter] = {}
+    for entry in entries:
+        by_stage.setdefault(entry["stage"], Counter())[entry["state"]] += 1
+    lines.append(f"{'stage':<10} " + " ".join(f"{state:>8}" for state in STATES) + f" {'retried':>8}")
+    for stage, counts in sorted(by_stage.items()):
+        retried = sum(
+            1 for entry in entries
+            if entry["stage"] == stage and int(entry["attempts"] or 0) > 1
+        )
+        lines.append(f"{stage:<10} " + " ".join(f"{counts[state]:>8}" for state in STATES) + f" {retried:>8}")
+    if show_failed:
+        for entry in entries:
+            if entry["state"] == STATE_DONE:
+                continue
+            lines.append(
+                f"  {entry['state']:<8} {entry['mode']} {entry['stage']} N={entry['n_senders']} "
+                f"seed={entry['seed']} sr={entry['success_ratio']} ir={entry['interference_ratio']} "
+                f"si={entry['send_interval_s']} attempts={entry['attempts']} "
+                f"status={entry['run_status'] or '-'} last={entry['started_at']}"
+            )
+    return "\n".join(lines)
+
+
+def main() -> int:
+    default_root = Path(__file__).resolve().parents[2]
+    parser = argparse.ArgumentParser(description="Resumable run ledger (summary.db ledger table)")
+    sub = parser.add_subparsers(dest="action", required=True)
+
+    def add_config_args(p: argparse.ArgumentParser) -> None:
+        p.add_argument("--summary", default="results/summary.csv", help="summary.csv path")
+        p.add_argument("--root-dir", default=str(default_root), help="rpl-benchmark root")
+        p.add_argument("--contiki", default=os.environ.get("CONTIKI"), help="Contiki-NG root")
+        p.add_argument("--make-routing", required=True, help="MAKE_ROUTING value")
+        p.add_argument("--defines", default="", help="Space-separated DEFINES")
+        p.add_argument("--param", action="append", default=[], help="Run parameter name=value (repeatable)")
+
+    key_p = sub.add_parser("key", help="Print the config hash of a run")
+    add_config_args(key_p)
+    begin_p = sub.add_parser("begin", help="Record an attempt; exits 3 if --resume skips the run")
+    add_config_args(begin_p)
+    begin_p.add_argument("--state", choices=[STATE_PENDING, STATE_RUNNING], default=STATE_RUNNING)
+    begin_p.add_argument("--resume", action="store_true", help="Skip runs that are done or gave up")
+    begin_p.add_argument(
+        "--max-attempts",
+        type=int,
+        default=DEFAULT_MAX_ATTEMPTS,
+        help="With --resume, stop retrying failed runs after this many attempts (0: never)",
+    )
+
+    finish_p = sub.add_parser("finish", help="Mark a run done or failed")
+    finish_p.add_argument("--summary", default="results/summary.csv", help="summary.csv path")
+    finish_p.add_argument("--hash", required=True, help="Config hash from begin/key")
+    finish_p.add_argument("--state", choices=[STATE_DONE, STATE_FAILED], required=True)
+    finish_p.add_argument("--exit-code", default="", help="Run exit code")
+    finish_p.add_argument("--run-status", default="", help="Run status from run_monitor.py")
+
+    status_p = sub.add_parser("status", help="Per-stage state counts")
+    status_p.add_argument("--summary", default="results/summary.csv", help="summary.csv path")
+    status_p.add_argument("--stage", help="Limit to stage")
+    status_p.add_argument("--failed", action="store_true", help="List runs that are not done")
+    args = parser.parse_args()
+
+    summary_path = Path(args.summary)
+    if args.action in ("key", "begin"):
+        root_dir = Path(args.root_dir).resolve()
+        contiki_dir = Path(args.contiki or root_dir.parent / "external" / "contiki-ng").resolve()
+        config = dict(item.split("=", 1) for item in args.param)
+        config["firmware"] = firmware_key(root_dir, contiki_dir, args.make_routing, args.defines)
+        if args.action == "key":
+            print(config_hash(config))
+            return 0
+        with open_store(default_store_path(summary_path), summary_path) as store:
+            digest, reason = begin(store, config, args.state, args.resume, args.max_attempts)
+        print(digest)
+        if reason is not None:
+            print(f"run_ledger: skipping {digest} ({reason})", file=sys.stderr)
+            return SKIP_EXIT_CODE
+        return 0
+
+    with open_store(default_store_path(summary_path), summary_path) as store:
+        if args.action == "finish":
+            if not mark(store, args.hash, args.state, args.exit_code, args.run_status):
+                print(f"run_ledger: no entry {args.hash}", file=sys.stderr)
+                return 1
+            return 0
+        entries = store.ledger(args.stage)
+    if not entries:
+        print(f"No ledger entries in {default_store_path(summary_path)}", file=sys.stderr)
+        return 1
+    print(status_report(entries, args.failed))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""Run Cooja under a live testlog monitor and stop it once the outcome is decided.
+
+Stop rules (all optional):
+  never_joined  no RTT/RX after warmup + join grace (run would be invalid_run=1)
+  collapsed     running PDR upper confidence bound already below the collapse threshold
+  stalled       neither the testlog nor stdout grew for --stall-s wall seconds
+The final status is written to --status-out and later lands in summary.csv.
+A stalled run is a failure, not a verdict: like a timeout it exits 124, so the
+ledger marks it failed and --resume retries it.
+"""
+
+from __future__ import annotations
+
+import argparse
+import math
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import BinaryIO
+
+from collapse import PDR_TH
+from log_codec import CODECS, open_writer
+from log_ingest import LogIngester
+from timings import append_phase, child_max_rss_kb
+
+STOP_RULES = ("never_joined", "collapsed", "stalled")
+STATUS_OK = "ok"
+STATUS_FAILED = "failed"
+STATUS_TIMEOUT = "timeout"
+STATUS_STALLED = "early_stalled"
+TIMEOUT_EXIT_CODE = 124
+KILL_GRACE_S = 10.0
+
+
+def wilson_upper(successes: int, trials: int, z: float) -> float:
+    if trials <= 0:
+        return 1.0
+    p = successes / trials
+    denom = 1.0 + z * z / trials
+    centre = p + z * z / (2 * trials)
+    margin = z * math.sqrt(p * (1 - p) / trials + z * z / (4 * trials * trials))
+    return min(1.0, (centre + margin) / denom)
+
+
+class LogTail:
+    """Follows a growing file and feeds complete lines to the ingester."""
+
+    def __init__(self, path: Path, ingester: LogIngester) -> None:
+        self.path = path
+        self.ingester = ingester
+        self.handle = None
+        self.pending = b""
+
+    def poll(self) -> int:
+        if self.handle is None:
+            if not self.path.exists():
+                return 0
+            self.handle = self.path.open("rb")
+        chunk = self.handle.read()
+        if not chunk:
+            return 0
+        data = self.pending + chunk
+        lines = data.split(b"\n")
+        self.pending = lines.pop()
+        for line in lines:
+            self.ingester.feed(line)
+        return len(chunk)
+
+    def close(self) -> None:
+        if self.handle is not None:
+            self.handle.close()
+
+
+class OutputPump(threading.Thread):
+    """Copies the child's stdout into `sink` (possibly a compressed stream) and counts bytes."""
+
+    def __init__(self, source: BinaryIO, sink: BinaryIO) -> None:
+        super().__init__(daemon=True)
+        self.source = source
+        self.sink = sink
+        self.bytes = 0
+
+    def run(self) -> None:
+        for chunk in iter(lambda: self.source.read1(1 << 16), b""):
+            self.sink.write(chunk)
+            self.bytes += len(chunk)
+
+
+class RunEstimate:
+    """Running measure-window PDR with the same gap rule as the parser."""
+
+    def __init__(self, warmup_s: float, clock_second: int) -> None:
+        self.warmup_ticks = warmup_s * clock_second
+        self.rx = 0
+        self.gaps = 0
+        self.rtt = 0
+        self._rx_seen = 0
+        self._rtt_seen = 0
+        self._last_seq: dict[int, int] = {}
+
+    def update(self, ingester: LogIngester) -> None:
+        ev = ingester.events
+        for i in range(self._rx_seen, len(ev.rx_seq)):
+            if ev.rx_t_recv[i] < self.warmup_ticks:
+                continue
+            src, seq = ev.rx_src[i], ev.rx_seq[i]
+            last = self._last_seq.get(src)
+            if last is not None and seq > last + 1:
+                self.gaps += seq - (last + 1)
+            self._last_seq[src] = seq
+            self.rx += 1
+        self._rx_seen = len(ev.rx_seq)
+        for i in range(self._rtt_seen, len(ev.rtt_t_ack)):
+            if ev.rtt_t_ack[i] >= self.warmup_ticks:
+                self.rtt += 1
+        self._rtt_seen = len(ev.rtt_t_ack)
+
+    @property
+    def expected(self) -> int:
+        return self.rx + self.gaps
+
+
+def stop_process(proc: subprocess.Popen) -> None:
+    try:
+        os.killpg(proc.pid, signal.SIGTERM)
+    except ProcessLookupError:
+        return
+    try:
+        proc.wait(timeout=KILL_GRACE_S)
+    except subprocess.TimeoutExpired:
+        os.killpg(proc.pid, signal.SIGKILL)
+        proc.wait()
+
+
+def decide(args: argparse.Namespace, rules: set[str], sim_s: float, est: RunEstimate, idle_s: float) -> str | None:
+    if "stalled" in rules and idle_s >= args.stall_s:
+        return STATUS_STALLED
+    measured_s = sim_s - args.warmup_s
+    if "never_joined" in rules and measured_s >= args.join_grace_s and est.rtt == 0 and est.rx == 0:
+        return "early_never_joined"
+    if (
+        "collapsed" in rules
+        and measured_s >= args.min_measure_s
+        and est.expected >= args.min_packets
+        and wilson_upper(est.rx, est.expected, args.z) < PDR_TH
+    ):
+        return "early_collapsed"
+    return None
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Run Cooja with live early-termination rules")
+    parser.add_argument("--testlog", required=True, help="COOJA.testlog path to follow")
+    parser.add_argument("--stdout-log", required=True, help="Where Cooja stdout/stderr is written")
+    parser.add_argument("--compress", choices=CODECS, help="Write --stdout-log through this codec")
+    parser.add_argument("--status-out", required=True, help="File receiving the final run status")
+    parser.add_argument("--timeout-s", type=float, default=600, help="Wall-clock limit")
+    parser.add_argument("--warmup-s", type=float, default=60, help="Warmup seconds (sim time)")
+    parser.add_argument("--clock-second", type=int, default=1000, help="Contiki clock ticks per second")
+    parser.add_argument("--rules", default=",".join(STOP_RULES), help="Comma-separated stop rules ('' disables)")
+    parser.add_argument("--join-grace-s", type=float, default=60, help="Sim seconds after warmup before never_joined")
+    parser.add_argument("--min-measure-s", type=float, default=90, help="Sim seconds after warmup before collapsed")
+    parser.add_argument("--min-packets", type=int, default=50, help="Expected packets before collapsed")
+    parser.add_argument("--z", type=float, default=3.0, help="z-score of the PDR upper confidence bound")
+    parser.add_argument("--stall-s", type=float, default=120, help="Wall seconds without log growth")
+    parser.add_argument("--poll-s", type=float, default=1.0, help="Polling interval")
+    parser.add_argument("--timings-out", help="Append cooja_startup/simulation phases to this timings JSONL")
+    parser.add_argument("command", nargs=argparse.REMAINDER, help="-- command to run")
+    args = parser.parse_args()
+
+    command = args.command[1:] if args.command[:1] == ["--"] else args.command
+    if not command:
+        parser.error("missing command after --")
+    rules = {rule for rule in args.rules.split(",") if rule}
+    unknown = rules - set(STOP_RULES)
+    if unknown:
+        parser.error(f"unknown stop rules: {', '.join(sorted(unknown))}")
+
+    stdout_path = Path(args.stdout_log)
+    ingester = LogIngester()
+    tail = LogTail(Path(args.testlog), ingester)
+    est = RunEstimate(args.warmup_s, args.clock_second)
+
+    start = time.monotonic()
+    last_growth = start
+    last_stdout_size = 0
+    first_log_s: float | None = None
+    status: str | None = None
+    with open_writer(stdout_path, args.compress) as stdout_handle:
+        proc = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, start_new_session=True)
+        pump = OutputPump(proc.stdout, stdout_handle)
+        pump.start()
+        try:
+            while proc.poll() is None:
+                time.sleep(args.poll_s)
+                now = time.monotonic()
+                grown = tail.poll()
+                if first_log_s is None and tail.handle is not None:
+                    first_log_s = now - start
+                stdout_size = pump.bytes
+                if grown or stdout_size != last_stdout_size:
+                    last_growth = now
+                    last_stdout_size = stdout_size
+                if now - start >= args.timeout_s:
+                    status = STATUS_TIMEOUT
+                    break
+                est.update(ingester)
+                sim_s = max(0, ingester.events.last_time_us) / 1e6
+                status = decide(args, rules, sim_s, est, now - last_growth)
+                if status is not None:
+                    break
+        finally:
+            if proc.poll() is None:
+                stop_process(proc)
+            pump.join(timeout=KILL_GRACE_S)
+            proc.stdout.close()
+            tail.poll()
+            tail.close()
+
+    exit_code = proc.returncode
+    if status is None:
+        status = STATUS_OK if exit_code == 0 else STATUS_FAILED
+    elif status in (STATUS_TIMEOUT, STATUS_STALLED):
+        exit_code = TIMEOUT_EXIT_CODE
+    else:
+        exit_code = 0
+
+    Path(args.status_out).write_text(status + "\n")
+    sim_s = max(0, ingester.events.last_time_us) / 1e6
+    if args.timings_out:
+        # Startup (JVM + mote loading) ends when the scenario log first appears.
+        wall_s = time.monotonic() - start
+        startup_s = wall_s if first_log_s is None else first_log_s
+        timings_path = Path(args.timings_out)
+        append_phase(timings_path, "cooja_startup", startup_s, None, None, exit_code)
+        append_phase(timings_path, "simulation", wall_s - startup_s, child_max_rss_kb(), sim_s, exit_code)
+    print(
+        f"run_monitor: status={status} sim_s={sim_s:.0f} wall_s={time.monotonic() - start:.0f} "
+        f"rx={est.rx} expected={est.expected} rtt={est.rtt}",
+        file=sys.stderr,
+    )
+    return exit_code
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
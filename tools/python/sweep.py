@@ -0,0 +1,726 @@
+#!/usr/bin/env python3
+"""Run the Stage 1 -> 2 -> 3 sweep grid with a pool of parallel Cooja workers."""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, replace
+from functools import partial
+from pathlib import Path
+
+from collapse import (
+    STAGE1_N_LIST,
+    CollapseTracker,
+    condition_collapsed,
+    load_tracker,
+    select_stage2_n,
+    select_stage3_condition,
+)
+from cooja_batch import (
+    BatchResult,
+    RunSkipped,
+    Scenario,
+    append_timings,
+    describe,
+    group_batches,
+    prepare,
+    run_batch,
+    run_experiment,
+)
+from firmware_cache import Pins
+from replication import (
+    ReplicationPolicy,
+    add_policy_args,
+    next_seeds,
+    policy_from_args,
+    report_rows,
+    seed_sequence,
+    write_report,
+)
+from results_store import default_store_path, open_store
+from run_ledger import mark_running
+from timings import phase_entry, record_timings
+from work_queue import POLL_S, WorkQueue
+
+MODE_LIST = ["rpl-lite", "brpl"]
+SEEDS = [1, 2, 3]
+STAGE2_SUCCESS_LIST = ["1.0", "0.95", "0.9", "0.85", "0.8", "0.75"]
+STAGE2_INTERFERENCE_LIST = ["1.0", "0.95", "0.9", "0.85"]
+STAGE3_SEND_INTERVAL_LIST = [20, 10, 5, 2]
+STAGES = ["stage1", "stage2", "stage3"]
+
+
+@dataclass(frozen=True)
+class RunSpec:
+    mode: str
+    stage: str
+    n_senders: int
+    seed: int
+    success_ratio: str
+    interference_ratio: str
+    send_interval_s: int
+
+    @property
+    def basename(self) -> str:
+        sr = self.success_ratio.replace(".", "p")
+        ir = self.interference_ratio.replace(".", "p")
+        si = str(self.send_interval_s).replace(".", "p")
+        return f"N{self.n_senders}_seed{self.seed}_sr{sr}_ir{ir}_si{si}"
+
+    def key(self) -> dict[str, str]:
+        """Run key in the form the summary rows store it."""
+        return {
+            "mode": self.mode,
+            "stage": self.stage,
+            "n_senders": str(self.n_senders),
+            "seed": str(self.seed),
+            "success_ratio": str(float(self.success_ratio)),
+            "interference_ratio": str(float(self.interference_ratio)),
+            "send_interval_s": str(self.send_interval_s),
+        }
+
+    def experiment_args(self) -> list[str]:
+        return [
+            "--mode", self.mode,
+            "--stage", self.stage,
+            "--n-senders", str(self.n_senders),
+            "--seed", str(self.seed),
+            "--success-ratio", self.success_ratio,
+            "--interference-ratio", self.interference_ratio,
+            "--send-interval", str(self.send_interval_s),
+        ]
+
+    @property
+    def run_id(self) -> str:
+        return f"{self.stage}/{self.mode}/{self.basename}"
+
+    def label(self) -> str:
+        return (
+            f"mode={self.mode} n={self.n_senders} seed={self.seed} "
+            f"sr={self.success_ratio} ir={self.interference_ratio} si={self.send_interval_s}"
+        )
+
+
+def export_summary(summary_path: Path) -> None:
+    with open_store(default_store_path(summary_path), summary_path) as store:
+        store.export_csv(summary_path)
+
+
+def stage_grid(
+    stage: str,
+    tracker: CollapseTracker,
+    modes: list[str],
+    seeds: list[int],
+) -> list[RunSpec]:
+    specs: list[RunSpec] = []
+    if stage == "stage1":
+        for mode in modes:
+            for n in STAGE1_N_LIST:
+                for seed in seeds:
+                    specs.append(RunSpec(mode, stage, n, seed, "1.0", "1.0", 10))
+    elif stage == "stage2":
+        stable_n, marginal_n = select_stage2_n(tracker)
+        n_list = [stable_n] if stable_n == marginal_n else [stable_n, marginal_n]
+        print(f"[stage2] stable N={stable_n} marginal N={marginal_n}", flush=True)
+        for mode in modes:
+            for n in n_list:
+                for success in STAGE2_SUCCESS_LIST:
+                    for interference in STAGE2_INTERFERENCE_LIST:
+                        for seed in seeds:
+                            specs.append(RunSpec(mode, stage, n, seed, success, interference, 10))
+    elif stage == "stage3":
+        n, success, interference = select_stage3_condition(tracker)
+        print(f"[stage3] knee N={n} sr={success} ir={interference}", flush=True)
+        for mode in modes:
+            for interval in STAGE3_SEND_INTERVAL_LIST:
+                for seed in seeds:
+                    specs.append(RunSpec(mode, stage, n, seed, success, interference, interval))
+    else:
+        raise ValueError(f"Unknown stage: {stage}")
+    return specs
+
+
+class WorkerPool:
+    """Runs run_experiment.sh concurrently; firmware comes from the shared cache.
+
+    One executor is shared by every caller, so concurrent searches never run
+    more than `jobs` simulations at once. With `batch_size > 1`, runs sharing a
+    firmware are simulated together in one Cooja JVM (cooja_batch.py). Every
+    finished run's summary row is folded into `tracker` as it lands.
+    """
+
+    def __init__(
+        self,
+        root_dir: Path,
+        jobs: int,
+        extra_env: dict[str, str] | None = None,
+        batch_size: int = 1,
+        tracker: CollapseTracker | None = None,
+    ) -> None:
+        self.root_dir = root_dir
+        self.tracker = tracker
+        self.jobs = max(1, jobs)
+        self.extra_env = extra_env or {}
+        self.batch_size = max(1, batch_size)
+        self.executor = ThreadPoolExecutor(max_workers=self.jobs)
+        self.launched = 0
+        self.batches = 0
+        self._specs: dict[Path, RunSpec] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def workers(self) -> str:
+        return f"{self.jobs} workers"
+
+    def _env(self) -> dict[str, str]:
+        env = dict(os.environ)
+        env.update(self.extra_env)
+        env["SKIP_THRESHOLDS"] = "1"
+        env["SKIP_SUMMARY_EXPORT"] = "1"
+        return env
+
+    def _driver_log(self, spec: RunSpec) -> Path:
+        raw_dir = self.root_dir / "results" / "raw" / spec.stage / spec.mode
+        raw_dir.mkdir(parents=True, exist_ok=True)
+        return raw_dir / f"{spec.basename}.driver.log"
+
+    def _landed(self, spec: RunSpec) -> None:
+        if self.tracker is None:
+            return
+        summary_path = self.root_dir / "results" / "summary.csv"
+        with open_store(default_store_path(summary_path), summary_path) as store:
+            row = store.row(spec.key())
+        if row is not None:
+            with self._lock:
+                self.tracker.add(row)
+
+    def _run_one(self, spec: RunSpec) -> tuple[RunSpec, int, float]:
+        cmd = [str(self.root_dir / "scripts" / "run_experiment.sh"), *spec.experiment_args()]
+        start = time.monotonic()
+        with self._driver_log(spec).open("w", encoding="utf-8") as handle:
+            status = subprocess.call(cmd, stdout=handle, stderr=subprocess.STDOUT, env=self._env())
+        return spec, status, time.monotonic() - start
+
+    def _prepare(self, pins: Pins, spec: RunSpec) -> tuple[RunSpec, Scenario | None, bool]:
+        with self._driver_log(spec).open("w", encoding="utf-8") as handle:
+            try:
+                scenario = prepare(self.root_dir, spec.experiment_args(), self._env(), handle)
+            except RunSkipped:
+                return spec, None, True
+            if scenario is not None:
+                # Pinned until its batch has run, so no other run's eviction removes it meanwhile.
+                try:
+                    pins.add(Path(scenario.firmware_dir))
+                except FileNotFoundError as exc:
+                    print(exc, file=handle)
+                    scenario = None
+            return spec, scenario, False
+
+    def _run_batch(
+        self, batch: list[Scenario], batch_id: str
+    ) -> tuple[BatchResult, list[tuple[RunSpec, int, float]]]:
+        work_dir = self.root_dir / "results" / "raw" / ".cooja-batch"
+        mark_running(self.root_dir / "results" / "summary.csv", [scenario.run_hash for scenario in batch])
+        result = run_batch(batch, batch_id, work_dir, self._env().get("LOG_COMPRESSION") or None)
+        statuses = []
+        for scenario in batch:
+            spec = self._specs[scenario.csc_path]
+            with self._driver_log(spec).open("a", encoding="utf-8") as handle:
+                proc = run_experiment(self.root_dir, scenario.args, "parse", self._env(), handle)
+            statuses.append((spec, proc.returncode, scenario.wall_s or 0.0))
+        return result, statuses
+
+    def _run_batched(self, specs: list[RunSpec], label: str) -> list[tuple[RunSpec, int, float]]:
+        pins = Pins()
+        try:
+            return self._run_pinned(specs, label, pins)
+        finally:
+            pins.release()
+
+    def _run_pinned(self, specs: list[RunSpec], label: str, pins: Pins) -> list[tuple[RunSpec, int, float]]:
+        results: list[tuple[RunSpec, int, float]] = []
+        scenarios: list[Scenario] = []
+        for spec, scenario, skipped in self.executor.map(partial(self._prepare, pins), specs):
+            if skipped:
+                print(f"[{label}] {spec.label()} skipped (done in the ledger)", flush=True)
+                results.append((spec, 0, 0.0))
+                continue
+            if scenario is None:
+                print(f"[{label}] {spec.label()} prepare failed", flush=True)
+                results.append((spec, 1, 0.0))
+                continue
+            self._specs[scenario.csc_path] = spec
+            scenarios.append(scenario)
+
+        futures = []
+        for batch in group_batches(scenarios, self.batch_size):
+            with self._lock:
+                self.batches += 1
+                batch_id = f"{time.strftime('%Y%m%d_%H%M%S')}_{self.batches:04d}"
+            futures.append(self.executor.submit(self._run_batch, batch, batch_id))
+
+        total = len(specs)
+        timings_path = self.root_dir / "results" / "batch_timings.csv"
+        for future in as_completed(futures):
+            batch_result, statuses = future.result()
+            append_timings(timings_path, batch_result.timings)
+            print(f"[{label}] {describe(batch_result)}", flush=True)
+            for spec, status, elapsed in statuses:
+                self._landed(spec)
+                results.append((spec, status, elapsed))
+                state = "ok" if status == 0 else f"status={status}"
+                print(
+                    f"[{label} {len(results)}/{total}] {spec.label()} {state} "
+                    f"({elapsed:.0f}s) @ {time.strftime('%F %T')}",
+                    flush=True,
+                )
+        return results
+
+    def run(self, specs: list[RunSpec], label: str) -> list[tuple[RunSpec, int, float]]:
+        results: list[tuple[RunSpec, int, float]] = []
+        total = len(specs)
+        if total == 0:
+            return results
+        with self._lock:
+            self.launched += total
+        if self.batch_size > 1:
+            return self._run_batched(specs, label)
+        futures = [self.executor.submit(self._run_one, spec) for spec in specs]
+        for count, future in enumerate(as_completed(futures), start=1):
+            spec, status, elapsed = future.result()
+            self._landed(spec)
+            results.append((spec, status, elapsed))
+            state = "ok" if status == 0 else f"status={status}"
+            print(
+                f"[{label} {count}/{total}] {spec.label()} {state} "
+                f"({elapsed:.0f}s) @ {time.strftime('%F %T')}",
+                flush=True,
+            )
+        return results
+
+    def shutdown(self) -> None:
+        self.executor.shutdown(wait=True)
+
+
+class QueuePool:
+    """WorkerPool interface on top of a shared work queue (work_queue.py).
+
+    `run` enqueues the runs and blocks until `work_queue.py worker` processes,
+    on this or any other host, report them; the returned summary rows are
+    upserted into the local store and folded into `tracker`.
+    """
+
+    def __init__(
+        self,
+        root_dir: Path,
+        queue_path: Path,
+        keep_done: bool = False,
+        tracker: CollapseTracker | None = None,
+        poll_s: float = POLL_S,
+    ) -> None:
+        self.root_dir = root_dir
+        self.queue_path = queue_path
+        self.keep_done = keep_done
+        self.tracker = tracker
+        self.poll_s = poll_s
+        self.launched = 0
+        self._lock = threading.Lock()
+
+    @property
+    def workers(self) -> str:
+        return f"queue {self.queue_path}"
+
+    def _landed(self, row: dict[str, str]) -> None:
+        summary_path = self.root_dir / "results" / "summary.csv"
+        with open_store(default_store_path(summary_path), summary_path) as store:
+            store.upsert(row)
+        if self.tracker is not None:
+            with self._lock:
+                self.tracker.add(row)
+
+    def run(self, specs: list[RunSpec], label: str) -> list[tuple[RunSpec, int, float]]:
+        results: list[tuple[RunSpec, int, float]] = []
+        total = len(specs)
+        if total == 0:
+            return results
+        with self._lock:
+            self.launched += total
+        remaining = {spec.run_id: spec for spec in specs}
+        with WorkQueue(self.queue_path) as queue:
+            for spec in specs:
+                queue.enqueue(spec.run_id, spec.stage, spec.key(), spec.experiment_args(), self.keep_done)
+            while remaining:
+                # Workers requeue expired leases too; this covers the case where none is left.
+                queue.requeue_expired()
+                for entry in queue.finished(list(remaining)):
+                    spec = remaining.pop(entry["run_id"])
+                    if entry["summary"]:
+                        self._landed(json.loads(entry["summary"]))
+                    status = entry["exit_code"]
+                    elapsed = entry["elapsed_s"] or 0.0
+                    results.append((spec, status, elapsed))
+                    state = "ok" if status == 0 else f"status={status}"
+                    print(
+                        f"[{label} {len(results)}/{total}] {spec.label()} {state} ({elapsed:.0f}s) "
+                        f"on {entry['worker'] or '-'} @ {time.strftime('%F %T')}",
+                        flush=True,
+                    )
+                if remaining:
+                    time.sleep(self.poll_s)
+        return results
+
+    def shutdown(self) -> None:
+        pass
+
+
+@dataclass
+class SearchLine:
+    """Conditions of one stage ordered from least to most stressful (seed unset)."""
+
+    mode: str
+    stage: str
+    label: str
+    axis: str
+    points: list[RunSpec]
+
+    def describe(self, idx: int | None) -> str:
+        if idx is None or idx < 0 or idx >= len(self.points):
+            return ""
+        point = self.points[idx]
+        value = {
+            "n_senders": point.n_senders,
+            "success_ratio": point.success_ratio,
+            "send_interval_s": point.send_interval_s,
+        }[self.axis]
+        return f"{self.axis}={value}"
+
+
+@dataclass
+class SearchResult:
+    line: SearchLine
+    last_stable: int | None
+    first_collapse: int | None
+    probes: int
+    launched: int
+    reused: int
+
+
+def same_condition(row: dict[str, str], spec: RunSpec) -> bool:
+    try:
+        return (
+            row["mode"] == spec.mode
+            and row["stage"] == spec.stage
+            and int(row["n_senders"]) == spec.n_senders
+            and float(row["success_ratio"]) == float(spec.success_ratio)
+            and float(row["interference_ratio"]) == float(spec.interference_ratio)
+            and int(float(row["send_interval_s"])) == spec.send_interval_s
+        )
+    except (KeyError, ValueError):
+        return False
+
+
+def search_lines(stage: str, tracker: CollapseTracker, modes: list[str]) -> list[SearchLine]:
+    lines: list[SearchLine] = []
+    if stage == "stage1":
+        for mode in modes:
+            points = [RunSpec(mode, stage, n, 0, "1.0", "1.0", 10) for n in STAGE1_N_LIST]
+            lines.append(SearchLine(mode, stage, "sr=1.0 ir=1.0 si=10", "n_senders", points))
+    elif stage == "stage2":
+        stable_n, marginal_n = select_stage2_n(tracker)
+        n_list = [stable_n] if stable_n == marginal_n else [stable_n, marginal_n]
+        print(f"[stage2] stable N={stable_n} marginal N={marginal_n}", flush=True)
+        for mode in modes:
+            for n in n_list:
+                for interference in STAGE2_INTERFERENCE_LIST:
+                    points = [
+                        RunSpec(mode, stage, n, 0, success, interference, 10)
+                        for success in STAGE2_SUCCESS_LIST
+                    ]
+                    lines.append(SearchLine(mode, stage, f"N={n} ir={interference}", "success_ratio", points))
+    elif stage == "stage3":
+        n, success, interference = select_stage3_condition(tracker)
+        print(f"[stage3] knee N={n} sr={success} ir={interference}", flush=True)
+        for mode in modes:
+            points = [
+                RunSpec(mode, stage, n, 0, success, interference, interval)
+                for interval in STAGE3_SEND_INTERVAL_LIST
+            ]
+            lines.append(SearchLine(mode, stage, f"N={n} sr={success} ir={interference}", "send_interval_s", points))
+    else:
+        raise ValueError(f"Unknown stage: {stage}")
+    return lines
+
+
+class CollapseSearch:
+    """Bisection for the first collapsed condition along an ordered stage axis.
+
+    Assumes collapse is monotone along the axis, so only O(log n) conditions
+    are simulated; seeds already present in the results store are reused.
+    """
+
+    def __init__(self, pool: WorkerPool | QueuePool, summary_path: Path, seeds: list[int]) -> None:
+        self.pool = pool
+        self.store_path = default_store_path(summary_path)
+        self.summary_path = summary_path
+        self.seeds = seeds
+
+    def _condition_rows(self, point: RunSpec) -> list[dict[str, str]]:
+        with open_store(self.store_path, self.summary_path) as store:
+            rows = store.rows(stage=point.stage, mode=point.mode)
+        return [row for row in rows if same_condition(row, point) and int(row["seed"]) in self.seeds]
+
+    def probe(self, point: RunSpec) -> tuple[bool, int, int]:
+        rows = self._condition_rows(point)
+        have = {int(row["seed"]) for row in rows}
+        missing = [replace(point, seed=seed) for seed in self.seeds if seed not in have]
+        if missing:
+            self.pool.run(missing, f"{point.stage} search")
+            rows = self._condition_rows(point)
+        if not rows:
+            print(f"[{point.stage} search] no rows for {point.label()}; treating as collapsed", flush=True)
+            return True, len(missing), len(have)
+        return condition_collapsed(rows), len(missing), len(have)
+
+    def search(self, line: SearchLine) -> SearchResult:
+        lo, hi = -1, len(line.points)
+        probes = launched = reused = 0
+        while hi - lo > 1:
+            mid = (lo + hi) // 2
+            collapsed, ran, had = self.probe(line.points[mid])
+            probes += 1
+            launched += ran
+            reused += had
+            if collapsed:
+                hi = mid
+            else:
+                lo = mid
+        return SearchResult(
+            line,
+            lo if lo >= 0 else None,
+            hi if hi < len(line.points) else None,
+            probes,
+            launched,
+            reused,
+        )
+
+
+def run_replicated(
+    pool: WorkerPool | QueuePool,
+    stage: str,
+    conditions: list[RunSpec],
+    seeds: list[int],
+    policy: ReplicationPolicy,
+    tracker: CollapseTracker,
+) -> int:
+    """Run `conditions` in rounds, adding seeds only where the CI is still too wide.
+
+    Returns the number of runs launched.
+    """
+    sequence = seed_sequence(seeds, policy.max_seeds)
+    tried: dict[RunSpec, set[int]] = {spec: set() for spec in conditions}
+    active = list(conditions)
+    launched = 0
+    round_no = 0
+    while active:
+        round_no += 1
+        specs: list[RunSpec] = []
+        reasons: dict[str, int] = defaultdict(int)
+        for condition in active:
+            todo, reason = next_seeds(tracker, condition.key(), sequence, tried[condition], policy)
+            reasons[reason] += 1
+            tried[condition].update(todo)
+            specs.extend(replace(condition, seed=seed) for seed in todo)
+        active = sorted({replace(spec, seed=sequence[0]) for spec in specs}, key=lambda s: s.run_id)
+        if not specs:
+            break
+        summary = ", ".join(f"{reason}={count}" for reason, count in sorted(reasons.items()))
+        print(f"[{stage} replicate] round {round_no}: {len(specs)} runs for {len(active)} conditions ({summary})", flush=True)
+        pool.run(specs, f"{stage} r{round_no}")
+        launched += len(specs)
+    return launched
+
+
+def write_brackets(path: Path, results: list[SearchResult]) -> None:
+    header = [
+        "mode", "stage", "line", "last_stable", "first_collapse",
+        "probes", "conditions", "runs_launched", "runs_reused",
+    ]
+    existing: list[dict[str, str]] = []
+    if path.exists():
+        with path.open("r", newline="", encoding="utf-8") as handle:
+            keys = {(r.line.mode, r.line.stage, r.line.label) for r in results}
+            existing = [
+                row for row in csv.DictReader(handle)
+                if (row["mode"], row["stage"], row["line"]) not in keys
+            ]
+    with path.open("w", newline="", encoding="utf-8") as handle:
+        writer = csv.DictWriter(handle, fieldnames=header)
+        writer.writeheader()
+        writer.writerows(existing)
+        for result in results:
+            writer.writerow({
+                "mode": result.line.mode,
+                "stage": result.line.stage,
+                "line": result.line.label,
+                "last_stable": result.line.describe(result.last_stable),
+                "first_collapse": result.line.describe(result.first_collapse),
+                "probes": result.probes,
+                "conditions": len(result.line.points),
+                "runs_launched": result.launched,
+                "runs_reused": result.reused,
+            })
+
+
+def run_search_stage(
+    stage: str,
+    tracker: CollapseTracker,
+    modes: list[str],
+    search: CollapseSearch,
+) -> list[SearchResult]:
+    lines = search_lines(stage, tracker, modes)
+    # Lines are independent; search them concurrently on the shared pool.
+    with ThreadPoolExecutor(max_workers=max(1, len(lines))) as executor:
+        results = list(executor.map(search.search, lines))
+    for result in results:
+        line = result.line
+        low = line.describe(result.last_stable) or "(none stable)"
+        high = line.describe(result.first_collapse) or "(no collapse)"
+        print(
+            f"[{stage} search] {line.mode} {line.label}: bracket {low} .. {high} "
+            f"({result.probes}/{len(line.points)} conditions, "
+            f"{result.launched} runs launched, {result.reused} reused)",
+            flush=True,
+        )
+    return results
+
+
+def parse_list(value: str) -> list[str]:
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+def main() -> int:
+    default_root = Path(__file__).resolve().parents[2]
+    parser = argparse.ArgumentParser(description="Parallel Stage 1 -> 2 -> 3 sweep driver")
+    parser.add_argument("--root-dir", default=str(default_root), help="rpl-benchmark root")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="Concurrent Cooja runs")
+    parser.add_argument("--stages", default=",".join(STAGES), help="Comma-separated stages to run")
+    parser.add_argument("--modes", default=",".join(MODE_LIST), help="Comma-separated modes")
+    parser.add_argument("--seeds", default=",".join(str(s) for s in SEEDS), help="Comma-separated seeds")
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=1,
+        help="Scenarios per Cooja JVM (runs sharing a firmware are batched; 1 disables)",
+    )
+    parser.add_argument("--keep-summary", action="store_true", help="Do not back up summary.csv at start")
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Keep summary.db and skip runs its ledger already has as done (implies --keep-summary)",
+    )
+    parser.add_argument(
+        "--queue",
+        help="Hand runs to `work_queue.py worker` processes through this shared queue database "
+        "instead of running them here (--jobs/--batch-size then apply to nobody)",
+    )
+    parser.add_argument(
+        "--replicate",
+        action="store_true",
+        help="Sequential seeds: --min-seeds per condition, more while the PDR/p95 CI is too wide "
+        "(--seeds gives the first seeds)",
+    )
+    add_policy_args(parser)
+    parser.add_argument(
+        "--search",
+        action="store_true",
+        help="Bisect each stage axis for the collapse boundary instead of running the full grid",
+    )
+    args = parser.parse_args()
+    if args.replicate and args.search:
+        parser.error("--replicate and --search are exclusive")
+
+    root_dir = Path(args.root_dir).resolve()
+    summary_path = root_dir / "results" / "summary.csv"
+    stages = parse_list(args.stages)
+    modes = parse_list(args.modes)
+    seeds = [int(seed) for seed in parse_list(args.seeds)]
+    for stage in stages:
+        if stage not in STAGES:
+            print(f"Unknown stage: {stage}", file=sys.stderr)
+            return 2
+
+    # Search mode reuses existing results, so it never moves the store aside.
+    if not args.keep_summary and not args.resume and not args.search:
+        stamp = time.strftime("%Y%m%d_%H%M%S")
+        for path in (summary_path, default_store_path(summary_path)):
+            if path.exists():
+                path.rename(path.with_name(f"{path.name}.bak.{stamp}"))
+
+    # Loaded once; afterwards every landed run updates it incrementally.
+    tracker = load_tracker(summary_path)
+    extra_env = {"RESUME": "1"} if args.resume else None
+    if args.queue:
+        pool: WorkerPool | QueuePool = QueuePool(root_dir, Path(args.queue), keep_done=args.resume, tracker=tracker)
+    else:
+        pool = WorkerPool(root_dir, args.jobs, extra_env=extra_env, batch_size=args.batch_size, tracker=tracker)
+    for stage in stages:
+        # Stage 2/3 inputs depend on the previous stage, so each stage is a barrier.
+        if stage != "stage1" and not len(tracker):
+            print(f"No results in the store. Run the stage before {stage} first.", file=sys.stderr)
+            pool.shutdown()
+            return 1
+        phases: list[dict] = []
+        phase_start = time.monotonic()
+        if args.search:
+            launched_before = pool.launched
+            print(f"[all] {stage} search start on {pool.workers} @ {time.strftime('%F %T')}", flush=True)
+            results = run_search_stage(stage, tracker, modes, CollapseSearch(pool, summary_path, seeds))
+            write_brackets(root_dir / "results" / "search_brackets.csv", results)
+            grid_runs = sum(len(r.line.points) for r in results) * len(seeds)
+            print(f"[all] {stage} search launched {pool.launched - launched_before} runs (full grid: {grid_runs})")
+        elif args.replicate:
+            policy = policy_from_args(args)
+            conditions = stage_grid(stage, tracker, modes, seeds[:1])
+            print(
+                f"[all] {stage} start: {len(conditions)} conditions x {policy.min_seeds}-{policy.max_seeds} seeds "
+                f"on {pool.workers} @ {time.strftime('%F %T')}",
+                flush=True,
+            )
+            launched = run_replicated(pool, stage, conditions, seeds, policy, tracker)
+            write_report(root_dir / "results" / f"replication_{stage}.csv", report_rows(tracker, policy, stage))
+            print(
+                f"[all] {stage} replicate launched {launched} runs "
+                f"(fixed grid with {len(seeds)} seeds: {len(conditions) * len(seeds)})",
+                flush=True,
+            )
+        else:
+            specs = stage_grid(stage, tracker, modes, seeds)
+            print(f"[all] {stage} start: {len(specs)} runs on {pool.workers} @ {time.strftime('%F %T')}", flush=True)
+            pool.run(specs, stage)
+        phases.append(phase_entry("runs", time.monotonic() - phase_start, None, None, 0))
+        phase_start = time.monotonic()
+        export_summary(summary_path)
+        phases.append(phase_entry("export", time.monotonic() - phase_start, None, None, 0))
+        phase_start = time.monotonic()
+        tracker.write_thresholds(root_dir / "results" / "thresholds.csv")
+        phases.append(phase_entry("thresholds", time.monotonic() - phase_start, None, None, 0))
+        # Sweep-level rows carry only the stage in the run key.
+        record_timings(summary_path, {"stage": stage}, phases)
+        print(f"[all] {stage} done @ {time.strftime('%F %T')}", flush=True)
+
+    pool.shutdown()
+    print(f"Sweep complete. Summary: {summary_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,392 @@
+#!/usr/bin/env python3
+"""Synthetic COOJA.testlog generator with exact ground truth.
+
+Writes `<time_us> <mote> <msg>` lines the way the gen_csc.py script does:
+sender.c/receiver_root.c INFO lines and `CSV,RTT`/`CSV,RX` records, RPL-lite
+INFO control traffic (trickle DIOs and their receptions, DIS until joined,
+DAO/DAO-ACK on join, refresh and parent switch), and at `debug` verbosity
+per-hop 6LoWPAN/CSMA chatter. Mote 1 is the root, senders are 2..N+1.
+
+The ground truth uses the parser's definitions (measure window on the
+receiver/ack clock, sequence-gap losses, nearest-rank p95), computed here
+from the generated packets, and is written next to the log as `.truth.json`.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import random
+import statistics
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+VERBOSITIES = ("csv", "app", "rpl", "debug")
+DIO_IMIN_S = 4.096
+DIO_DOUBLINGS = 8
+DIS_INTERVAL_S = 30.0
+DAO_REFRESH_S = 120.0
+PAYLOAD_LEN = 16
+
+
+@dataclass(frozen=True)
+class SynthSpec:
+    senders: int = 50
+    send_interval_s: float = 2.0
+    duration_s: float = 360.0
+    warmup_s: float = 60.0
+    measure_s: float = 300.0
+    loss: float = 0.05
+    verbosity: str = "rpl"
+    neighbors: int = 4
+    parent_switch_per_min: float = 0.05
+    clock_second: int = 1000
+    seed: int = 1
+
+
+@dataclass
+class GroundTruth:
+    lines: int
+    bytes: int
+    sent: int
+    delivered: int
+    rx: int
+    expected: int
+    pdr: float
+    pdr_sent: float
+    rtt_count: int
+    avg_rtt_ms: float
+    p95_rtt_ms: float
+    ctrl_tx: int
+    parent_switches: int | None
+    joined_nodes: int
+    join_time_med_s: float | None
+
+
+def global_addr(mote: int) -> str:
+    return f"aaaa::2{mote:02x}:{mote:x}:{mote:x}:{mote:x}"
+
+
+def link_addr(mote: int) -> str:
+    return f"fe80::2{mote:02x}:{mote:x}:{mote:x}:{mote:x}"
+
+
+def _info(module: str, text: str) -> str:
+    return f"[INFO: {module:<10}] {text}"
+
+
+def _dbg(module: str, text: str) -> str:
+    return f"[DBG : {module:<10}] {text}"
+
+
+def nearest_rank(values: list[float], q: float) -> float:
+    if not values:
+        return 0.0
+    return sorted(values)[max(0, math.ceil(q * len(values)) - 1)]
+
+
+class _Writer:
+    """Collects (time_us, mote, msg) and reports what the control-plane parser should count."""
+
+    def __init__(self, spec: SynthSpec) -> None:
+        self.spec = spec
+        self.events: list[tuple[int, int, int, str]] = []
+        self.ctrl_tx = 0
+
+    def add(self, time_s: float, mote: int, msg: str) -> bool:
+        """False when the line falls after the end of the simulation (and is dropped)."""
+        time_us = int(round(time_s * 1e6))
+        if time_us >= self.spec.duration_s * 1e6:
+            return False
+        self.events.append((time_us, len(self.events), mote, msg))
+        return True
+
+    def info(self, level: str, time_s: float, mote: int, module: str, text: str) -> None:
+        if VERBOSITIES.index(self.spec.verbosity) >= VERBOSITIES.index(level):
+            self.add(time_s, mote, _info(module, text))
+
+    def ctrl(self, time_s: float, mote: int, text: str) -> None:
+        if self.spec.verbosity in ("rpl", "debug") and self.add(time_s, mote, _info("RPL", text)):
+            if text.startswith("sending"):
+                self.ctrl_tx += 1
+
+    def hops(self, time_s: float, src: int, dst: int, hops: int) -> None:
+        if self.spec.verbosity != "debug":
+            return
+        for hop in range(hops):
+            t = time_s + hop * 0.004
+            self.add(t, src, _dbg("6LoWPAN", f"output: sending IPv6 packet with len {PAYLOAD_LEN + 48}"))
+            self.add(
+                t,
+                src,
+                _dbg("CSMA", f"sending to 020{dst:x}.000{dst:x}.000{dst:x}.000{dst:x}, len 71, queue length 1"),
+            )
+
+
+def generate(spec: SynthSpec, out_path: Path) -> GroundTruth:
+    rng = random.Random(spec.seed)
+    w = _Writer(spec)
+    root = 1
+    motes = list(range(2, spec.senders + 2))
+    hops = {mote: 1 + int(math.sqrt(idx) / 2) for idx, mote in enumerate(motes)}
+    join_s = {mote: rng.uniform(3.0, 8.0) * hops[mote] + rng.uniform(0.0, 4.0) for mote in motes}
+    neighbors = {
+        mote: rng.sample([m for m in [root, *motes] if m != mote], min(spec.neighbors, spec.senders))
+        for mote in [root, *motes]
+    }
+
+    w.info("app", 0.001, root, "RECVROOT", "boot")
+    w.info("app", 0.002, root, "RECVROOT", f"root ip = {global_addr(root)}")
+    w.info("app", 0.003, root, "RECVROOT", "root_start() ok")
+
+    # Parent timeline per sender: (time, parent); switches are Poisson after the join.
+    parents: dict[int, list[tuple[float, int]]] = {}
+    for mote in motes:
+        timeline = [(join_s[mote], root if hops[mote] == 1 else rng.choice(motes[: max(1, mote - 2)]))]
+        rate = spec.parent_switch_per_min / 60.0
+        t = join_s[mote]
+        while rate > 0:
+            t += rng.expovariate(rate)
+            if t >= spec.duration_s:
+                break
+            choices = [m for m in [root, *motes] if m not in (mote, timeline[-1][1])]
+            timeline.append((t, rng.choice(choices)))
+        parents[mote] = timeline
+
+    def parent_at(mote: int, t: float) -> int | None:
+        current = None
+        for start, parent in parents[mote]:
+            if start > t:
+                break
+            current = parent
+        return current
+
+    # Control plane: DIS until joined, trickle DIOs reset by parent switches, DAO/DAO-ACK.
+    for mote in [root, *motes]:
+        start = 0.5 if mote == root else join_s[mote]
+        if mote != root:
+            t = rng.uniform(0.1, 1.0)
+            while t < join_s[mote]:
+                w.ctrl(t, mote, "sending a DIS to ff02::1a")
+                for nbr in neighbors[mote]:
+                    if nbr == root or join_s[nbr] < t:
+                        w.ctrl(t + 0.003, nbr, f"received a DIS from {link_addr(mote)}")
+                t += DIS_INTERVAL_S
+            previous = None
+            for switch_s, parent in parents[mote]:
+                if previous is not None:
+                    w.ctrl(switch_s, mote, f"parent switch: {link_addr(previous)} -> {link_addr(parent)}")
+                else:
+                    w.ctrl(switch_s, mote, f"parent switch: (NULL IP addr) -> {link_addr(parent)}")
+                previous = parent
+        resets = [start] + [s for s, _ in parents.get(mote, [])[1:]]
+        for idx, reset in enumerate(resets):
+            end = resets[idx + 1] if idx + 1 < len(resets) else spec.duration_s
+            interval = DIO_IMIN_S
+            t = reset
+            while t < end:
+                tx = t + rng.uniform(interval / 2, interval)
+                if tx >= end:
+                    break
+                w.ctrl(tx, mote, f"sending a multicast-DIO with rank {128 * (1 + hops.get(mote, 0))} to ff02::1a")
+                for nbr in neighbors[mote]:
+                    w.ctrl(
+                        tx + 0.002,
+                        nbr,
+                        f"received a DIO from {link_addr(mote)}, instance_id 0, DAG ID {global_addr(root)}, "
+                        f"version 240, dtsn 240, rank {128 * (1 + hops.get(mote, 0))}",
+                    )
+                t += interval
+                interval = min(interval * 2, DIO_IMIN_S * 2 ** DIO_DOUBLINGS)
+        if mote == root:
+            continue
+        dao_times = sorted({*(s for s, _ in parents[mote])})
+        refresh = join_s[mote] + DAO_REFRESH_S
+        while refresh < spec.duration_s:
+            dao_times.append(refresh)
+            refresh += DAO_REFRESH_S
+        for seqno, t in enumerate(sorted(dao_times), start=240):
+            parent = parent_at(mote, t) or root
+            w.ctrl(
+                t + 0.01,
+                mote,
+                f"sending a DAO seqno {seqno & 0xff}, tx count 1, lifetime 30, prefix {global_addr(mote)} "
+                f"to {global_addr(root)} , parent {link_addr(parent)}",
+            )
+            delay = 0.01 + 0.008 * hops[mote]
+            w.ctrl(t + delay, root, f"received a DAO from {link_addr(mote)}")
+            w.ctrl(t + delay + 0.001, root, f"sending a DAO-ACK seqno {seqno & 0xff} to {link_addr(mote)}")
+            w.ctrl(
+                t + 2 * delay,
+                mote,
+                f"received a DAO-ACK with seqno {seqno & 0xff} (0 0) and status 0 from {link_addr(root)}",
+            )
+
+    # Data plane, following sender.c: one tick per send interval.
+    sent = delivered = 0
+    rx_by_src: dict[int, list[tuple[int, int]]] = {mote: [] for mote in motes}
+    rtt_ms: list[float] = []
+    joined_first: dict[int, float] = {}
+    tick_s = 1.0 / spec.clock_second
+    for mote in motes:
+        reachable = 0
+        seq = 0
+        t = rng.uniform(0.0, spec.send_interval_s) + spec.send_interval_s
+        while t < spec.duration_s:
+            joined = int(t >= join_s[mote])
+            if joined and mote not in joined_first:
+                joined_first[mote] = t
+            if joined != reachable:
+                w.info("app", t, mote, "SENDER", f"reachable changed: {reachable} -> {joined}")
+                reachable = joined
+            if joined:
+                parent = parent_at(mote, t) or root
+                w.info(
+                    "app",
+                    t,
+                    mote,
+                    "SENDER",
+                    f"routing state: joined=1 reachable=1 routes=0 defrt=yes defrt={link_addr(parent)}",
+                )
+            else:
+                w.info("app", t, mote, "SENDER", "routing state: joined=0 reachable=0 routes=0 defrt=no")
+            if t < spec.warmup_s:
+                w.info("app", t, mote, "SENDER", "warmup in progress")
+                t += spec.send_interval_s
+                continue
+            seq += 1
+            sent += 1
+            t0 = int(t * spec.clock_second)
+            w.info("app", t, mote, "SENDER", f"TX seq={seq} t0={t0} joined={joined}")
+            w.hops(t, mote, root, hops[mote])
+            if joined and rng.random() >= spec.loss:
+                delivered += 1
+                up_s = sum(0.004 + rng.expovariate(1 / 0.006) for _ in range(hops[mote]))
+                recv_s = t + up_s
+                t_recv = int(recv_s * spec.clock_second)
+                if w.add(recv_s, root, f"CSV,RX,{global_addr(mote)},{seq},{t_recv},{PAYLOAD_LEN}"):
+                    rx_by_src[mote].append((t_recv, seq))
+                w.info("app", recv_s, root, "RECVROOT", f"echo sent to {global_addr(mote)} seq={seq}")
+                w.hops(recv_s, root, mote, hops[mote])
+                if rng.random() >= spec.loss:
+                    down_s = sum(0.004 + rng.expovariate(1 / 0.006) for _ in range(hops[mote]))
+                    ack_s = recv_s + down_s + tick_s
+                    t_ack = int(ack_s * spec.clock_second)
+                    rtt_ticks = t_ack - t0
+                    w.info("app", ack_s, mote, "SENDER", f"echo rx seq={seq} rtt_ticks={rtt_ticks} len={PAYLOAD_LEN}")
+                    kept = w.add(ack_s, mote, f"CSV,RTT,{seq},{t0},{t_ack},{rtt_ticks},{PAYLOAD_LEN}")
+                    window_s = t_ack / spec.clock_second
+                    if kept and spec.warmup_s <= window_s < spec.warmup_s + spec.measure_s:
+                        rtt_ms.append(rtt_ticks * 1000.0 / spec.clock_second)
+            t += spec.send_interval_s
+
+    w.events.sort()
+    lines = 0
+    with out_path.open("w", encoding="ascii") as out:
+        out.write("Simulation started\n")
+        lines += 1
+        for time_us, _, mote, msg in w.events:
+            out.write(f"{time_us} {mote} {msg}\n")
+            lines += 1
+
+    rx = lost = 0
+    window_end = spec.warmup_s + spec.measure_s
+    for received in rx_by_src.values():
+        last_seq = None
+        for t_recv, seq in sorted(received):
+            if not spec.warmup_s <= t_recv / spec.clock_second < window_end:
+                continue
+            rx += 1
+            if last_seq is not None and seq - last_seq - 1 > 0:
+                lost += seq - last_seq - 1
+            last_seq = seq
+    joins = sorted(joined_first.values())
+    return GroundTruth(
+        lines=lines,
+        bytes=out_path.stat().st_size,
+        sent=sent,
+        delivered=delivered,
+        rx=rx,
+        expected=rx + lost,
+        pdr=rx / (rx + lost) if rx + lost else 0.0,
+        pdr_sent=delivered / sent if sent else 0.0,
+        rtt_count=len(rtt_ms),
+        avg_rtt_ms=statistics.fmean(rtt_ms) if rtt_ms else 0.0,
+        p95_rtt_ms=nearest_rank(rtt_ms, 0.95),
+        ctrl_tx=w.ctrl_tx,
+        # Without RPL lines the parser only sees the sampled default route, which can miss switches.
+        parent_switches=(
+            sum(len(timeline) - 1 for timeline in parents.values())
+            if spec.verbosity in ("rpl", "debug") else None
+        ),
+        joined_nodes=len(joins) if spec.verbosity != "csv" else 0,
+        join_time_med_s=statistics.median(joins) if joins and spec.verbosity != "csv" else None,
+    )
+
+
+def truth_path(log_path: Path) -> Path:
+    return log_path.with_name(log_path.name + ".truth.json")
+
+
+def write_truth(log_path: Path, spec: SynthSpec, truth: GroundTruth) -> Path:
+    path = truth_path(log_path)
+    path.write_text(json.dumps({"spec": asdict(spec), "truth": asdict(truth)}, indent=1) + "\n")
+    return path
+
+
+def add_spec_args(parser: argparse.ArgumentParser) -> None:
+    defaults = SynthSpec()
+    parser.add_argument("--senders", type=int, default=defaults.senders, help="Sender motes")
+    parser.add_argument("--send-interval-s", type=float, default=defaults.send_interval_s, help="Send interval")
+    parser.add_argument("--duration-s", type=float, default=defaults.duration_s, help="Simulated seconds")
+    parser.add_argument("--warmup-s", type=float, default=defaults.warmup_s, help="Warmup seconds")
+    parser.add_argument("--measure-s", type=float, default=defaults.measure_s, help="Measure seconds")
+    parser.add_argument("--loss", type=float, default=defaults.loss, help="Per-direction packet loss probability")
+    parser.add_argument("--verbosity", choices=VERBOSITIES, default=defaults.verbosity, help="Log verbosity")
+    parser.add_argument("--neighbors", type=int, default=defaults.neighbors, help="DIO/DIS receivers per mote")
+    parser.add_argument(
+        "--parent-switch-per-min",
+        type=float,
+        default=defaults.parent_switch_per_min,
+        help="Parent switch rate per node",
+    )
+    parser.add_argument("--clock-second", type=int, default=defaults.clock_second, help="Contiki clock ticks per second")
+    parser.add_argument("--seed", type=int, default=defaults.seed, help="Generator seed")
+
+
+def spec_from_args(args: argparse.Namespace) -> SynthSpec:
+    return SynthSpec(
+        senders=args.senders,
+        send_interval_s=args.send_interval_s,
+        duration_s=args.duration_s,
+        warmup_s=args.warmup_s,
+        measure_s=args.measure_s,
+        loss=args.loss,
+        verbosity=args.verbosity,
+        neighbors=args.neighbors,
+        parent_switch_per_min=args.parent_switch_per_min,
+        clock_second=args.clock_second,
+        seed=args.seed,
+    )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Write a synthetic COOJA.testlog and its ground truth")
+    parser.add_argument("--out", required=True, help="Output testlog path")
+    add_spec_args(parser)
+    args = parser.parse_args()
+
+    spec = spec_from_args(args)
+    out_path = Path(args.out)
+    truth = generate(spec, out_path)
+    truth_file = write_truth(out_path, spec, truth)
+    print(
+        f"{out_path}: {truth.lines} lines, {truth.bytes / 1e6:.1f} MB; "
+        f"pdr={truth.pdr:.6f} p95_rtt_ms={truth.p95_rtt_ms:.2f} ctrl_tx={truth.ctrl_tx} (truth: {truth_file})"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""Per-phase wall time / peak RSS instrumentation for runs and sweeps.
+
+`run` wraps one phase command and appends a JSON line to a per-run timings
+file; `record` loads that file into the `timings` table of summary.db under
+the run key; `report` ranks phases and flags outlier runs.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import resource
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+
+from results_store import KEY_FIELDS, default_store_path, open_store
+
+OUTLIER_MAD = 3.5
+MIN_SAMPLES = 5
+MIN_EXCESS = 0.5
+ENTRY_FIELDS = ("phase", "wall_s", "max_rss_kb", "sim_s", "exit_code", "recorded_at")
+
+
+def child_max_rss_kb() -> int:
+    # Linux reports ru_maxrss in KiB; this process only ever has one child.
+    return resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+
+
+def proc_peak_rss_kb(pid: int) -> int | None:
+    """Peak RSS (VmHWM) of a live process, for callers that cannot use rusage."""
+    try:
+        with open(f"/proc/{pid}/status", encoding="ascii") as handle:
+            for line in handle:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def phase_entry(
+    phase: str,
+    wall_s: float,
+    max_rss_kb: int | None,
+    sim_s: float | None,
+    exit_code: int,
+) -> dict:
+    return {
+        "phase": phase,
+        "wall_s": round(wall_s, 3),
+        "max_rss_kb": max_rss_kb,
+        "sim_s": sim_s,
+        "exit_code": exit_code,
+        "recorded_at": time.strftime("%F %T"),
+    }
+
+
+def append_phase(
+    path: Path,
+    phase: str,
+    wall_s: float,
+    max_rss_kb: int | None,
+    sim_s: float | None,
+    exit_code: int,
+) -> None:
+    entry = phase_entry(phase, wall_s, max_rss_kb, sim_s, exit_code)
+    with path.open("a", encoding="utf-8") as handle:
+        handle.write(json.dumps(entry) + "\n")
+
+
+def _fmt(value: object) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, float):
+        return f"{value:.3f}"
+    return str(value)
+
+
+def timing_rows(key: dict[str, str], entries: list[dict]) -> list[dict[str, str]]:
+    """One row per phase plus a `total` row (sum of wall, max of RSS)."""
+    rows = []
+    for entry in entries:
+        sim_s = entry.get("sim_s")
+        wall_s = entry["wall_s"]
+        speed = sim_s / wall_s if sim_s and wall_s > 0 else None
+        row = {name: _fmt(entry.get(name)) for name in ENTRY_FIELDS}
+        rows.append({**key, **row, "sim_speed": _fmt(speed)})
+    if entries:
+        wall_total = sum(entry["wall_s"] for entry in entries)
+        rss = [entry["max_rss_kb"] for entry in entries if entry.get("max_rss_kb") is not None]
+        sim_s = max((entry.get("sim_s") or 0.0 for entry in entries), default=0.0)
+        rows.append({
+            **key,
+            "phase": "total",
+            "wall_s": _fmt(wall_total),
+            "max_rss_kb": _fmt(max(rss) if rss else None),
+            "sim_s": _fmt(sim_s or None),
+            "sim_speed": _fmt(sim_s / wall_total if sim_s and wall_total > 0 else None),
+            "exit_code": _fmt(max(entry.get("exit_code") or 0 for entry in entries)),
+            "recorded_at": entries[-1].get("recorded_at", ""),
+        })
+    return rows
+
+
+def record_timings(
+    summary_path: Path,
+    key: dict[str, str],
+    entries: list[dict],
+    store_path: Path | None = None,
+) -> None:
+    full_key = {name: str(key.get(name, "")) for name in KEY_FIELDS}
+    # Ratios use the same str(float) form as the summary rows.
+    for name in ("success_ratio", "interference_ratio"):
+        if full_key[name]:
+            full_key[name] = str(float(full_key[name]))
+    with open_store(store_path or default_store_path(summary_path), summary_path) as store:
+        store.upsert_timings(timing_rows(full_key, entries))
+
+
+def load_entries(path: Path) -> list[dict]:
+    if not path.exists():
+        return []
+    with path.open("r", encoding="utf-8") as handle:
+        return [json.loads(line) for line in handle if line.strip()]
+
+
+def _float(value: str) -> float | None:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def run_label(row: dict[str, str]) -> str:
+    if not row.get("mode"):
+        return f"[sweep {row.get('stage', '')}]"
+    return (
+        f"{row['mode']} {row['stage']} N={row['n_senders']} seed={row['seed']} "
+        f"sr={row['success_ratio']} ir={row['interference_ratio']} si={row['send_interval_s']}"
+    )
+
+
+def phase_table(rows: list[dict[str, str]]) -> list[str]:
+    by_phase: dict[str, list[float]] = defaultdict(list)
+    rss_by_phase: dict[str, list[float]] = defaultdict(list)
+    for row in rows:
+        wall = _float(row["wall_s"])
+        if row["phase"] == "total" or wall is None:
+            continue
+        by_phase[row["phase"]].append(wall)
+        rss = _float(row["max_rss_kb"])
+        if rss is not None:
+            rss_by_phase[row["phase"]].append(rss)
+    grand = sum(sum(walls) for walls in by_phase.values())
+
+    lines = [
+        f"{'phase':<16} {'runs':>6} {'total_s':>10} {'share':>7} "
+        f"{'mean_s':>8} {'p95_s':>8} {'max_rss_mb':>10}"
+    ]
+    for phase, walls in sorted(by_phase.items(), key=lambda kv: -sum(kv[1])):
+        walls = sorted(walls)
+        total = sum(walls)
+        p95 = walls[max(0, -(-95 * len(walls) // 100) - 1)]
+        rss = rss_by_phase.get(phase)
+        rss_text = f"{max(rss) / 1024:.1f}" if rss else "-"
+        lines.append(
+            f"{phase:<16} {len(walls):>6} {total:>10.1f} {100 * total / grand if grand else 0:>6.1f}% "
+            f"{total / len(walls):>8.2f} {p95:>8.2f} {rss_text:>10}"
+        )
+    return lines
+
+
+def _robust_outliers(
+    values: list[tuple[dict[str, str], float]],
+    higher_is_worse: bool,
+) -> list[tuple[float, dict[str, str], float, float]]:
+    if len(values) < MIN_SAMPLES:
+        return []
+    median = statistics.median(v for _, v in values)
+    mad = statistics.median(abs(v - median) for _, v in values) or max(abs(median) * 0.05, 1e-3)
+    found = []
+    for row, value in values:
+        excess = (value - median) if higher_is_worse else (median - value)
+        if excess / mad > OUTLIER_MAD and excess >= MIN_EXCESS * max(abs(median), 1.0):
+            found.append((excess / mad, row, value, median))
+    return found
+
+
+def report(rows: list[dict[str, str]], top: int) -> str:
+    run_rows = [row for row in rows if row.get("mode")]
+    sweep_rows = [row for row in rows if not row.get("mode")]
+    lines = ["Run phases (ranked by total wall time):", *phase_table(run_rows)]
+    if sweep_rows:
+        lines += ["", "Sweep-level phases:", *phase_table(sweep_rows)]
+
+    # Robust outliers: more than OUTLIER_MAD MADs (and MIN_EXCESS of the median) off the phase median.
+    outliers: list[tuple[float, str]] = []
+    by_phase: dict[str, list[tuple[dict[str, str], float]]] = defaultdict(list)
+    for row in run_rows:
+        wall = _float(row["wall_s"])
+        if wall is not None:
+            by_phase[row["phase"]].append((row, wall))
+    for phase, values in by_phase.items():
+        for score, row, wall, median in _robust_outliers(values, higher_is_worse=True):
+            outliers.append((score, f"{phase:<16} {wall:>8.1f}s (median {median:.1f}s) {run_label(row)}"))
+    speeds = [(row, _float(row["sim_speed"])) for row in run_rows if row["phase"] == "simulation"]
+    for score, row, speed, median in _robust_outliers([(r, v) for r, v in speeds if v], higher_is_worse=False):
+        outliers.append((score, f"{'sim_speed':<16} {speed:>8.2f}x (median {median:.2f}x) {run_label(row)}"))
+
+    lines.append("")
+    if outliers:
+        lines.append(f"Outlier runs (> {OUTLIER_MAD} MAD from the phase median):")
+        lines.extend(f"  {text}" for _, text in sorted(outliers, key=lambda item: -item[0])[:top])
+    else:
+        lines.append("No outlier runs.")
+    return "\n".join(lines)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Per-phase timings for runs and sweeps")
+    sub = parser.add_subparsers(dest="action", required=True)
+
+    run_p = sub.add_parser("run", help="Run one phase command and append its timing")
+    run_p.add_argument("--out", required=True, help="Per-run timings JSONL")
+    run_p.add_argument("--phase", required=True, help="Phase name")
+    run_p.add_argument("command", nargs=argparse.REMAINDER, help="-- command to run")
+
+    record_p = sub.add_parser("record", help="Load a timings JSONL into summary.db")
+    record_p.add_argument("--timings", required=True, help="Per-run timings JSONL")
+    record_p.add_argument("--summary", default="results/summary.csv", help="summary.csv path")
+    record_p.add_argument("--store", help="SQLite store path (default: summary path with .db suffix)")
+    for name in KEY_FIELDS:
+        record_p.add_argument(f"--{name.replace('_', '-')}", default="", help=f"Run key: {name}")
+
+    report_p = sub.add_parser("report", help="Rank phases and flag outlier runs")
+    report_p.add_argument("--summary", default="results/summary.csv", help="summary.csv path")
+    report_p.add_argument("--store", help="SQLite store path (default: summary path with .db suffix)")
+    report_p.add_argument("--stage", action="append", help="Limit to stage (repeatable)")
+    report_p.add_argument("--top", type=int, default=20, help="Outliers to list")
+    args = parser.parse_args()
+
+    if args.action == "run":
+        command = args.command[1:] if args.command[:1] == ["--"] else args.command
+        if not command:
+            parser.error("missing command after --")
+        start = time.monotonic()
+        try:
+            exit_code = subprocess.call(command)
+        except OSError as exc:
+            print(f"{command[0]}: {exc}", file=sys.stderr)
+            exit_code = 127
+        append_phase(Path(args.out), args.phase, time.monotonic() - start, child_max_rss_kb(), None, exit_code)
+        return exit_code
+
+    summary_path = Path(args.summary)
+    store_path = Path(args.store) if args.store else default_store_path(summary_path)
+    if args.action == "record":
+        timings_path = Path(args.timings)
+        key = {name: getattr(args, name) for name in KEY_FIELDS}
+        record_timings(summary_path, key, load_entries(timings_path), store_path)
+        timings_path.unlink(missing_ok=True)
+        return 0
+
+    with open_store(store_path, summary_path) as store:
+        rows = store.timings()
+    if args.stage:
+        rows = [row for row in rows if row["stage"] in args.stage]
+    if not rows:
+        print(f"No timings in {store_path}", file=sys.stderr)
+        return 1
+    print(report(rows, args.top))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
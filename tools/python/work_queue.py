@@ -0,0 +1,371 @@
+#!/usr/bin/env python3
+"""Pull-based work queue for distributing sweep runs across hosts.
+
+The queue is a SQLite file in a directory every host can reach. The sweep
+driver (`sweep.py --queue`) enqueues each stage's runs and waits for them;
+`work_queue.py worker` processes on any machine with Contiki/Cooja claim a
+run under a lease, renew it by heartbeat while `run_experiment.sh` runs, and
+hand back the summary row and raw-log location. A run whose lease expires
+(dead or partitioned worker) goes back to pending, up to --max-attempts.
+
+The database uses a rollback journal rather than WAL, since WAL's shared
+memory does not work across hosts; the shared filesystem must support POSIX
+locks (local disks and NFSv4 do).
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import shlex
+import socket
+import sqlite3
+import subprocess
+import sys
+import time
+from collections import Counter
+from dataclasses import dataclass
+from pathlib import Path
+
+from results_store import KEY_FIELDS, default_store_path, open_store
+from run_monitor import stop_process
+
+STATE_PENDING = "pending"
+STATE_LEASED = "leased"
+STATE_DONE = "done"
+STATE_FAILED = "failed"
+STATES = (STATE_PENDING, STATE_LEASED, STATE_DONE, STATE_FAILED)
+DEFAULT_LEASE_S = 120.0
+DEFAULT_HEARTBEAT_S = 30.0
+DEFAULT_MAX_ATTEMPTS = 3
+BUSY_TIMEOUT_S = 120.0
+POLL_S = 2.0
+
+QUEUE_FIELDS = ["run_id", "label"] + KEY_FIELDS + [
+    "args",
+    "state",
+    "attempts",
+    "worker",
+    "lease_expires",
+    "enqueued_at",
+    "started_at",
+    "finished_at",
+    "exit_code",
+    "elapsed_s",
+    "summary",
+    "log_path",
+]
+REAL_FIELDS = {"lease_expires", "enqueued_at", "started_at", "finished_at", "elapsed_s"}
+INT_FIELDS = {"attempts", "exit_code"}
+
+
+def default_queue_path(root_dir: Path) -> Path:
+    return root_dir / "results" / "queue.db"
+
+
+def worker_name() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+@dataclass
+class Job:
+    run_id: str
+    key: dict[str, str]
+    args: list[str]
+    attempts: int
+
+
+class WorkQueue:
+    """Queue table in a shared SQLite file; every state change is one IMMEDIATE transaction."""
+
+    def __init__(self, path: Path, lease_s: float = DEFAULT_LEASE_S, max_attempts: int = DEFAULT_MAX_ATTEMPTS) -> None:
+        self.path = path
+        self.lease_s = lease_s
+        self.max_attempts = max_attempts
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(path), timeout=BUSY_TIMEOUT_S, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=DELETE")
+        columns = ", ".join(
+            f"{name} REAL" if name in REAL_FIELDS
+            else f"{name} INTEGER NOT NULL DEFAULT 0" if name in INT_FIELDS
+            else f"{name} TEXT NOT NULL DEFAULT ''"
+            for name in QUEUE_FIELDS
+        )
+        self.conn.execute(f"CREATE TABLE IF NOT EXISTS queue ({columns}, PRIMARY KEY (run_id))")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS queue_state ON queue (state, enqueued_at)")
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def __enter__(self) -> "WorkQueue":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+    def _write(self, sql: str, params: tuple | list = ()) -> int:
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            count = self.conn.execute(sql, params).rowcount
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        self.conn.execute("COMMIT")
+        return count
+
+    def enqueue(self, run_id: str, label: str, key: dict[str, str], args: list[str], keep_done: bool) -> bool:
+        """Add a run, or reset an earlier one to pending; leased runs are left to their worker."""
+        done_guard = f" AND state != '{STATE_DONE}'" if keep_done else ""
+        names = ["run_id", "label", *KEY_FIELDS, "args", "state", "enqueued_at"]
+        values = [run_id, label, *(str(key[name]) for name in KEY_FIELDS), json.dumps(args), STATE_PENDING, time.time()]
+        sql = (
+            f"INSERT INTO queue ({', '.join(names)}) VALUES ({', '.join('?' for _ in names)}) "
+            "ON CONFLICT (run_id) DO UPDATE SET label=excluded.label, args=excluded.args, "
+            "state=excluded.state, enqueued_at=excluded.enqueued_at, attempts=0, worker='', "
+            "lease_expires=NULL, started_at=NULL, finished_at=NULL, exit_code=0, elapsed_s=NULL, "
+            f"summary='', log_path='' WHERE state != '{STATE_LEASED}'{done_guard}"
+        )
+        return self._write(sql, values) > 0
+
+    def requeue_expired(self) -> int:
+        """Expired leases go back to pending, or fail once they used up their attempts."""
+        now = time.time()
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            failed = self.conn.execute(
+                "UPDATE queue SET state = ?, finished_at = ?, exit_code = -1 "
+                "WHERE state = ? AND lease_expires < ? AND attempts >= ?",
+                (STATE_FAILED, now, STATE_LEASED, now, self.max_attempts),
+            ).rowcount
+            requeued = self.conn.execute(
+                "UPDATE queue SET state = ?, worker = '', lease_expires = NULL WHERE state = ? AND lease_expires < ?",
+                (STATE_PENDING, STATE_LEASED, now),
+            ).rowcount
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        self.conn.execute("COMMIT")
+        return failed + requeued
+
+    def claim(self, worker: str) -> Job | None:
+        self.requeue_expired()
+        now = time.time()
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = self.conn.execute(
+                f"SELECT run_id, {', '.join(KEY_FIELDS)}, args, attempts FROM queue "
+                "WHERE state = ? ORDER BY enqueued_at, run_id LIMIT 1",
+                (STATE_PENDING,),
+            ).fetchone()
+            if row is not None:
+                self.conn.execute(
+                    "UPDATE queue SET state = ?, worker = ?, lease_expires = ?, started_at = ?, "
+                    "attempts = attempts + 1 WHERE run_id = ?",
+                    (STATE_LEASED, worker, now + self.lease_s, now, row[0]),
+                )
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        self.conn.execute("COMMIT")
+        if row is None:
+            return None
+        key = dict(zip(KEY_FIELDS, row[1:1 + len(KEY_FIELDS)]))
+        return Job(row[0], key, json.loads(row[-2]), row[-1] + 1)
+
+    def heartbeat(self, run_id: str, worker: str) -> bool:
+        """Extend the lease; False if it was lost (expired and requeued or taken over)."""
+        return self._write(
+            "UPDATE queue SET lease_expires = ? WHERE run_id = ? AND worker = ? AND state = ?",
+            (time.time() + self.lease_s, run_id, worker, STATE_LEASED),
+        ) > 0
+
+    def complete(
+        self,
+        run_id: str,
+        worker: str,
+        exit_code: int,
+        elapsed_s: float,
+        summary: dict[str, str] | None,
+        log_path: str,
+    ) -> bool:
+        state = STATE_DONE if exit_code == 0 else STATE_FAILED
+        return self._write(
+            "UPDATE queue SET state = ?, exit_code = ?, elapsed_s = ?, finished_at = ?, summary = ?, "
+            "log_path = ?, lease_expires = NULL WHERE run_id = ? AND worker = ? AND state = ?",
+            (
+                state, exit_code, elapsed_s, time.time(), json.dumps(summary) if summary else "",
+                log_path, run_id, worker, STATE_LEASED,
+            ),
+        ) > 0
+
+    def entries(self, run_ids: list[str] | None = None, label: str | None = None) -> list[dict]:
+        clauses: list[str] = []
+        params: list[str] = []
+        if run_ids is not None:
+            clauses.append(f"run_id IN ({', '.join('?' for _ in run_ids)})")
+            params.extend(run_ids)
+        if label is not None:
+            clauses.append("label = ?")
+            params.append(label)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        sql = f"SELECT {', '.join(QUEUE_FIELDS)} FROM queue{where} ORDER BY enqueued_at, run_id"
+        return [dict(zip(QUEUE_FIELDS, values)) for values in self.conn.execute(sql, params)]
+
+    def finished(self, run_ids: list[str]) -> list[dict]:
+        """Entries of `run_ids` that reached done/failed (queried in chunks of SQLite's bind limit)."""
+        out: list[dict] = []
+        for start in range(0, len(run_ids), 500):
+            chunk = run_ids[start:start + 500]
+            out.extend(
+                entry for entry in self.entries(chunk) if entry["state"] in (STATE_DONE, STATE_FAILED)
+            )
+        return out
+
+
+def run_job(
+    queue: WorkQueue,
+    job: Job,
+    worker: str,
+    root_dir: Path,
+    runner: list[str],
+    heartbeat_s: float,
+    env: dict[str, str],
+) -> tuple[int, float, bool]:
+    """Run one claimed job, heartbeating its lease; returns (exit code, wall s, lease kept)."""
+    raw_dir = root_dir / "results" / "raw" / job.key["stage"] / job.key["mode"]
+    raw_dir.mkdir(parents=True, exist_ok=True)
+    basename = job.run_id.rsplit("/", 1)[-1]
+    start = time.monotonic()
+    with (raw_dir / f"{basename}.driver.log").open("w", encoding="utf-8") as handle:
+        proc = subprocess.Popen(
+            [*runner, *job.args], stdout=handle, stderr=subprocess.STDOUT, env=env, start_new_session=True
+        )
+        while True:
+            try:
+                exit_code = proc.wait(timeout=heartbeat_s)
+                break
+            except subprocess.TimeoutExpired:
+                pass
+            if not queue.heartbeat(job.run_id, worker):
+                # Someone else owns the run now; stop duplicating the work.
+                stop_process(proc)
+                return proc.returncode, time.monotonic() - start, False
+    return exit_code, time.monotonic() - start, True
+
+
+def worker_loop(args: argparse.Namespace) -> int:
+    root_dir = Path(args.root_dir).resolve()
+    queue_path = Path(args.queue) if args.queue else default_queue_path(root_dir)
+    runner = shlex.split(args.runner) if args.runner else [str(root_dir / "scripts" / "run_experiment.sh")]
+    summary_path = root_dir / "results" / "summary.csv"
+    worker = args.name or worker_name()
+    env = dict(os.environ)
+    env["SKIP_THRESHOLDS"] = "1"
+    env["SKIP_SUMMARY_EXPORT"] = "1"
+
+    done = 0
+    idle_since = time.monotonic()
+    with WorkQueue(queue_path, args.lease_s, args.max_attempts) as queue:
+        while args.max_runs <= 0 or done < args.max_runs:
+            job = queue.claim(worker)
+            if job is None:
+                if args.idle_exit_s >= 0 and time.monotonic() - idle_since >= args.idle_exit_s:
+                    break
+                time.sleep(args.poll_s)
+                continue
+            print(f"[{worker}] claimed {job.run_id} (attempt {job.attempts})", flush=True)
+            exit_code, elapsed, kept = run_job(queue, job, worker, root_dir, runner, args.heartbeat_s, env)
+            if not kept:
+                print(f"[{worker}] lost the lease on {job.run_id}; dropped", flush=True)
+            else:
+                row = None
+                if exit_code == 0:
+                    with open_store(default_store_path(summary_path), summary_path) as store:
+                        row = store.row(job.key)
+                log_path = f"{socket.gethostname()}:{row['log_path']}" if row and row.get("log_path") else ""
+                if not queue.complete(job.run_id, worker, exit_code, elapsed, row, log_path):
+                    print(f"[{worker}] {job.run_id} was requeued meanwhile; result dropped", flush=True)
+                state = "ok" if exit_code == 0 else f"status={exit_code}"
+                print(f"[{worker}] {job.run_id} {state} ({elapsed:.0f}s) @ {time.strftime('%F %T')}", flush=True)
+            done += 1
+            idle_since = time.monotonic()
+    return 0
+
+
+def status_report(entries: list[dict]) -> str:
+    by_label: dict[str, Counter] = {}
+    for entry in entries:
+        by_label.setdefault(entry["label"] or "-", Counter())[entry["state"]] += 1
+    lines = [f"{'label':<12} " + " ".join(f"{state:>8}" for state in STATES)]
+    for label, counts in sorted(by_label.items()):
+        lines.append(f"{label:<12} " + " ".join(f"{counts[state]:>8}" for state in STATES))
+    now = time.time()
+    workers = Counter(entry["worker"] for entry in entries if entry["state"] == STATE_LEASED)
+    for worker, count in sorted(workers.items()):
+        expires = min(
+            entry["lease_expires"] or now for entry in entries
+            if entry["state"] == STATE_LEASED and entry["worker"] == worker
+        )
+        lines.append(f"  {worker}: {count} leased, next lease expiry in {expires - now:.0f}s")
+    return "\n".join(lines)
+
+
+def main() -> int:
+    default_root = Path(__file__).resolve().parents[2]
+    parser = argparse.ArgumentParser(description="Shared work queue for distributed sweeps")
+    sub = parser.add_subparsers(dest="action", required=True)
+
+    def add_queue_args(p: argparse.ArgumentParser) -> None:
+        p.add_argument("--root-dir", default=str(default_root), help="rpl-benchmark root")
+        p.add_argument("--queue", help="Queue database (default: <root>/results/queue.db)")
+
+    worker_p = sub.add_parser("worker", help="Claim and run queued runs until idle")
+    add_queue_args(worker_p)
+    worker_p.add_argument("--name", help="Worker name (default: host:pid)")
+    worker_p.add_argument(
+        "--runner",
+        help="Command that receives the run_experiment.sh arguments (default: scripts/run_experiment.sh)",
+    )
+    worker_p.add_argument("--lease-s", type=float, default=DEFAULT_LEASE_S, help="Lease length")
+    worker_p.add_argument("--heartbeat-s", type=float, default=DEFAULT_HEARTBEAT_S, help="Lease renewal interval")
+    worker_p.add_argument(
+        "--max-attempts",
+        type=int,
+        default=DEFAULT_MAX_ATTEMPTS,
+        help="Claims before a run whose lease keeps expiring is failed",
+    )
+    worker_p.add_argument("--poll-s", type=float, default=POLL_S, help="Polling interval when idle")
+    worker_p.add_argument(
+        "--idle-exit-s",
+        type=float,
+        default=-1,
+        help="Exit after this many seconds without work (default: run forever)",
+    )
+    worker_p.add_argument("--max-runs", type=int, default=0, help="Exit after this many runs (0: no limit)")
+
+    status_p = sub.add_parser("status", help="Per-label state counts and active leases")
+    add_queue_args(status_p)
+    status_p.add_argument("--label", help="Limit to label (sweep stage)")
+    args = parser.parse_args()
+
+    if args.action == "worker":
+        if args.heartbeat_s >= args.lease_s:
+            parser.error("--heartbeat-s must be shorter than --lease-s")
+        return worker_loop(args)
+
+    queue_path = Path(args.queue) if args.queue else default_queue_path(Path(args.root_dir))
+    if not queue_path.exists():
+        print(f"No queue at {queue_path}", file=sys.stderr)
+        return 1
+    with WorkQueue(queue_path) as queue:
+        entries = queue.entries(label=args.label)
+    if not entries:
+        print(f"Queue {queue_path} is empty", file=sys.stderr)
+        return 1
+    print(status_report(entries))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""Mote layouts and UDGM connectivity precheck for gen_csc.py.
+
+Layouts are deterministic for a given seed. Reachability and hop counts are a
+BFS from the root(s) over a spatial hash with tx-range cells, so only the 3x3
+neighbouring cells are checked per node instead of every pair.
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import math
+import random
+from collections import defaultdict, deque
+from dataclasses import dataclass
+from pathlib import Path
+
+LAYOUTS = ("grid", "random", "line", "cluster", "multiroot")
+
+
+@dataclass
+class Topology:
+    """Positions of root motes (ids 1..R) followed by senders (ids R+1..)."""
+
+    layout: str
+    roots: list[tuple[float, float]]
+    senders: list[tuple[float, float]]
+
+    @property
+    def points(self) -> list[tuple[float, float]]:
+        return self.roots + self.senders
+
+    def motes(self) -> list[tuple[int, float, float, str]]:
+        motes = [(idx, x, y, "root") for idx, (x, y) in enumerate(self.roots, start=1)]
+        first = len(self.roots) + 1
+        motes += [(idx, x, y, "sender") for idx, (x, y) in enumerate(self.senders, start=first)]
+        return motes
+
+
+class TopologyError(ValueError):
+    pass
+
+
+def generate_positions(count: int, spacing: float, start_x: float, start_y: float) -> list[tuple[float, float]]:
+    if count <= 0:
+        return []
+    cols = int(math.ceil(math.sqrt(count)))
+    rows = int(math.ceil(count / cols))
+    positions: list[tuple[float, float]] = []
+    for r in range(rows):
+        for c in range(cols):
+            if len(positions) >= count:
+                break
+            x = start_x + c * spacing
+            y = start_y + r * spacing
+            positions.append((x, y))
+    return positions
+
+
+def build_topology(
+    layout: str,
+    senders: int,
+    seed: int,
+    spacing: float = 25.0,
+    roots: int = 1,
+    clusters: int = 0,
+    corridor_width: float = 20.0,
+) -> Topology:
+    """Place `senders` motes (and the root(s)) with about one node per spacing^2."""
+    rng = random.Random(seed)
+    side = spacing * math.sqrt(max(1, senders))
+    if layout == "grid":
+        return Topology(layout, [(30.0, 60.0)], generate_positions(senders, spacing, 60.0, 40.0))
+    if layout == "random":
+        points = [(rng.uniform(0.0, side), rng.uniform(0.0, side)) for _ in range(senders)]
+        return Topology(layout, [(side / 2, side / 2)], points)
+    if layout == "line":
+        half = corridor_width / 2
+        points = [(i * spacing, rng.uniform(-half, half)) for i in range(1, senders + 1)]
+        return Topology(layout, [(0.0, 0.0)], points)
+    if layout == "cluster":
+        count = clusters or max(2, round(math.sqrt(senders) / 2))
+        centres = [(rng.uniform(0.0, side), rng.uniform(0.0, side)) for _ in range(count)]
+        points = []
+        for i in range(senders):
+            cx, cy = centres[i % count]
+            points.append((rng.gauss(cx, spacing), rng.gauss(cy, spacing)))
+        return Topology(layout, [(side / 2, side / 2)], points)
+    if layout == "multiroot":
+        count = max(2, roots)
+        points = [(rng.uniform(0.0, side), rng.uniform(0.0, side)) for _ in range(senders)]
+        # Roots evenly spaced along the horizontal midline.
+        root_points = [(side * (i + 0.5) / count, side / 2) for i in range(count)]
+        return Topology(layout, root_points, points)
+    raise TopologyError(f"unknown layout: {layout} (use {', '.join(LAYOUTS)})")
+
+
+def hop_counts(points: list[tuple[float, float]], n_roots: int, tx_range: float) -> list[int]:
+    """Hops to the nearest root over UDGM links (distance <= tx_range); -1 if unreachable."""
+    cell = tx_range
+    buckets: dict[tuple[int, int], list[int]] = defaultdict(list)
+    for idx, (x, y) in enumerate(points):
+        buckets[(math.floor(x / cell), math.floor(y / cell))].append(idx)
+
+    hops = [-1] * len(points)
+    queue: deque[int] = deque()
+    for idx in range(n_roots):
+        hops[idx] = 0
+        queue.append(idx)
+    range_sq = tx_range * tx_range
+    while queue:
+        u = queue.popleft()
+        ux, uy = points[u]
+        cx, cy = math.floor(ux / cell), math.floor(uy / cell)
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                bucket = buckets.get((cx + dx, cy + dy))
+                if not bucket:
+                    continue
+                remaining = []
+                for v in bucket:
+                    if hops[v] >= 0:
+                        continue
+                    vx, vy = points[v]
+                    if (vx - ux) ** 2 + (vy - uy) ** 2 <= range_sq:
+                        hops[v] = hops[u] + 1
+                        queue.append(v)
+                    else:
+                        remaining.append(v)
+                # Reached nodes never need to be scanned again.
+                buckets[(cx + dx, cy + dy)] = remaining
+    return hops
+
+
+def check_topology(topology: Topology, tx_range: float, max_hops: int) -> list[int]:
+    """Return hop counts, raising TopologyError for disconnected or over-deep layouts."""
+    hops = hop_counts(topology.points, len(topology.roots), tx_range)
+    unreachable = [idx + 1 for idx, hop in enumerate(hops) if hop < 0]
+    if unreachable:
+        shown = ", ".join(str(mote_id) for mote_id in unreachable[:10])
+        more = f" (+{len(unreachable) - 10} more)" if len(unreachable) > 10 else ""
+        raise TopologyError(
+            f"{topology.layout}: {len(unreachable)} motes cannot reach a root at "
+            f"tx-range {tx_range:g} m: {shown}{more}"
+        )
+    depth = max(hops, default=0)
+    if max_hops > 0 and depth > max_hops:
+        raise TopologyError(f"{topology.layout}: depth {depth} hops exceeds --max-hops {max_hops}")
+    return hops
+
+
+def write_topology_csv(path: Path, topology: Topology, hops: list[int]) -> None:
+    with path.open("w", newline="", encoding="utf-8") as handle:
+        writer = csv.writer(handle)
+        writer.writerow(["mote_id", "role", "x", "y", "hops"])
+        for (mote_id, x, y, role), hop in zip(topology.motes(), hops):
+            writer.writerow([mote_id, role, f"{x:.1f}", f"{y:.1f}", hop])
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Check a layout's UDGM connectivity without Cooja")
+    parser.add_argument("--layout", choices=LAYOUTS, default="grid", help="Mote layout")
+    parser.add_argument("--senders", type=int, default=3, help="Number of sender motes")
+    parser.add_argument("--seed", type=int, default=1, help="Layout seed")
+    parser.add_argument("--spacing", type=float, default=25.0, help="Mean node spacing (m)")
+    parser.add_argument("--roots", type=int, default=1, help="Root motes (multiroot layout)")
+    parser.add_argument("--clusters", type=int, default=0, help="Cluster count (0: sqrt(N)/2)")
+    parser.add_argument("--corridor-width", type=float, default=20.0, help="Line layout width (m)")
+    parser.add_argument("--tx-range", type=float, default=60.0, help="UDGM transmit range")
+    parser.add_argument("--max-hops", type=int, default=16, help="Reject deeper layouts (0 disables)")
+    parser.add_argument("--out", help="Optional per-mote CSV (id, role, x, y, hops)")
+    args = parser.parse_args()
+
+    topology = build_topology(
+        args.layout, args.senders, args.seed, args.spacing, args.roots, args.clusters, args.corridor_width
+    )
+    try:
+        hops = check_topology(topology, args.tx_range, args.max_hops)
+    except TopologyError as exc:
+        print(f"topology rejected: {exc}")
+        return 3
+    if args.out:
+        write_topology_csv(Path(args.out), topology, hops)
+    histogram = defaultdict(int)
+    for hop in hops[len(topology.roots):]:
+        histogram[hop] += 1
+    print(
+        f"{args.layout}: {len(topology.senders)} senders, {len(topology.roots)} roots, "
+        f"max depth {max(hops)} hops; per hop: "
+        + " ".join(f"{hop}:{histogram[hop]}" for hop in sorted(histogram))
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())